@@ -1,48 +1,44 @@
 import hashlib
 import hmac
-import json
 import os
 import secrets
+import threading
 import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
-
-from ..core.storage_utils import atomic_write_json, exclusive_lock
-from ..core.config import DATA_DIR, USERS_FILE
-USERS_LOCK_FILE = USERS_FILE + ".lock"
+from typing import Callable, TypeVar
+
+from ..core.background import PeriodicTask
+from ..core.config import PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+from ..core.storage_utils import exclusive_lock, shared_lock
+from .categories import category_index
+from .presence import PRESENCE_FLUSH_SECONDS, presence
+from .ranking import NO_SOLVE_TS, decode_cursor, encode_cursor, ranking_index, solved_at_ts
+from .scoring import dynamic_scoring
+from .solve_index import solve_index
+from .teams import team_index
+from .timeline import TIMELINE_BUCKETS, TIMELINE_MAX_POINTS, Series, downsample, timeline_index
+from .user_store import USERS_LOCK_FILE, user_lock, user_repository
 
 PBKDF2_ITERATIONS = int(os.environ.get("HEXACTF_PBKDF2_ITERATIONS", "200000"))
+PASSWORD_HASH_BULK_WAIT_SECONDS = 30
 DEFAULT_ADMIN_USERNAME = os.environ.get("HEXACTF_ADMIN_USERNAME", "admin")
 DEFAULT_ADMIN_PASSWORD = os.environ.get("HEXACTF_ADMIN_PASSWORD", "admin")
+TEAM_MAX_MEMBERS = int(os.environ.get("HEXACTF_TEAM_MAX_MEMBERS", "4"))
+TEAM_NAME_MAX_LENGTH = 32
 ACTIVE_USER_WINDOW_SECONDS = 60
 LAST_SEEN_THROTTLE_SECONDS = 30
 
-
-def _ensure_data_dir() -> None:
-    os.makedirs(DATA_DIR, exist_ok=True)
+T = TypeVar("T")
 
 
 def _load_raw_unlocked() -> dict:
-    if not os.path.exists(USERS_FILE):
-        return {"users": {}}
-
-    try:
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        raise RuntimeError("users.json is corrupted (invalid JSON)") from e
-
-    if isinstance(data, dict) and "users" in data and isinstance(data["users"], dict):
-        return data
-
-    if isinstance(data, dict):
-        return {"users": data}
-
-    raise RuntimeError("users.json has invalid structure")
-
-
-def _save_raw_unlocked(data: dict) -> None:
-    _ensure_data_dir()
-    atomic_write_json(USERS_FILE, data)
+    data = user_repository.load_unlocked()
+    if dynamic_scoring.configs_stale():
+        # challenges.json changed: recompute dynamic values and every rank built on them.
+        user_repository.reindex()
+    return data
 
 
 def _hash_password(password: str) -> str:
@@ -80,6 +76,53 @@ def _password_matches(password: str, stored: str) -> tuple[bool, str | None]:
     return False, None
 
 
+class PasswordHashBusyError(RuntimeError):
+    """Raised when the password hashing queue is full; callers should retry later."""
+
+
+_HASH_POOL = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="hexactf-pbkdf2")
+_HASH_SLOTS = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+
+def run_password_job(fn: Callable[..., T], *args: object) -> T:
+    """Run a PBKDF2 job on the bounded hashing pool, never under the users lock.
+
+    At most PASSWORD_HASH_WORKERS hashes run at once (pbkdf2_hmac releases the
+    GIL, so threads run in parallel) and at most PASSWORD_HASH_QUEUE_LIMIT more
+    may wait; beyond that the request is rejected instead of piling up.
+    """
+    if not _HASH_SLOTS.acquire(blocking=False):
+        raise PasswordHashBusyError("too many login attempts in progress, please retry shortly")
+    try:
+        return _HASH_POOL.submit(fn, *args).result()
+    finally:
+        _HASH_SLOTS.release()
+
+
+def run_password_jobs(fn: Callable[..., T], arg_list: list[tuple]) -> list[T]:
+    """Bulk variant of `run_password_job` for admin imports.
+
+    Keeps at most PASSWORD_HASH_WORKERS jobs in flight so interactive logins
+    still find free queue slots, and waits for slots instead of failing fast.
+    """
+    results: list[T] = []
+    window = PASSWORD_HASH_WORKERS
+    for start in range(0, len(arg_list), window):
+        acquired = 0
+        try:
+            futures = []
+            for args in arg_list[start:start + window]:
+                if not _HASH_SLOTS.acquire(timeout=PASSWORD_HASH_BULK_WAIT_SECONDS):
+                    raise PasswordHashBusyError("password hashing queue is busy, please retry shortly")
+                acquired += 1
+                futures.append(_HASH_POOL.submit(fn, *args))
+            results.extend(future.result() for future in futures)
+        finally:
+            for _ in range(acquired):
+                _HASH_SLOTS.release()
+    return results
+
+
 MIN_PASSWORD_LENGTH = 8
 
 def _validate_password(password: str) -> None:
@@ -91,28 +134,35 @@ def _normalize_username(username: str) -> str:
 
 
 
+def effective_score(user: dict) -> int:
+    """Recorded score plus the user's dynamic-scoring adjustment (current challenge values)."""
+    return int(user.get("score", 0)) + dynamic_scoring.adjustment(str(user.get("username") or ""))
+
+
 def public_user(user: dict) -> dict:
     return {
         "username": user.get("username"),
         "display_name": user.get("display_name") or user.get("username"),
         "role": user.get("role", "user"),
         "status": user.get("status", "approved"),
-        "score": int(user.get("score", 0)),
+        "score": effective_score(user),
+        "team": user.get("team") or None,
         "solved_problems": list(user.get("solved_problems", [])),
         "created_at": user.get("created_at"),
-        "last_seen": user.get("last_seen"),
+        "last_seen": presence.last_seen_iso(str(user.get("username") or "")) or user.get("last_seen"),
     }
 
 
 def get_user(username: str) -> dict | None:
-    with exclusive_lock(USERS_LOCK_FILE):
+    with shared_lock(USERS_LOCK_FILE):
         data = _load_raw_unlocked()
         users = data.get("users", {})
-        return users.get(_normalize_username(username))
+        user = users.get(_normalize_username(username))
+        return dict(user) if isinstance(user, dict) else None
 
 
 def list_public_users(include_pending: bool = True) -> list[dict]:
-    with exclusive_lock(USERS_LOCK_FILE):
+    with shared_lock(USERS_LOCK_FILE):
         data = _load_raw_unlocked()
         users = data.get("users", {})
         rows = []
@@ -123,20 +173,6 @@ def list_public_users(include_pending: bool = True) -> list[dict]:
         return rows
 
 
-def _iter_public_users(include_admin: bool = False) -> list[dict]:
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        rows = []
-        for user in users.values():
-            if str(user.get("status") or "approved") != "approved":
-                continue
-            if not include_admin and user.get("role") == "admin":
-                continue
-            rows.append(user)
-        return rows
-
-
 def _parse_iso_datetime(raw: object) -> datetime | None:
     value = str(raw or "").strip()
     if not value:
@@ -147,209 +183,793 @@ def _parse_iso_datetime(raw: object) -> datetime | None:
         return None
 
 
-def count_recent_active_users(*, within_seconds: int = ACTIVE_USER_WINDOW_SECONDS, include_admin: bool = True) -> int:
-    cutoff = datetime.now(UTC) - timedelta(seconds=max(1, int(within_seconds or ACTIVE_USER_WINDOW_SECONDS)))
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        count = 0
-        for user in users.values():
-            if not isinstance(user, dict):
-                continue
-            if str(user.get("status") or "approved") != "approved":
-                continue
-            if not include_admin and user.get("role") == "admin":
-                continue
-            last_seen = _parse_iso_datetime(user.get("last_seen"))
-            if last_seen and last_seen >= cutoff:
-                count += 1
-        return count
+def _seed_presence(users: dict[str, dict]) -> None:
+    for username, user in users.items():
+        if not isinstance(user, dict) or str(user.get("status") or "approved") != "approved":
+            continue
+        presence.observe(username, user.get("last_seen"), is_admin=user.get("role") == "admin")
 
 
-def touch_user_activity(username: str, *, min_interval_seconds: int = LAST_SEEN_THROTTLE_SECONDS) -> dict | None:
+user_repository.add_load_listener(_seed_presence)
+# Dynamic values first: the ranking index reads each user's adjustment.
+user_repository.add_load_listener(dynamic_scoring.rebuild)
+user_repository.add_change_listener(dynamic_scoring.update)
+user_repository.add_load_listener(ranking_index.rebuild)
+user_repository.add_change_listener(ranking_index.update)
+user_repository.add_load_listener(solve_index.rebuild)
+user_repository.add_change_listener(solve_index.update)
+user_repository.add_load_listener(timeline_index.rebuild)
+user_repository.add_change_listener(timeline_index.update)
+user_repository.add_load_listener(category_index.rebuild)
+user_repository.add_change_listener(category_index.update)
+user_repository.add_load_listener(team_index.rebuild)
+user_repository.add_change_listener(team_index.update)
+
+
+def _shift_scores(username: str, problem: str, delta: int) -> None:
+    ranking_index.shift(username, delta)
+    category_index.shift(username, problem, delta)
+    team_index.shift(username, problem, delta)
+
+
+dynamic_scoring.add_shift_listener(_shift_scores)
+
+
+def _refresh_indexes() -> None:
+    # A signature check (plus any journal tail from other workers) keeps the indexes current.
+    with shared_lock(USERS_LOCK_FILE):
+        _load_raw_unlocked()
+
+
+def users_data_version() -> str:
+    """Version of the persisted user table; changes whenever users or solves do.
+
+    Includes the scoring rules, since editing a dynamic challenge changes scores too.
+    """
+    with shared_lock(USERS_LOCK_FILE):
+        _load_raw_unlocked()
+        return f"{user_repository.data_version()}:{dynamic_scoring.version()}"
+
+
+def count_recent_active_users(*, within_seconds: int = ACTIVE_USER_WINDOW_SECONDS, include_admin: bool = True) -> int:
+    # Make sure last_seen values flushed by other workers have been observed.
+    with shared_lock(USERS_LOCK_FILE):
+        _load_raw_unlocked()
+    return presence.count_active(
+        max(1, int(within_seconds or ACTIVE_USER_WINDOW_SECONDS)),
+        include_admin=include_admin,
+    )
+
+
+def touch_user_activity(
+    username: str,
+    *,
+    role: str | None = None,
+    min_interval_seconds: int = LAST_SEEN_THROTTLE_SECONDS,
+) -> None:
+    """Record activity in memory; last_seen reaches storage via `flush_user_activity`.
+
+    `min_interval_seconds` throttles how often one user's last_seen is persisted.
+    """
     username = _normalize_username(username)
     if not username:
-        return None
-    now = datetime.now(UTC)
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        user = users.get(username)
-        if not isinstance(user, dict):
-            return None
+        return
+    presence.touch(
+        username,
+        is_admin=role == "admin",
+        min_flush_interval=max(1, int(min_interval_seconds or LAST_SEEN_THROTTLE_SECONDS)),
+    )
+
+
+def flush_user_activity() -> int:
+    """Persist pending last_seen values in one batched write."""
+    pending = presence.drain_dirty()
+    if not pending:
+        return 0
+    try:
+        with exclusive_lock(USERS_LOCK_FILE):
+            changed = []
+            for username, last_seen in pending.items():
+                user = user_repository.get_unlocked(username)
+                if user is None:
+                    continue
+                stored = _parse_iso_datetime(user.get("last_seen"))
+                if stored is not None and stored >= _parse_iso_datetime(last_seen):
+                    continue
+                user["last_seen"] = last_seen
+                changed.append(user)
+            if changed:
+                user_repository.put_unlocked(*changed)
+            return len(changed)
+    except Exception:
+        presence.restore_dirty(pending)
+        raise
 
-        last_seen = _parse_iso_datetime(user.get("last_seen"))
-        if last_seen and (now - last_seen).total_seconds() < max(1, int(min_interval_seconds or LAST_SEEN_THROTTLE_SECONDS)):
-            return user
 
-        user["last_seen"] = now.isoformat().replace("+00:00", "Z")
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
-        return user
+presence_flusher = PeriodicTask("hexactf-presence-flush", PRESENCE_FLUSH_SECONDS, flush_user_activity)
 
 
 def get_problem_solve_count(problem_key: str) -> int:
     target = str(problem_key or "").strip()
     if not target:
         return 0
-    rows = _iter_public_users(include_admin=False)
-    return sum(1 for user in rows if target in (user.get("solved_problems") or []))
+    _refresh_indexes()
+    return solve_index.count(target)
 
 
 def get_scoreboard_summary() -> dict:
-    rows = _iter_public_users(include_admin=False)
-    total_players = len(rows)
-    total_solves = 0
-    for user in rows:
-        solved = user.get("solved_problems") or []
-        total_solves += len(solved) if isinstance(solved, list) else 0
-
+    # Totals are kept by the ranking index's listeners, so this never walks the users.
+    _refresh_indexes()
+    total_players, total_solves, total_score = ranking_index.totals()
     top_users = get_scoreboard(limit=3)
     return {
         "total_players": total_players,
         "total_solves": total_solves,
+        "total_score": total_score,
         "top_users": top_users,
     }
 
 
-def _parse_solve_events(user: dict) -> list[dict]:
-    raw = user.get("solve_events") or []
-    if not isinstance(raw, list):
-        return []
-    events = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-        problem = str(item.get("problem") or "").strip()
-        solved_at = str(item.get("solved_at") or "").strip()
-        score = int(item.get("score") or 0)
-        if not problem or not solved_at:
-            continue
-        events.append({
-            "problem": problem,
-            "score": score,
-            "solved_at": solved_at,
-        })
-    return events
-
-
-def get_scoreboard_timeline(hours: int | None = None, limit: int = 10) -> dict:
+def get_scoreboard_timeline(
+    hours: int | None = None,
+    limit: int = 10,
+    *,
+    bucket: str | None = None,
+    max_points: int | None = None,
+    as_of: str | None = None,
+) -> dict:
+    """Cumulative score lines for the top `limit` players.
+
+    Served from the precomputed per-user series: the window start is a
+    bisect, points are optionally merged per `bucket` ("1m", "5m", "1h") and
+    each line is capped at `max_points`. With `as_of`, players are picked
+    from the standings at that instant and their lines end there. Dynamic
+    challenges are drawn at their current value (or their value at `as_of`)
+    throughout, so each line ends at the score shown on the board. Raises
+    ValueError for an unknown bucket or a bad `as_of`.
+    """
     limit = max(1, int(limit or 10))
-    now = datetime.now(UTC)
-
-    rows = _iter_public_users(include_admin=False)
-    rows.sort(key=lambda user: (-int(user.get("score", 0)), str(user.get("username") or "")))
-    selected = rows[:limit]
-
-    parsed_series: list[dict] = []
-    all_timestamps: list[datetime] = []
-    for user in selected:
+    if bucket is not None and bucket not in TIMELINE_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(TIMELINE_BUCKETS)}")
+    bucket_seconds = TIMELINE_BUCKETS.get(bucket) if bucket else None
+    max_points = max(2, min(int(max_points or TIMELINE_MAX_POINTS), TIMELINE_MAX_POINTS))
+    if as_of is None:
+        now = datetime.now(UTC)
+        standings = [
+            (user, effective_score(user), len(user.get("solved_problems") or []) if isinstance(user.get("solved_problems"), list) else 0)
+            for user in _ranked_users(limit, approved_only=True)
+        ]
+        values = dynamic_scoring.values()
+    else:
+        rows, _ = get_scoreboard_as_of(as_of, limit=limit, approved_only=True)
+        now = datetime.fromtimestamp(solved_at_ts(as_of), UTC)
+        with shared_lock(USERS_LOCK_FILE):
+            values = _dynamic_values_until(now.timestamp())
+        standings = []
+        for row in rows:
+            user = get_user(str(row["username"]))
+            if user is not None:
+                standings.append((user, int(row["score"]), int(row["solved_count"])))
+    stop_ts = NO_SOLVE_TS if as_of is None else now.timestamp()
+
+    selected = []
+    for user, score, solved_count in standings:
         username = str(user.get("username") or "unknown")
-        display_name = str(user.get("display_name") or username)
-        current_score = int(user.get("score", 0))
-        solved_count = len(user.get("solved_problems") or []) if isinstance(user.get("solved_problems"), list) else 0
-        events = []
-        for item in _parse_solve_events(user):
-            try:
-                solved_at = datetime.fromisoformat(item["solved_at"].replace("Z", "+00:00"))
-            except ValueError:
-                continue
-            events.append({
-                "ts": solved_at,
-                "score": int(item["score"]),
-                "problem": item["problem"],
-            })
-            all_timestamps.append(solved_at)
-        events.sort(key=lambda item: item["ts"])
-        parsed_series.append({
+        series = timeline_index.get(username)
+        head = {
             "username": username,
-            "display_name": display_name,
-            "score": current_score,
+            "display_name": str(user.get("display_name") or username),
+            "score": score,
             "solved_count": solved_count,
-            "events": events,
-        })
-
+        }
+        selected.append((head, series.revalued(values) if series is not None and values else series))
+    return _timeline_payload(selected, now=now, stop_ts=stop_ts, hours=hours, bucket_seconds=bucket_seconds, max_points=max_points)
+
+
+def _timeline_payload(
+    selected: list[tuple[dict, Series | None]],
+    *,
+    now: datetime,
+    stop_ts: float,
+    hours: int | None,
+    bucket_seconds: int | None,
+    max_points: int,
+) -> dict:
+    """Shape (row head, series) pairs into the timeline response, shared by user and team boards."""
     if hours is not None:
         hours = max(1, int(hours or 1))
         start = now - timedelta(hours=hours)
-    elif all_timestamps:
-        start = min(all_timestamps)
     else:
-        start = now - timedelta(hours=24)
+        first_solves = [
+            series.times[0]
+            for _, series in selected
+            if series is not None and series.times and series.times[0] <= stop_ts
+        ]
+        start = datetime.fromtimestamp(min(first_solves), UTC) if first_solves else now - timedelta(hours=24)
+    start_ts = start.timestamp()
 
     start_iso = start.isoformat().replace("+00:00", "Z")
     end_iso = now.isoformat().replace("+00:00", "Z")
 
-    series = []
-    for item in parsed_series:
-        filtered_events = [event for event in item["events"] if event["ts"] >= start]
+    series_out = []
+    for head, series in selected:
         points = []
-        running = 0
-        for event in filtered_events:
-            running += int(event["score"])
-            points.append({
-                "ts": event["ts"].isoformat().replace("+00:00", "Z"),
-                "score": running,
-                "problem": event["problem"],
-            })
+        if series is not None:
+            points = downsample(
+                series,
+                series.index_at(start_ts),
+                series.index_after(stop_ts),
+                bucket_seconds=bucket_seconds,
+                max_points=max_points,
+            )
         if not points:
             points = [{"ts": start_iso, "score": 0}]
-        series.append({
-            "username": item["username"],
-            "display_name": item["display_name"],
-            "score": item["score"],
-            "solved_count": item["solved_count"],
-            "points": points,
-        })
+        series_out.append(dict(head, points=points))
 
     return {
         "start_at": start_iso,
         "end_at": end_iso,
-        "series": series,
+        "series": series_out,
     }
 
 
 def get_problem_solve_counts(include_admin: bool = False) -> dict[str, int]:
+    _refresh_indexes()
+    return solve_index.counts(include_admin=include_admin)
+
+
+def get_challenge_values() -> dict[str, int]:
+    """problem -> current value of each dynamic challenge (static ones are absent)."""
+    _refresh_indexes()
+    return dynamic_scoring.values()
+
+
+def get_first_bloods() -> dict[str, dict]:
+    """problem -> {"username", "solved_at"} of the first non-admin solver."""
+    _refresh_indexes()
+    out = {}
+    for problem, (username, ts) in solve_index.first_bloods().items():
+        solved_at = None
+        if ts != NO_SOLVE_TS:
+            solved_at = datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z")
+        out[problem] = {"username": username, "solved_at": solved_at}
+    return out
+
+
+def _scoreboard_row(user: dict, rank: int) -> dict:
+    solved = user.get("solved_problems") or []
+    return {
+        "username": user.get("username"),
+        "display_name": user.get("display_name") or user.get("username"),
+        "score": effective_score(user),
+        "solved_count": len(solved) if isinstance(solved, list) else int(user.get("solved_count", 0)),
+        "rank": rank,
+    }
+
+
+def _ranked_users(limit: int, *, include_admin: bool = False, approved_only: bool = False) -> list[dict]:
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        selected: list[dict] = []
+        after = None
+        while len(selected) < limit:
+            page = ranking_index.page(limit, after, include_admin=include_admin)
+            for _, username, _ in page:
+                user = users.get(username)
+                if not isinstance(user, dict):
+                    continue
+                if approved_only and str(user.get("status") or "approved") != "approved":
+                    continue
+                selected.append(user)
+                if len(selected) >= limit:
+                    break
+            if len(page) < limit:
+                break
+            after = page[-1][2]
+        return selected
+
+
+def get_scoreboard_page(limit: int = 100, cursor: str | None = None, include_admin: bool = False) -> tuple[list[dict], str | None]:
+    """One page of the board in rank order plus the cursor for the next page.
+
+    Reads come from the ranking index, so a page costs O(log n + limit)
+    instead of sorting every user. Raises ValueError for a bad cursor.
+    """
+    limit = max(1, int(limit or 1))
+    after = decode_cursor(cursor) if cursor else None
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        page = ranking_index.page(limit + 1, after, include_admin=include_admin)
+        rows = [
+            _scoreboard_row(users[username], rank)
+            for rank, username, _ in page[:limit]
+            if isinstance(users.get(username), dict)
+        ]
+    next_cursor = encode_cursor(page[limit - 1][2]) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def _dynamic_values_until(ts: float, solves: list[tuple[float, str, int, str]] | None = None) -> dict[str, int]:
+    """Dynamic challenge values as they stood at `ts` (from the non-admin solves up to then)."""
+    if solves is None:
+        solves = timeline_index.solves_until(ts)
+    users = user_repository.users_unlocked()
     counts: dict[str, int] = {}
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        for user in users.values():
+    for _, username, _, problem in solves:
+        user = users.get(username)
+        if isinstance(user, dict) and user.get("role") != "admin":
+            counts[problem] = counts.get(problem, 0) + 1
+    return dynamic_scoring.values_for(counts)
+
+
+def get_scoreboard_as_of(
+    as_of: str,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_admin: bool = False,
+    approved_only: bool = False,
+    category: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """The board as it stood at `as_of`, paged like `get_scoreboard_page`.
+
+    Replays the global solve index up to `as_of` (O(solves before it)) and
+    orders by the same rank keys as the live board; dynamic challenges count
+    at the value they had at `as_of`. Players without a solve by then are
+    only listed once a page reaches past the solvers. With `category`, only
+    that category's solves count and only its solvers are listed. Raises
+    ValueError for a bad timestamp or cursor.
+    """
+    ts = solved_at_ts(as_of)
+    if ts is None:
+        raise ValueError("invalid as_of timestamp")
+    limit = max(1, int(limit or 1))
+    after = decode_cursor(cursor) if cursor else None
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+
+        def eligible(username: str) -> bool:
+            user = users.get(username)
+            if not isinstance(user, dict) or (not include_admin and user.get("role") == "admin"):
+                return False
+            return not approved_only or str(user.get("status") or "approved") == "approved"
+
+        solves = timeline_index.solves_until(ts)
+        values = _dynamic_values_until(ts, solves)
+        standings: dict[str, list] = {}
+        for solved_at, username, points, problem in solves:
+            if category is not None and category_index.category_of(problem) != category:
+                continue
+            entry = standings.setdefault(username, [0, NO_SOLVE_TS, 0])
+            entry[0] += values.get(problem, points)
+            entry[1] = solved_at
+            entry[2] += 1
+        keys = sorted((-entry[0], entry[1], username) for username, entry in standings.items() if eligible(username))
+        start = bisect_right(keys, after) if after is not None else 0
+        if start + limit >= len(keys) and category is None:
+            keys += [(0, NO_SOLVE_TS, username) for username in sorted(users) if username not in standings and eligible(username)]
+            if after is not None:
+                start = bisect_right(keys, after)
+        page = keys[start : start + limit + 1]
+        rows = []
+        for offset, key in enumerate(page[:limit]):
+            username = key[2]
+            user = users[username]
+            rows.append({
+                "username": username,
+                "display_name": user.get("display_name") or username,
+                "score": -key[0],
+                "solved_count": standings.get(username, (0, 0, 0))[2],
+                "rank": start + offset + 1,
+            })
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def get_category_scoreboard_page(
+    category: str,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_admin: bool = False,
+) -> tuple[list[dict], str | None]:
+    """One page of a category board (points from that category's challenges only).
+
+    Same shape and cursors as `get_scoreboard_page`; only players with a solve
+    in the category are listed. Raises ValueError for a bad cursor.
+    """
+    limit = max(1, int(limit or 1))
+    after = decode_cursor(cursor) if cursor else None
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        page = category_index.page(category, limit + 1, after, include_admin=include_admin)
+        rows = []
+        for rank, username, key, solved_count in page[:limit]:
+            user = users.get(username)
             if not isinstance(user, dict):
                 continue
-            if not include_admin and user.get("role") == "admin":
+            rows.append({
+                "username": username,
+                "display_name": user.get("display_name") or username,
+                "score": -key[0],
+                "solved_count": solved_count,
+                "rank": rank,
+            })
+    next_cursor = encode_cursor(page[limit - 1][2]) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def get_categories() -> list[str]:
+    """Every challenge category that has a board."""
+    _refresh_indexes()
+    return category_index.categories()
+
+
+def get_challenge_solvers(
+    problem_key: str,
+    limit: int = 100,
+    cursor: str | None = None,
+    until: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """Non-admin solvers of one challenge in solve order, paged by cursor.
+
+    Served from the solve index (O(log n + limit)); `until` hides solves made
+    after that instant. Raises ValueError for a bad cursor or timestamp.
+    """
+    limit = max(1, int(limit or 1))
+    after = None
+    if cursor:
+        _, ts, username = decode_cursor(cursor)
+        after = (ts, username)
+    until_ts = None
+    if until is not None:
+        until_ts = solved_at_ts(until)
+        if until_ts is None:
+            raise ValueError("invalid until timestamp")
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        page = solve_index.solvers(problem_key, limit + 1, after, until=until_ts)
+        rows = []
+        for position, username, ts in page[:limit]:
+            user = users.get(username)
+            if not isinstance(user, dict):
                 continue
-            solved = user.get("solved_problems") or []
-            if not isinstance(solved, list):
+            rows.append({
+                "username": username,
+                "display_name": user.get("display_name") or username,
+                "solved_at": None if ts == NO_SOLVE_TS else datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z"),
+                "position": position,
+            })
+    # Solver cursors reuse the board encoding with the score slot unused.
+    next_cursor = encode_cursor((0, page[limit - 1][2], page[limit - 1][1])) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def build_frozen_scoreboard(as_of: str, *, timeline_limit: int = 10) -> dict:
+    """Everything the public board shows, as it stood at `as_of`, ready to be stored.
+
+    Returns the full board, the summary, the full-window timeline of the top
+    `timeline_limit` players and each player's solved problems at that time.
+    """
+    ts = solved_at_ts(as_of)
+    if ts is None:
+        raise ValueError("invalid as_of timestamp")
+    with shared_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        approved = set()
+        solved: dict[str, list[str]] = {}
+        for username, user in users.items():
+            if not isinstance(user, dict):
                 continue
-            for problem_key in solved:
-                key = str(problem_key or "").strip()
-                if not key:
-                    continue
-                counts[key] = counts.get(key, 0) + 1
-    return counts
+            if str(user.get("status") or "approved") == "approved" and user.get("role") != "admin":
+                approved.add(username)
+            events = user.get("solve_events") or []
+            if not isinstance(events, list):
+                continue
+            problems = [
+                str(event.get("problem"))
+                for event in events
+                if isinstance(event, dict) and event.get("problem") and (solved_at_ts(event.get("solved_at")) or NO_SOLVE_TS) <= ts
+            ]
+            if problems:
+                solved[username] = problems
+        total = len(users)
+
+    rows, _ = get_scoreboard_as_of(as_of, limit=total + 1)
+    players = [row for row in rows if row["username"] in approved]
+    return {
+        "frozen_at": datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z"),
+        "scoreboard": rows,
+        "summary": {
+            "total_players": len(players),
+            "total_solves": sum(int(row["solved_count"]) for row in players),
+            "total_score": sum(int(row["score"]) for row in players),
+            "top_users": rows[:3],
+        },
+        "timeline": get_scoreboard_timeline(limit=timeline_limit, as_of=as_of),
+        "solved": solved,
+    }
+
 
 def get_scoreboard(limit: int = 100, include_admin: bool = False) -> list[dict]:
+    rows, _ = get_scoreboard_page(limit, include_admin=include_admin)
+    return rows
+
+
+def get_scoreboard_entry(username: str, include_admin: bool = False) -> dict | None:
+    """Scoreboard row (with rank) for one user via an O(log n) index lookup."""
+    username = _normalize_username(username)
+    with shared_lock(USERS_LOCK_FILE):
+        user = user_repository.get_unlocked(username)
+        rank = ranking_index.rank(username, include_admin=include_admin)
+        if user is None or rank is None:
+            return None
+        return _scoreboard_row(user, rank)
+
+
+def count_scoreboard_entries(include_admin: bool = False) -> int:
+    with shared_lock(USERS_LOCK_FILE):
+        _load_raw_unlocked()
+        return ranking_index.count(include_admin=include_admin)
+
+
+def _normalize_team(name: str) -> str:
+    return (name or "").strip().lower()
+
+
+def _teams_unlocked() -> dict[str, dict]:
+    teams = _load_raw_unlocked().get("teams")
+    return teams if isinstance(teams, dict) else {}
+
+
+def public_team(key: str, team: dict, *, include_code: bool = False) -> dict:
+    out = {
+        "team": key,
+        "display_name": str(team.get("name") or key),
+        "created_at": team.get("created_at"),
+        "members": team_index.members(key),
+    }
+    if include_code:
+        out["join_code"] = team.get("join_code")
+    return out
+
+
+def _team_member_unlocked(username: str) -> dict:
+    user = user_repository.get_unlocked(username)
+    if user is None:
+        raise ValueError("user not found")
+    if user.get("role") == "admin":
+        raise ValueError("admins cannot join teams")
+    return user
+
+
+def create_team(username: str, name: str) -> dict:
+    """Create a team with `username` as its first member; returns it with its join code."""
+    username = _normalize_username(username)
+    display_name = str(name or "").strip()
+    key = _normalize_team(display_name)
+    if not key or len(display_name) > TEAM_NAME_MAX_LENGTH:
+        raise ValueError(f"team name must be 1-{TEAM_NAME_MAX_LENGTH} characters")
     with exclusive_lock(USERS_LOCK_FILE):
+        user = _team_member_unlocked(username)
+        if user.get("team"):
+            raise ValueError("already in a team")
         data = _load_raw_unlocked()
-        users = data.get("users", {})
-        rows = []
-        for user in users.values():
-            if not include_admin and user.get("role") == "admin":
-                continue
-            solved = user.get("solved_problems") or []
-            rows.append({
-                "username": user.get("username"),
-                "display_name": user.get("display_name") or user.get("username"),
-                "score": int(user.get("score", 0)),
-                "solved_count": len(solved) if isinstance(solved, list) else int(user.get("solved_count", 0))
-            })
+        teams = data.get("teams")
+        if not isinstance(teams, dict):
+            teams = data["teams"] = {}
+        if key in teams:
+            raise ValueError("team name already taken")
+        teams[key] = {
+            "name": display_name,
+            "join_code": secrets.token_urlsafe(9),
+            "created_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+            "created_by": username,
+        }
+        # One snapshot write stores the team and its founder's membership together.
+        user_repository.commit_unlocked(changed=[dict(user, team=key)], extra_changed=True)
+        return public_team(key, teams[key], include_code=True)
 
-        rows.sort(key=lambda x: (-x["score"], str(x["username"])))
-        for idx, row in enumerate(rows):
-            row["rank"] = idx + 1
-        return rows[:max(1, limit)]
+
+def join_team(username: str, name: str, join_code: str) -> dict:
+    username = _normalize_username(username)
+    key = _normalize_team(name)
+    with exclusive_lock(USERS_LOCK_FILE):
+        user = _team_member_unlocked(username)
+        if user.get("team"):
+            raise ValueError("already in a team")
+        team = _teams_unlocked().get(key)
+        if not isinstance(team, dict) or not hmac.compare_digest(str(team.get("join_code") or ""), str(join_code or "")):
+            raise ValueError("invalid team name or join code")
+        if TEAM_MAX_MEMBERS > 0 and len(team_index.members(key)) >= TEAM_MAX_MEMBERS:
+            raise ValueError("team is full")
+        user_repository.update_fields_unlocked(username, {"team": key})
+        return public_team(key, team, include_code=True)
+
+
+def leave_team(username: str) -> None:
+    username = _normalize_username(username)
+    with exclusive_lock(USERS_LOCK_FILE):
+        user = user_repository.get_unlocked(username)
+        if user is None:
+            raise ValueError("user not found")
+        if not user.get("team"):
+            raise ValueError("not in a team")
+        user_repository.update_fields_unlocked(username, {"team": None})
+
+
+def get_team(name: str, *, include_code: bool = False) -> dict | None:
+    key = _normalize_team(name)
+    with shared_lock(USERS_LOCK_FILE):
+        team = _teams_unlocked().get(key)
+        if not isinstance(team, dict):
+            return None
+        return public_team(key, team, include_code=include_code)
+
+
+def list_teams(*, include_code: bool = False) -> list[dict]:
+    with shared_lock(USERS_LOCK_FILE):
+        teams = _teams_unlocked()
+        return [
+            public_team(key, team, include_code=include_code)
+            for key, team in sorted(teams.items())
+            if isinstance(team, dict)
+        ]
+
+
+def get_team_members(name: str) -> list[str]:
+    """Usernames currently in a team (from the team index)."""
+    _refresh_indexes()
+    return team_index.members(_normalize_team(name))
+
+
+def count_teams() -> int:
+    """Teams with at least one member (the ones on the team board)."""
+    with shared_lock(USERS_LOCK_FILE):
+        _load_raw_unlocked()
+        return team_index.count()
+
+
+def _team_row(key: str, teams: dict, rank: int, score: int, solved_count: int) -> dict:
+    team = teams.get(key) if isinstance(teams.get(key), dict) else {}
+    return {
+        "team": key,
+        "display_name": str(team.get("name") or key),
+        "score": score,
+        "solved_count": solved_count,
+        "member_count": len(team_index.members(key)),
+        "rank": rank,
+    }
+
+
+def get_team_scoreboard_page(limit: int = 100, cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """One page of the team board, read from the team index like `get_scoreboard_page`."""
+    limit = max(1, int(limit or 1))
+    after = decode_cursor(cursor) if cursor else None
+    with shared_lock(USERS_LOCK_FILE):
+        teams = _teams_unlocked()
+        page = team_index.page(limit + 1, after)
+        rows = []
+        for rank, key, rank_key in page[:limit]:
+            _, solved_count = team_index.totals(key) or (0, 0)
+            rows.append(_team_row(key, teams, rank, -rank_key[0], solved_count))
+    next_cursor = encode_cursor(page[limit - 1][2]) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def get_team_scoreboard_entry(name: str) -> dict | None:
+    key = _normalize_team(name)
+    with shared_lock(USERS_LOCK_FILE):
+        teams = _teams_unlocked()
+        rank = team_index.rank(key)
+        totals = team_index.totals(key)
+        if rank is None or totals is None:
+            return None
+        return _team_row(key, teams, rank, totals[0], totals[1])
+
+
+def _team_standings_until(ts: float) -> dict[str, list]:
+    """team -> [points, last new solve ts, solved count] at `ts`, by current membership."""
+    solves = timeline_index.solves_until(ts)
+    values = _dynamic_values_until(ts, solves)
+    credited: dict[str, set[str]] = {}
+    standings: dict[str, list] = {}
+    # Solves are in (time, username) order, so the first one seen is the credited one.
+    for solved_at, username, points, problem in solves:
+        team = team_index.team_of(username)
+        if team is None or problem in credited.setdefault(team, set()):
+            continue
+        credited[team].add(problem)
+        entry = standings.setdefault(team, [0, NO_SOLVE_TS, 0])
+        entry[0] += values.get(problem, points)
+        entry[1] = solved_at
+        entry[2] += 1
+    return standings
+
+
+def get_team_scoreboard_as_of(as_of: str, limit: int = 100, cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """The team board at `as_of`, replayed like `get_scoreboard_as_of` (current membership)."""
+    ts = solved_at_ts(as_of)
+    if ts is None:
+        raise ValueError("invalid as_of timestamp")
+    limit = max(1, int(limit or 1))
+    after = decode_cursor(cursor) if cursor else None
+    with shared_lock(USERS_LOCK_FILE):
+        teams = _teams_unlocked()
+        standings = _team_standings_until(ts)
+        keys = sorted((-entry[0], entry[1], key) for key, entry in standings.items())
+        start = bisect_right(keys, after) if after is not None else 0
+        if start + limit >= len(keys):
+            keys += [(0, NO_SOLVE_TS, key) for key in sorted(teams) if key not in standings and team_index.members(key)]
+            if after is not None:
+                start = bisect_right(keys, after)
+        page = keys[start : start + limit + 1]
+        rows = [
+            _team_row(key[2], teams, start + offset + 1, -key[0], standings.get(key[2], (0, 0, 0))[2])
+            for offset, key in enumerate(page[:limit])
+        ]
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return rows, next_cursor
+
+
+def get_team_scoreboard_timeline(
+    hours: int | None = None,
+    limit: int = 10,
+    *,
+    bucket: str | None = None,
+    max_points: int | None = None,
+    as_of: str | None = None,
+) -> dict:
+    """`get_scoreboard_timeline` for teams: each line is a team's credited solves."""
+    limit = max(1, int(limit or 10))
+    if bucket is not None and bucket not in TIMELINE_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(TIMELINE_BUCKETS)}")
+    bucket_seconds = TIMELINE_BUCKETS.get(bucket) if bucket else None
+    max_points = max(2, min(int(max_points or TIMELINE_MAX_POINTS), TIMELINE_MAX_POINTS))
+    if as_of is None:
+        now = datetime.now(UTC)
+        rows, _ = get_team_scoreboard_page(limit)
+        values = {}
+    else:
+        rows, _ = get_team_scoreboard_as_of(as_of, limit=limit)
+        now = datetime.fromtimestamp(solved_at_ts(as_of), UTC)
+        with shared_lock(USERS_LOCK_FILE):
+            values = _dynamic_values_until(now.timestamp())
+    selected = []
+    for row in rows:
+        series = team_index.series(str(row["team"]))
+        head = {key: row[key] for key in ("team", "display_name", "score", "solved_count")}
+        selected.append((head, series.revalued(values) if series is not None and values else series))
+    return _timeline_payload(
+        selected,
+        now=now,
+        stop_ts=NO_SOLVE_TS if as_of is None else now.timestamp(),
+        hours=hours,
+        bucket_seconds=bucket_seconds,
+        max_points=max_points,
+    )
+
+
+def _ensure_name_available_unlocked(username: str, display_name: str | None) -> None:
+    if user_repository.get_unlocked(username) is not None:
+        raise ValueError("user already exists")
+
+    # Display names are unique case-insensitively across all users (pending + approved).
+    if user_repository.display_name_taken_unlocked(display_name or username):
+        raise ValueError("display name already in use")
+
+
+def _new_user_record(username: str, password_hash: str, display_name: str | None, role: str, status: str) -> dict:
+    return {
+        "username": username,
+        "display_name": display_name or username,
+        "role": role,
+        "status": status,
+        "password_hash": password_hash,
+        "score": 0,
+        "solved_problems": [],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "last_seen": None,
+        "session_nonce": secrets.token_hex(16),
+    }
 
 
 def create_user(username: str, password: str, display_name: str | None = None, role: str = "user") -> dict:
@@ -358,83 +978,150 @@ def create_user(username: str, password: str, display_name: str | None = None, r
         raise ValueError("username and password required")
     _validate_password(password)
 
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        if username in users:
-            raise ValueError("user already exists")
-
-        # Check display_name duplicate (case-insensitive) across all users (pending + approved)
-        effective_dn = (display_name or username).strip().lower()
-        for existing_user in users.values():
-            existing_dn = str(existing_user.get("display_name") or existing_user.get("username") or "").strip().lower()
-            if existing_dn and existing_dn == effective_dn:
-                raise ValueError("display name already in use")
+    # Fail fast on duplicates before paying for the hash, then re-check under the lock.
+    with shared_lock(USERS_LOCK_FILE):
+        _ensure_name_available_unlocked(username, display_name)
+    password_hash = run_password_job(_hash_password, password)
 
-        user = {
-            "username": username,
-            "display_name": display_name or username,
-            "role": role,
-            "status": "approved" if role == "admin" else "pending",
-            "password_hash": _hash_password(password),
-            "score": 0,
-            "solved_problems": [],
-            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "last_seen": None,
-            "session_nonce": secrets.token_hex(16),
-        }
+    with exclusive_lock(USERS_LOCK_FILE):
+        _ensure_name_available_unlocked(username, display_name)
 
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user = _new_user_record(username, password_hash, display_name, role, "approved" if role == "admin" else "pending")
+        user_repository.put_unlocked(user)
         return user
 
 
-def authenticate_user(username: str, password: str) -> tuple[dict | None, str | None]:
-    username_norm = _normalize_username(username)
+def _check_import_rows_unlocked(rows: list[dict], results: list[dict | None]) -> None:
+    """Mark rows that clash with existing users or earlier rows as errors."""
+    taken_names: set[str] = set()
+    seen_usernames: set[str] = set()
+    for idx, row in enumerate(rows):
+        if results[idx] is not None:
+            continue
+        username = row["username"]
+        display_key = (row.get("display_name") or username).strip().lower()
+        if username in seen_usernames or user_repository.get_unlocked(username) is not None:
+            results[idx] = {"row": idx + 1, "username": username, "status": "error", "detail": "user already exists"}
+        elif display_key in taken_names or user_repository.display_name_taken_unlocked(display_key):
+            results[idx] = {"row": idx + 1, "username": username, "status": "error", "detail": "display name already in use"}
+        else:
+            seen_usernames.add(username)
+            taken_names.add(display_key)
+
+
+def bulk_create_users(rows: list[dict], *, approve: bool = True) -> list[dict]:
+    """Create many users with one store write; returns one result per input row.
+
+    Rows are dicts with username, password and optional display_name / role.
+    Invalid or conflicting rows are reported and skipped; the rest are hashed
+    in parallel on the password pool and committed together.
+    """
+    normalized: list[dict] = []
+    results: list[dict | None] = []
+    for idx, row in enumerate(rows):
+        username = _normalize_username(str(row.get("username") or ""))
+        password = str(row.get("password") or "")
+        display_name = str(row.get("display_name") or "").strip() or None
+        role = str(row.get("role") or "user").strip().lower()
+        normalized.append({"username": username, "password": password, "display_name": display_name, "role": role})
+        error = None
+        if not username or not password:
+            error = "username and password required"
+        elif len(password) < MIN_PASSWORD_LENGTH:
+            error = f"password must be at least {MIN_PASSWORD_LENGTH} characters"
+        elif role not in {"admin", "user"}:
+            error = "invalid role"
+        results.append({"row": idx + 1, "username": username, "status": "error", "detail": error} if error else None)
+
+    with shared_lock(USERS_LOCK_FILE):
+        _check_import_rows_unlocked(normalized, results)
+
+    pending = [idx for idx, result in enumerate(results) if result is None]
+    hashes = run_password_jobs(_hash_password, [(normalized[idx]["password"],) for idx in pending])
+    password_hashes = dict(zip(pending, hashes))
+
     with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        user = users.get(username_norm)
+        # Someone may have registered one of these names while we were hashing.
+        _check_import_rows_unlocked(normalized, results)
+        created = []
+        for idx in pending:
+            if results[idx] is not None:
+                continue
+            row = normalized[idx]
+            status = "approved" if approve or row["role"] == "admin" else "pending"
+            created.append(_new_user_record(row["username"], password_hashes[idx], row["display_name"], row["role"], status))
+            results[idx] = {"row": idx + 1, "username": row["username"], "status": "created"}
+        if created:
+            user_repository.put_unlocked(*created)
+    return [result for result in results if result is not None]
+
+
+def _get_password_hash(username: str) -> str | None:
+    with shared_lock(USERS_LOCK_FILE):
+        user = user_repository.get_unlocked(username)
         if not user:
-            return None, "invalid_credentials"
+            return None
+        return str(user.get("password_hash", ""))
 
-        ok, upgraded_hash = _password_matches(password, user.get("password_hash", ""))
-        if not ok:
+
+def authenticate_user(username: str, password: str) -> tuple[dict | None, str | None]:
+    username_norm = _normalize_username(username)
+    stored_hash = _get_password_hash(username_norm)
+    if stored_hash is None:
+        return None, "invalid_credentials"
+
+    ok, upgraded_hash = run_password_job(_password_matches, password, stored_hash)
+    if not ok:
+        return None, "invalid_credentials"
+
+    with user_lock(username_norm):
+        user = user_repository.get_unlocked(username_norm)
+        # The password may have been changed or reset while we were hashing.
+        if not user or str(user.get("password_hash", "")) != stored_hash:
             return None, "invalid_credentials"
 
         status = str(user.get("status") or "approved")
         if status != "approved":
             return None, status
 
+        fields = {"session_nonce": secrets.token_hex(16)}
         if upgraded_hash:
-            user["password_hash"] = upgraded_hash
+            fields["password_hash"] = upgraded_hash
+        user = user_repository.update_fields_unlocked(username_norm, fields)
+        if user is None:
+            return None, "invalid_credentials"
 
-        user["session_nonce"] = secrets.token_hex(16)
-        users[username_norm] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        return dict(user), None
 
-        return user, None
+
+def _verify_and_hash(current_password: str, stored_hash: str, new_password: str) -> str | None:
+    ok, _ = _password_matches(current_password, stored_hash)
+    if not ok:
+        return None
+    return _hash_password(new_password)
 
 
 def change_own_password(username: str, current_password: str, new_password: str) -> dict:
     username = _normalize_username(username)
     _validate_password(new_password)
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        user = users.get(username)
+    stored_hash = _get_password_hash(username)
+    if stored_hash is None:
+        raise ValueError("user not found")
+
+    new_hash = run_password_job(_verify_and_hash, current_password, stored_hash, new_password)
+    if new_hash is None:
+        raise ValueError("current password is incorrect")
+
+    with user_lock(username):
+        user = user_repository.get_unlocked(username)
         if not user:
             raise ValueError("user not found")
-        ok, _ = _password_matches(current_password, user.get("password_hash", ""))
-        if not ok:
-            raise ValueError("current password is incorrect")
-        user["password_hash"] = _hash_password(new_password)
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
-        return user
+        if str(user.get("password_hash", "")) != stored_hash:
+            raise ValueError("password was changed concurrently, please retry")
+        user = user_repository.update_fields_unlocked(username, {"password_hash": new_hash})
+        if user is None:
+            raise ValueError("user not found")
+        return dict(user)
 
 
 def reset_password(username: str, password: str) -> dict:
@@ -442,18 +1129,12 @@ def reset_password(username: str, password: str) -> dict:
     if not password:
         raise ValueError("password required")
 
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        user = users.get(username)
-        if not user:
+    password_hash = run_password_job(_hash_password, password)
+    with user_lock(username):
+        user = user_repository.update_fields_unlocked(username, {"password_hash": password_hash})
+        if user is None:
             raise ValueError("user not found")
-
-        user["password_hash"] = _hash_password(password)
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
-        return user
+        return dict(user)
 
 
 def update_role(username: str, role: str) -> dict:
@@ -474,9 +1155,7 @@ def update_role(username: str, role: str) -> dict:
                 raise ValueError("cannot demote last admin")
 
         user["role"] = role
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user_repository.put_unlocked(user)
         return user
 
 
@@ -489,9 +1168,7 @@ def approve_user(username: str) -> dict:
         if not user:
             raise ValueError("user not found")
         user["status"] = "approved"
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user_repository.put_unlocked(user)
         return user
 
 
@@ -505,9 +1182,8 @@ def reject_user(username: str) -> None:
             raise ValueError("user not found")
         if user.get("role") == "admin":
             raise ValueError("cannot reject admin")
-        del users[username]
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user_repository.delete_unlocked(username)
+    presence.forget(username)
 
 
 def delete_user(username: str) -> None:
@@ -524,9 +1200,63 @@ def delete_user(username: str) -> None:
             if admin_count <= 1:
                 raise ValueError("cannot delete last admin")
 
-        del users[username]
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user_repository.delete_unlocked(username)
+    presence.forget(username)
+
+
+BULK_USER_ACTIONS = {"approve", "reject", "role", "delete"}
+
+
+def bulk_user_action(action: str, usernames: list[str], role: str | None = None) -> list[dict]:
+    """Apply approve / reject / role / delete to many users in one store write.
+
+    Each username gets its own result row; a failing row (unknown user, last
+    admin, ...) is reported without aborting the others.
+    """
+    if action not in BULK_USER_ACTIONS:
+        raise ValueError("invalid action")
+    if action == "role" and role not in {"admin", "user"}:
+        raise ValueError("invalid role")
+
+    results = []
+    changed: dict[str, dict] = {}
+    deleted: list[str] = []
+    with exclusive_lock(USERS_LOCK_FILE):
+        users = _load_raw_unlocked().get("users", {})
+        admin_count = sum(1 for u in users.values() if isinstance(u, dict) and u.get("role") == "admin")
+        for raw_username in usernames:
+            username = _normalize_username(raw_username)
+            user = users.get(username)
+            error = None
+            if not isinstance(user, dict) or username in deleted:
+                error = "user not found"
+            elif action == "approve":
+                changed[username] = dict(user, status="approved")
+            elif action == "role":
+                current = changed.get(username, user)
+                if current.get("role") == "admin" and role != "admin" and admin_count <= 1:
+                    error = "cannot demote last admin"
+                else:
+                    admin_count += int(role == "admin") - int(current.get("role") == "admin")
+                    changed[username] = dict(current, role=role)
+            elif action == "reject" and user.get("role") == "admin":
+                error = "cannot reject admin"
+            elif action == "delete" and user.get("role") == "admin" and admin_count <= 1:
+                error = "cannot delete last admin"
+            else:
+                admin_count -= int(user.get("role") == "admin")
+                changed.pop(username, None)
+                deleted.append(username)
+            if error:
+                results.append({"username": username, "status": "error", "detail": error})
+            else:
+                results.append({"username": username, "status": "ok"})
+
+        if changed or deleted:
+            user_repository.commit_unlocked(changed=changed.values(), deleted=deleted)
+    for username in deleted:
+        presence.forget(username)
+    return results
 
 
 def ensure_default_admin() -> None:
@@ -540,8 +1270,7 @@ def ensure_default_admin() -> None:
         username = _normalize_username(DEFAULT_ADMIN_USERNAME)
         if username in users:
             users[username]["role"] = "admin"
-            data["users"] = users
-            _save_raw_unlocked(data)
+            user_repository.put_unlocked(users[username])
             return
 
         user = {
@@ -556,15 +1285,13 @@ def ensure_default_admin() -> None:
             "last_seen": None,
             "session_nonce": secrets.token_hex(16),
         }
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        user_repository.put_unlocked(user)
 
 def reset_scoreboard() -> int:
     with exclusive_lock(USERS_LOCK_FILE):
         data = _load_raw_unlocked()
         users = data.get("users", {})
-        updated = 0
+        updated = []
         for user in users.values():
             had_score = int(user.get("score") or 0) != 0
             had_solves = bool(user.get("solved_problems"))
@@ -573,45 +1300,30 @@ def reset_scoreboard() -> int:
                 user["score"] = 0
                 user["solved_problems"] = []
                 user["solve_events"] = []
-                updated += 1
-        data["users"] = users
-        _save_raw_unlocked(data)
-        return updated
+                updated.append(user)
+        if updated:
+            user_repository.put_unlocked(*updated)
+        return len(updated)
 
 
 def mark_problem_solved(username: str, problem_key: str, score: int) -> tuple[bool, dict]:
     username = _normalize_username(username)
-    with exclusive_lock(USERS_LOCK_FILE):
-        data = _load_raw_unlocked()
-        users = data.get("users", {})
-        user = users.get(username)
+    # Only this user's shard is locked, so solves by different players run in parallel.
+    with user_lock(username):
+        user = user_repository.get_unlocked(username)
         if not user:
             raise ValueError("user not found")
 
         solved = user.get("solved_problems") or []
-        if not isinstance(solved, list):
-            solved = []
-
-        if problem_key in solved:
-            users[username] = user
-            data["users"] = users
-            _save_raw_unlocked(data)
+        if isinstance(solved, list) and problem_key in solved:
             return False, public_user(user)
 
-        solved.append(problem_key)
-        user["solved_problems"] = solved
-        events = user.get("solve_events") or []
-        if not isinstance(events, list):
-            events = []
-        events.append({
+        user = user_repository.record_solve_unlocked({
+            "username": username,
             "problem": problem_key,
             "score": int(score),
             "solved_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
         })
-        user["solve_events"] = events
-        current_score = int(user.get("score", 0))
-        user["score"] = current_score + int(score)
-        users[username] = user
-        data["users"] = users
-        _save_raw_unlocked(data)
+        if user is None:
+            raise ValueError("user not found")
         return True, public_user(user)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+
+from ..core.challenge_catalog import CatalogError, challenge_catalog
+from .ranking import RankingIndex, RankKey, solved_at_ts
+from .scoring import dynamic_scoring
+
+# Per-category boards: one RankingIndex per challenge category, ranked by the
+# points a player holds in that category and their last solve in it. Kept in
+# step with the user table like the global board (and shifted with dynamic
+# values), so a category page is a bisect plus `limit` rows.
+DEFAULT_CATEGORY = "misc"
+
+
+def challenge_category(challenge: object) -> str:
+    """Normalized category of a challenge (`type`, then `category`, as the frontend reads it)."""
+    if not isinstance(challenge, dict):
+        return DEFAULT_CATEGORY
+    return str(challenge.get("type") or challenge.get("category") or DEFAULT_CATEGORY).strip().lower() or DEFAULT_CATEGORY
+
+
+def _read_categories() -> dict[str, str]:
+    try:
+        challenges = challenge_catalog.current().challenges
+    except (OSError, CatalogError):
+        return {}
+    return {key: challenge_category(challenge) for key, challenge in challenges.items()}
+
+
+class CategoryIndex:
+    """category -> board of that category's solvers, plus each user's per-category totals.
+
+    A user change only touches the boards of the categories they solved in
+    (before or after), and a dynamic value shift moves one entry on one board.
+    The category map is re-read whenever the user table is reindexed, which
+    happens when a new challenge catalog is loaded.
+    """
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._category_of: dict[str, str] = {}
+        self._boards: dict[str, RankingIndex] = {}
+        # username -> category -> [points, solved count, last solve ts]
+        self._totals: dict[str, dict[str, list]] = {}
+
+    def _user_totals(self, user: dict) -> dict[str, list]:
+        totals: dict[str, list] = {}
+        events = user.get("solve_events") or []
+        if not isinstance(events, list):
+            return totals
+        seen = set()
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            problem = str(event.get("problem") or "")
+            category = self._category_of.get(problem)
+            ts = solved_at_ts(event.get("solved_at"))
+            if category is None or ts is None or problem in seen:
+                continue
+            seen.add(problem)
+            value = dynamic_scoring.value(problem)
+            entry = totals.setdefault(category, [0, 0, ts])
+            entry[0] += int(event.get("score") or 0) if value is None else value
+            entry[1] += 1
+            entry[2] = max(entry[2], ts)
+        return totals
+
+    @staticmethod
+    def _key(username: str, entry: list) -> RankKey:
+        return -int(entry[0]), float(entry[2]), username
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        category_of = _read_categories()
+        with self._mutex:
+            self._category_of = category_of
+            self._totals = {}
+            keys: dict[str, dict[str, RankKey]] = {category: {} for category in set(category_of.values())}
+            admins: dict[str, set[str]] = {category: set() for category in keys}
+            for username, user in users.items():
+                if not isinstance(user, dict):
+                    continue
+                totals = self._user_totals(user)
+                if not totals:
+                    continue
+                self._totals[username] = totals
+                for category, entry in totals.items():
+                    keys[category][username] = self._key(username, entry)
+                    if user.get("role") == "admin":
+                        admins[category].add(username)
+            self._boards = {}
+            for category in keys:
+                board = RankingIndex()
+                board.replace(keys[category], admins[category])
+                self._boards[category] = board
+
+    def update(self, username: str, user: dict | None) -> None:
+        with self._mutex:
+            old = self._totals.pop(username, {})
+            new = self._user_totals(user) if user else {}
+            if new:
+                self._totals[username] = new
+            admin = bool(user and user.get("role") == "admin")
+            for category in set(old) | set(new):
+                board = self._boards.get(category)
+                if board is None:
+                    continue
+                entry = new.get(category)
+                board.put(username, self._key(username, entry) if entry else None, admin=admin)
+
+    def shift(self, username: str, problem: str, delta: int) -> None:
+        """Apply a dynamic value change of `problem` to a user who solved it."""
+        with self._mutex:
+            category = self._category_of.get(problem)
+            entry = self._totals.get(username, {}).get(category)
+            if entry is None:
+                return
+            entry[0] += int(delta)
+            self._boards[category].shift(username, delta)
+
+    def categories(self) -> list[str]:
+        with self._mutex:
+            return sorted(self._boards)
+
+    def category_of(self, problem: str) -> str | None:
+        with self._mutex:
+            return self._category_of.get(problem)
+
+    def page(
+        self,
+        category: str,
+        limit: int,
+        after: RankKey | None = None,
+        *,
+        include_admin: bool = False,
+    ) -> list[tuple[int, str, RankKey, int]]:
+        """(rank, username, key, solved count) rows of one category board; [] if it is unknown."""
+        with self._mutex:
+            board = self._boards.get(category)
+            totals = self._totals
+        if board is None:
+            return []
+        rows = board.page(limit, after, include_admin=include_admin)
+        with self._mutex:
+            return [
+                (rank, username, key, int((totals.get(username, {}).get(category) or [0, 0])[1]))
+                for rank, username, key in rows
+            ]
+
+
+category_index = CategoryIndex()
+
+
+__all__ = [
+    "CategoryIndex",
+    "DEFAULT_CATEGORY",
+    "category_index",
+    "challenge_category",
+]
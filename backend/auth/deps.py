@@ -1,8 +1,65 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
 from fastapi import HTTPException, Request
 
 from . import auth
 from ..core import token
 
+SESSION_CACHE_SIZE = int(os.environ.get("HEXACTF_SESSION_CACHE_SIZE", "4096"))
+_REQUEST_USER_ATTR = "hexactf_user"
+
+
+def _session_view(user: dict) -> tuple[str, str, str, str]:
+    return (
+        str(user.get("username") or ""),
+        str(user.get("role") or "user"),
+        str(user.get("status") or "approved"),
+        str(user.get("session_nonce") or ""),
+    )
+
+
+class SessionCache:
+    """LRU of verified tokens -> (payload, compact user view).
+
+    A hit skips the HMAC check and payload decode. Entries expire with the
+    token and are dropped as soon as the user's session_nonce, role or status
+    no longer match the cached view.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max(1, int(max_size))
+        self._entries: OrderedDict[str, tuple[dict, tuple[str, str, str, str]]] = OrderedDict()
+        self._mutex = threading.Lock()
+
+    def get(self, token_value: str) -> tuple[dict, tuple[str, str, str, str]] | None:
+        with self._mutex:
+            entry = self._entries.get(token_value)
+            if entry is None:
+                return None
+            exp = entry[0].get("exp")
+            if exp is not None and int(exp) < int(time.time()):
+                del self._entries[token_value]
+                return None
+            self._entries.move_to_end(token_value)
+            return entry
+
+    def put(self, token_value: str, payload: dict, view: tuple[str, str, str, str]) -> None:
+        with self._mutex:
+            self._entries[token_value] = (payload, view)
+            self._entries.move_to_end(token_value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, token_value: str) -> None:
+        with self._mutex:
+            self._entries.pop(token_value, None)
+
+
+session_cache = SessionCache(SESSION_CACHE_SIZE)
+
 
 def _has_bearer_auth(request: Request) -> bool:
     auth_header = request.headers.get("authorization") or ""
@@ -23,64 +80,65 @@ def require_csrf(request: Request) -> None:
             raise HTTPException(status_code=403, detail="CSRF token missing or invalid")
 
 
-def get_current_user(request: Request) -> dict:
+def _request_token(request: Request) -> str:
     auth_header = request.headers.get("authorization") or ""
-    token_value = ""
     if auth_header.lower().startswith("bearer "):
-        token_value = auth_header.split(" ", 1)[1].strip()
-    else:
-        token_value = request.cookies.get("hexactf_token") or ""
+        return auth_header.split(" ", 1)[1].strip()
+    return request.cookies.get("hexactf_token") or ""
+
+
+def _resolve_user(request: Request) -> dict:
+    # Resolve at most once per request (e.g. get_admin_user + route body).
+    cached_user = getattr(request.state, _REQUEST_USER_ATTR, None)
+    if cached_user is not None:
+        return cached_user
+
+    token_value = _request_token(request)
     if not token_value:
         raise HTTPException(status_code=401, detail="Authorization required")
-    ok, payload = token.verify_token(token_value)
-    if not ok:
-        raise HTTPException(status_code=401, detail=payload.get("error", "Invalid token"))
+
+    entry = session_cache.get(token_value)
+    if entry is not None:
+        payload, view = entry
+    else:
+        ok, payload = token.verify_token(token_value)
+        if not ok:
+            raise HTTPException(status_code=401, detail=payload.get("error", "Invalid token"))
+        view = None
     username = payload.get("sub")
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token payload")
+
     user = auth.get_user(username)
     if not user:
+        session_cache.discard(token_value)
         raise HTTPException(status_code=401, detail="User not found")
-    current_nonce = str(user.get("session_nonce") or "")
-    token_nonce = str(payload.get("sn") or "")
-    if current_nonce and token_nonce and current_nonce != token_nonce:
-        raise HTTPException(status_code=401, detail="다른 기기 또는 브라우저에서 다시 로그인되어 현재 세션이 종료되었습니다.")
-    if str(user.get("status") or "approved") != "approved":
-        raise HTTPException(status_code=403, detail="관리자 승인 대기 중입니다.")
-    auth.touch_user_activity(str(user.get("username") or username))
-    refreshed = auth.get_user(username)
-    if refreshed:
-        return refreshed
+
+    current_view = _session_view(user)
+    if view != current_view:
+        session_cache.discard(token_value)
+        current_nonce = str(user.get("session_nonce") or "")
+        token_nonce = str(payload.get("sn") or "")
+        if current_nonce and token_nonce and current_nonce != token_nonce:
+            raise HTTPException(status_code=401, detail="다른 기기 또는 브라우저에서 다시 로그인되어 현재 세션이 종료되었습니다.")
+        if str(user.get("status") or "approved") != "approved":
+            raise HTTPException(status_code=403, detail="관리자 승인 대기 중입니다.")
+        session_cache.put(token_value, payload, current_view)
+
+    auth.touch_user_activity(str(user.get("username") or username), role=user.get("role"))
+    setattr(request.state, _REQUEST_USER_ATTR, user)
     return user
 
 
-def get_optional_user(request: Request) -> dict | None:
-    auth_header = request.headers.get("authorization") or ""
-    token_value = ""
-    if auth_header.lower().startswith("bearer "):
-        token_value = auth_header.split(" ", 1)[1].strip()
-    else:
-        token_value = request.cookies.get("hexactf_token") or ""
-    if not token_value:
-        return None
+def get_current_user(request: Request) -> dict:
+    return _resolve_user(request)
 
-    ok, payload = token.verify_token(token_value)
-    if not ok:
-        return None
-    username = payload.get("sub")
-    if not username:
-        return None
-    user = auth.get_user(username)
-    if not user:
-        return None
-    current_nonce = str(user.get("session_nonce") or "")
-    token_nonce = str(payload.get("sn") or "")
-    if current_nonce and token_nonce and current_nonce != token_nonce:
-        return None
-    if str(user.get("status") or "approved") != "approved":
+
+def get_optional_user(request: Request) -> dict | None:
+    try:
+        return _resolve_user(request)
+    except HTTPException:
         return None
-    auth.touch_user_activity(str(user.get("username") or username))
-    return auth.get_user(username) or user
 
 
 def get_admin_user(request: Request) -> dict:
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import UTC, datetime
+
+# In-memory presence: last-seen per user plus per-second buckets so
+# "active in the last N seconds" is answered without scanning the user table.
+PRESENCE_FLUSH_SECONDS = int(os.environ.get("HEXACTF_PRESENCE_FLUSH_SECONDS", "30"))
+
+
+def _to_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z")
+
+
+def _from_iso(raw: object) -> float | None:
+    value = str(raw or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class PresenceTracker:
+    """Last-seen table with O(1) touch and bucketed active-user counts.
+
+    Each user is counted in exactly one bucket (the second of their latest
+    activity), split into non-admin and admin counters. Touched users are
+    remembered as dirty until `drain_dirty` hands them to the flusher.
+    """
+
+    def __init__(self, bucket_seconds: int = 1) -> None:
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self._mutex = threading.Lock()
+        self._last_seen: dict[str, float] = {}
+        self._is_admin: dict[str, bool] = {}
+        self._buckets: dict[int, list[int]] = {}
+        self._durable: dict[str, float] = {}
+        self._dirty: set[str] = set()
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def _move(self, username: str, ts: float, is_admin: bool) -> None:
+        old_ts = self._last_seen.get(username)
+        if old_ts is not None:
+            old_bucket = self._bucket(old_ts)
+            counts = self._buckets.get(old_bucket)
+            if counts is not None:
+                counts[int(self._is_admin.get(username, False))] -= 1
+                if counts[0] <= 0 and counts[1] <= 0:
+                    del self._buckets[old_bucket]
+        self._last_seen[username] = ts
+        self._is_admin[username] = is_admin
+        self._buckets.setdefault(self._bucket(ts), [0, 0])[int(is_admin)] += 1
+
+    def touch(self, username: str, *, is_admin: bool = False, min_flush_interval: float = 0, now: float | None = None) -> float:
+        ts = time.time() if now is None else float(now)
+        with self._mutex:
+            self._move(username, ts, is_admin)
+            if ts - self._durable.get(username, 0.0) >= min_flush_interval:
+                self._dirty.add(username)
+        return ts
+
+    def observe(self, username: str, last_seen: object, *, is_admin: bool = False) -> None:
+        """Seed from durable storage (e.g. values flushed by another worker)."""
+        ts = _from_iso(last_seen)
+        if ts is None:
+            return
+        with self._mutex:
+            self._durable[username] = max(ts, self._durable.get(username, 0.0))
+            current = self._last_seen.get(username)
+            if current is None or ts > current:
+                self._move(username, ts, is_admin)
+
+    def forget(self, username: str) -> None:
+        with self._mutex:
+            ts = self._last_seen.pop(username, None)
+            is_admin = self._is_admin.pop(username, False)
+            self._durable.pop(username, None)
+            self._dirty.discard(username)
+            if ts is None:
+                return
+            counts = self._buckets.get(self._bucket(ts))
+            if counts is not None:
+                counts[int(is_admin)] -= 1
+                if counts[0] <= 0 and counts[1] <= 0:
+                    del self._buckets[self._bucket(ts)]
+
+    def last_seen(self, username: str) -> float | None:
+        return self._last_seen.get(username)
+
+    def last_seen_iso(self, username: str) -> str | None:
+        ts = self._last_seen.get(username)
+        return _to_iso(ts) if ts is not None else None
+
+    def count_active(self, within_seconds: int, *, include_admin: bool = True, now: float | None = None) -> int:
+        ts = time.time() if now is None else float(now)
+        first = self._bucket(ts - max(1, int(within_seconds)))
+        last = self._bucket(ts)
+        with self._mutex:
+            if last - first + 1 <= len(self._buckets):
+                buckets = (self._buckets.get(idx) for idx in range(first, last + 1))
+            else:
+                buckets = (counts for idx, counts in self._buckets.items() if first <= idx <= last)
+            total = 0
+            for counts in buckets:
+                if counts is None:
+                    continue
+                total += counts[0] + (counts[1] if include_admin else 0)
+            return total
+
+    def drain_dirty(self) -> dict[str, str]:
+        with self._mutex:
+            dirty = {
+                username: _to_iso(self._last_seen[username])
+                for username in self._dirty
+                if username in self._last_seen
+            }
+            for username in dirty:
+                self._durable[username] = self._last_seen[username]
+            self._dirty.clear()
+            return dirty
+
+    def restore_dirty(self, usernames: set[str] | dict[str, str]) -> None:
+        with self._mutex:
+            self._dirty.update(name for name in usernames if name in self._last_seen)
+
+
+presence = PresenceTracker()
+
+
+__all__ = ["PRESENCE_FLUSH_SECONDS", "PresenceTracker", "presence"]
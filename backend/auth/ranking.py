@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import base64
+import json
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Callable
+
+from .scoring import dynamic_scoring
+
+# Scoreboard order: higher score first, then whoever reached it earlier, then username.
+RankKey = tuple[int, float, str]
+NO_SOLVE_TS = float("inf")
+
+
+def solved_at_ts(raw: object) -> float | None:
+    value = str(raw or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def last_solve_ts(user: dict) -> float:
+    events = user.get("solve_events") or []
+    latest = None
+    if isinstance(events, list):
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            ts = solved_at_ts(event.get("solved_at"))
+            if ts is not None and (latest is None or ts > latest):
+                latest = ts
+    return NO_SOLVE_TS if latest is None else latest
+
+
+def rank_key(username: str, user: dict, adjustment: int = 0) -> RankKey:
+    return -(int(user.get("score", 0) or 0) + adjustment), last_solve_ts(user), username
+
+
+def _summary_contribution(user: dict, key: RankKey) -> tuple[int, int] | None:
+    """(solves, effective score) a user adds to the summary totals, None if not counted."""
+    if user.get("role") == "admin" or str(user.get("status") or "approved") != "approved":
+        return None
+    solved = user.get("solved_problems") or []
+    return (len(solved) if isinstance(solved, list) else 0), -key[0]
+
+
+class RankingIndex:
+    """Sorted list of rank keys kept in step with the user table.
+
+    Lookups are a bisect (O(log n)); inserts and removals are a bisect plus a
+    list memmove, which stays in the microseconds for tens of thousands of
+    players. Admins stay in the index and are skipped on read, so one index
+    serves both the public board and the admin view. Scores include the
+    `adjustment` (dynamic challenge values), which `shift` moves in place.
+
+    The same listeners keep the scoreboard summary totals (approved
+    non-admin players, their solves and their scores), so `totals` is O(1).
+    """
+
+    def __init__(self, adjustment: Callable[[str], int] | None = None) -> None:
+        self._mutex = threading.Lock()
+        self._keys: list[RankKey] = []
+        self._key_of: dict[str, RankKey] = {}
+        self._admins: set[str] = set()
+        self._adjustment = adjustment or (lambda username: 0)
+        # username -> (solves, score) for every player counted in the totals.
+        self._counted: dict[str, tuple[int, int]] = {}
+        self._total_solves = 0
+        self._total_score = 0
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        keys = {}
+        admins = set()
+        counted = {}
+        for username, user in users.items():
+            if not isinstance(user, dict):
+                continue
+            keys[username] = rank_key(username, user, self._adjustment(username))
+            if user.get("role") == "admin":
+                admins.add(username)
+            contribution = _summary_contribution(user, keys[username])
+            if contribution is not None:
+                counted[username] = contribution
+        self.replace(keys, admins)
+        with self._mutex:
+            self._counted = counted
+            self._total_solves = sum(solves for solves, _ in counted.values())
+            self._total_score = sum(score for _, score in counted.values())
+
+    def update(self, username: str, user: dict | None) -> None:
+        if user is None:
+            self.put(username, None)
+            self._count(username, None)
+            return
+        key = rank_key(username, user, self._adjustment(username))
+        self.put(username, key, admin=user.get("role") == "admin")
+        self._count(username, _summary_contribution(user, key))
+
+    def _count(self, username: str, contribution: tuple[int, int] | None) -> None:
+        with self._mutex:
+            old = self._counted.pop(username, None)
+            if old is not None:
+                self._total_solves -= old[0]
+                self._total_score -= old[1]
+            if contribution is not None:
+                self._counted[username] = contribution
+                self._total_solves += contribution[0]
+                self._total_score += contribution[1]
+
+    def totals(self) -> tuple[int, int, int]:
+        """(players, solves, score) over approved non-admin users."""
+        with self._mutex:
+            return len(self._counted), self._total_solves, self._total_score
+
+    def replace(self, keys: dict[str, RankKey], admins: set[str]) -> None:
+        """Swap in a whole board (for boards ranked by something other than the user's total)."""
+        ordered = sorted(keys.values())
+        with self._mutex:
+            self._key_of = keys
+            self._keys = ordered
+            self._admins = admins
+
+    def put(self, username: str, key: RankKey | None, *, admin: bool = False) -> None:
+        """Place `username` at `key`; None removes them."""
+        with self._mutex:
+            self._remove_unlocked(username)
+            self._admins.discard(username)
+            if key is None:
+                return
+            self._key_of[username] = key
+            insort(self._keys, key)
+            if admin:
+                self._admins.add(username)
+
+    def shift(self, username: str, delta: int) -> None:
+        """Move `username` by a score change that did not come from their own record."""
+        with self._mutex:
+            old = self._remove_unlocked(username)
+            if old is None:
+                return
+            key = (old[0] - int(delta), old[1], old[2])
+            self._key_of[username] = key
+            insort(self._keys, key)
+            counted = self._counted.get(username)
+            if counted is not None:
+                self._counted[username] = (counted[0], counted[1] + int(delta))
+                self._total_score += int(delta)
+
+    def _remove_unlocked(self, username: str) -> RankKey | None:
+        old = self._key_of.pop(username, None)
+        if old is not None:
+            idx = bisect_left(self._keys, old)
+            if idx < len(self._keys) and self._keys[idx] == old:
+                del self._keys[idx]
+        return old
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def count(self, *, include_admin: bool = False) -> int:
+        with self._mutex:
+            return len(self._keys) if include_admin else len(self._keys) - len(self._admins)
+
+    def rank(self, username: str, *, include_admin: bool = False) -> int | None:
+        """1-based position of `username`, or None if absent (or an excluded admin)."""
+        with self._mutex:
+            key = self._key_of.get(username)
+            if key is None or (not include_admin and username in self._admins):
+                return None
+            position = bisect_left(self._keys, key)
+            if not include_admin:
+                position -= sum(1 for admin in self._admins if self._key_of[admin] < key)
+            return position + 1
+
+    def page(self, limit: int, after: RankKey | None = None, *, include_admin: bool = False) -> list[tuple[int, str, RankKey]]:
+        """Up to `limit` (rank, username, key) rows in board order, after the `after` key.
+
+        O(log n + limit + admins): the start is found by bisect and admins ahead
+        of it are subtracted from the rank instead of walking the prefix.
+        """
+        rows: list[tuple[int, str, RankKey]] = []
+        with self._mutex:
+            keys = self._keys
+            start = 0
+            if after is not None:
+                after = tuple(after)
+                start = bisect_left(keys, after)
+                if start < len(keys) and keys[start] == after:
+                    start += 1
+            position = start
+            if not include_admin and start < len(keys):
+                position -= sum(1 for admin in self._admins if self._key_of[admin] < keys[start])
+            for idx in range(start, len(keys)):
+                if len(rows) >= limit:
+                    break
+                key = keys[idx]
+                if not include_admin and key[2] in self._admins:
+                    continue
+                position += 1
+                rows.append((position, key[2], key))
+        return rows
+
+    def key_of(self, username: str) -> RankKey | None:
+        return self._key_of.get(username)
+
+
+def encode_cursor(key: RankKey) -> str:
+    score, ts, username = key
+    raw = json.dumps([score, None if ts == NO_SOLVE_TS else ts, username], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> RankKey:
+    """Inverse of `encode_cursor`; raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, ts, username = json.loads(raw)
+        return int(score), NO_SOLVE_TS if ts is None else float(ts), str(username)
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+ranking_index = RankingIndex(dynamic_scoring.adjustment)
+
+
+__all__ = [
+    "NO_SOLVE_TS",
+    "RankKey",
+    "RankingIndex",
+    "decode_cursor",
+    "encode_cursor",
+    "last_solve_ts",
+    "rank_key",
+    "ranking_index",
+    "solved_at_ts",
+]
@@ -1,19 +1,27 @@
+import csv
+import io
 import json
+import os
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from . import auth
 from .deps import get_admin_user
 from .deps import require_csrf
 from ..core import models
-from ..core.config import CHALLENGE_FILE
+from ..core.challenge_catalog import challenge_catalog
 from ..main.instance_store import ACTIVE_INSTANCE_STATUSES, list_instances_snapshot, remove_instance, try_mark_stopping
 from ..main.instances_service import _stop_container
 from ..main.dynamic_flags import cleanup_runtime_flag_file
-from ..main.settings_service import get_ranking_settings, get_user_instance_limit, set_ranking_open, set_user_instance_limit, get_challenges_settings, set_challenges_visibility, set_ranking_schedule, is_challenges_visible, is_ranking_visible
+from ..main.settings_service import get_ranking_settings, get_user_instance_limit, set_ranking_open, set_user_instance_limit, get_challenges_settings, set_challenges_visibility, set_ranking_schedule, is_challenges_visible, is_ranking_visible, get_team_instance_limits, set_team_instance_limit
 
 router = APIRouter()
 
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("HEXACTF_BULK_IMPORT_MAX_ROWS", "5000"))
+BULK_IMPORT_MAX_BYTES = int(os.environ.get("HEXACTF_BULK_IMPORT_MAX_BYTES", str(4 * 1024 * 1024)))
+BULK_IMPORT_FIELDS = ("username", "password", "display_name", "role")
+
 
 @router.get("/api/admin/users")
 def list_users(request: Request):
@@ -66,6 +74,8 @@ def reset_user_password(username: str, req: models.PasswordResetRequest, request
         user = auth.reset_password(username, req.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except auth.PasswordHashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     return {
         "status": "ok",
         "user": auth.public_user(user)
@@ -108,6 +118,101 @@ def reject_pending_user(username: str, request: Request):
     return {"status": "ok", "username": username}
 
 
+def _parse_import_rows(payload: bytes, content_type: str, fmt: str | None) -> list[dict]:
+    try:
+        text = payload.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="import must be UTF-8 encoded")
+
+    fmt = (fmt or "").strip().lower()
+    if not fmt:
+        fmt = "ndjson" if "json" in content_type or text.lstrip().startswith("{") else "csv"
+    if fmt not in {"csv", "ndjson"}:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+
+    rows: list[dict] = []
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "username" not in reader.fieldnames or "password" not in reader.fieldnames:
+            raise HTTPException(status_code=400, detail="CSV header must include username and password")
+        for record in reader:
+            rows.append({key: (record.get(key) or "").strip() for key in BULK_IMPORT_FIELDS})
+    else:
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail=f"line {line_no}: invalid JSON")
+            if not isinstance(record, dict):
+                raise HTTPException(status_code=400, detail=f"line {line_no}: expected an object")
+            rows.append({key: str(record.get(key) or "").strip() for key in BULK_IMPORT_FIELDS})
+
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"at most {BULK_IMPORT_MAX_ROWS} rows per import")
+    return rows
+
+
+def _require_admin_write(request: Request) -> None:
+    get_admin_user(request)
+    require_csrf(request)
+
+
+async def _read_capped_body(request: Request, limit: int) -> bytes:
+    too_large = HTTPException(status_code=413, detail=f"import must be at most {limit} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise too_large
+    chunks: list[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _bulk_import(request: Request, payload: bytes, fmt: str | None, approve: bool) -> dict:
+    rows = _parse_import_rows(payload, request.headers.get("content-type") or "", fmt)
+    try:
+        results = auth.bulk_create_users(rows, approve=approve)
+    except auth.PasswordHashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {
+        "status": "ok",
+        "created": sum(1 for row in results if row["status"] == "created"),
+        "failed": sum(1 for row in results if row["status"] != "created"),
+        "results": results,
+    }
+
+
+@router.post("/api/admin/users/bulk-import")
+async def bulk_import_users(request: Request, format: str | None = None, approve: bool = True):
+    # Check the caller before reading anything, then read the raw body (CSV or
+    # NDJSON) with a size cap; the work itself runs off the event loop.
+    await run_in_threadpool(_require_admin_write, request)
+    payload = await _read_capped_body(request, BULK_IMPORT_MAX_BYTES)
+    return await run_in_threadpool(_bulk_import, request, payload, format, approve)
+
+
+@router.post("/api/admin/users/bulk")
+def bulk_user_action(req: models.BulkUserActionRequest, request: Request):
+    get_admin_user(request)
+    require_csrf(request)
+    try:
+        results = auth.bulk_user_action(req.action, req.usernames, role=req.role)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "ok",
+        "updated": sum(1 for row in results if row["status"] == "ok"),
+        "failed": sum(1 for row in results if row["status"] != "ok"),
+        "results": results,
+    }
+
+
 @router.post("/api/admin/scoreboard/reset")
 def reset_scoreboard(request: Request):
     get_admin_user(request)
@@ -119,18 +224,43 @@ def reset_scoreboard(request: Request):
     }
 
 
+@router.get("/api/admin/teams")
+def list_teams(request: Request):
+    get_admin_user(request)
+    limits = get_team_instance_limits()
+    teams = auth.list_teams(include_code=True)
+    for team in teams:
+        team["instance_limit"] = limits.get(team["team"])
+        team["has_instance_limit"] = team["team"] in limits
+    return {"status": "ok", "teams": teams}
+
+
+@router.post("/api/admin/teams/{team}/instance-limit")
+def update_team_instance_limit(team: str, req: models.TeamInstanceLimitRequest, request: Request):
+    get_admin_user(request)
+    require_csrf(request)
+    if auth.get_team(team) is None:
+        raise HTTPException(status_code=404, detail="team not found")
+    try:
+        limit = set_team_instance_limit(team, req.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "team": team.strip().lower(), "instance_limit": limit}
+
+
 @router.get("/api/admin/settings")
 def get_settings(request: Request):
     get_admin_user(request)
     ranking = get_ranking_settings()
     # Load schedule fields not in ranking dict
     from ..main.settings_service import SETTINGS_LOCK_FILE
-    from ..core.storage_utils import exclusive_lock
+    from ..core.storage_utils import shared_lock
     from ..main.settings_store import load_settings_unlocked
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         raw = load_settings_unlocked()
     ranking["ranking_open_at"] = raw.get("ranking_open_at")
     ranking["ranking_close_at"] = raw.get("ranking_close_at")
+    ranking["ranking_freeze_at"] = raw.get("ranking_freeze_at")
     challenges = get_challenges_settings()
     return {
         "status": "ok",
@@ -140,6 +270,7 @@ def get_settings(request: Request):
             "ranking_closed_message": ranking["ranking_closed_message"],
             "ranking_open_at": ranking.get("ranking_open_at"),
             "ranking_close_at": ranking.get("ranking_close_at"),
+            "ranking_freeze_at": ranking.get("ranking_freeze_at"),
             "challenges_open": challenges["challenges_open"],
             "challenges_open_at": challenges.get("challenges_open_at"),
             "challenges_close_at": challenges.get("challenges_close_at"),
@@ -165,10 +296,11 @@ def update_settings(req: models.SettingsUpdateRequest, request: Request):
             )
 
         # Ranking schedule
-        if req.ranking_open_at is not None or req.ranking_close_at is not None:
+        if req.ranking_open_at is not None or req.ranking_close_at is not None or req.ranking_freeze_at is not None:
             ranking_sched = set_ranking_schedule(
                 ranking_open_at=req.ranking_open_at if req.ranking_open_at is not None else ...,
                 ranking_close_at=req.ranking_close_at if req.ranking_close_at is not None else ...,
+                ranking_freeze_at=req.ranking_freeze_at if req.ranking_freeze_at is not None else ...,
             )
 
         # Challenge visibility
@@ -188,9 +320,9 @@ def update_settings(req: models.SettingsUpdateRequest, request: Request):
     challenges = get_challenges_settings()
     ranking = get_ranking_settings()
     from ..main.settings_service import SETTINGS_LOCK_FILE
-    from ..core.storage_utils import exclusive_lock
+    from ..core.storage_utils import shared_lock
     from ..main.settings_store import load_settings_unlocked
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         raw = load_settings_unlocked()
 
     return {
@@ -201,6 +333,7 @@ def update_settings(req: models.SettingsUpdateRequest, request: Request):
             "ranking_closed_message": ranking["ranking_closed_message"],
             "ranking_open_at": raw.get("ranking_open_at"),
             "ranking_close_at": raw.get("ranking_close_at"),
+            "ranking_freeze_at": raw.get("ranking_freeze_at"),
             "challenges_open": challenges["challenges_open"],
             "challenges_open_at": challenges.get("challenges_open_at"),
             "challenges_close_at": challenges.get("challenges_close_at"),
@@ -217,13 +350,8 @@ def user_detail(username: str, request: Request):
         raise HTTPException(status_code=404, detail="user not found")
 
     public = auth.public_user(user)
-    rows = auth.get_scoreboard(limit=100000, include_admin=True)
-    rank = None
-    for row in rows:
-        row_username = str(row.get("username") or "").strip().lower()
-        if row_username == str(public.get("username") or "").strip().lower():
-            rank = row.get("rank")
-            break
+    entry = auth.get_scoreboard_entry(str(public.get("username") or ""), include_admin=True)
+    rank = entry.get("rank") if entry else None
 
     return {
         "status": "ok",
@@ -241,14 +369,8 @@ def admin_summary(request: Request):
     ranking = get_ranking_settings()
     challenges_vis, _ = is_challenges_visible()
     rankings_vis, _ = is_ranking_visible()
-    challenge_count = 0
-    try:
-        with open(CHALLENGE_FILE, "r", encoding="utf-8") as f:
-            challenge_data = json.load(f)
-        if isinstance(challenge_data, dict):
-            challenge_count = len(challenge_data)
-    except (FileNotFoundError, json.JSONDecodeError):
-        challenge_count = 0
+    # A rejected edit of challenges.json shows up here; the last good catalog keeps serving.
+    catalog = challenge_catalog.status()
 
     return {
         "status": "ok",
@@ -263,7 +385,8 @@ def admin_summary(request: Request):
             ),
             "total_score": sum(int(u.get("score") or 0) for u in users),
             "total_solves": sum(len(u.get("solved_problems") or []) for u in users),
-            "challenge_count": challenge_count,
+            "challenge_count": catalog["challenge_count"],
+            "challenge_catalog": catalog,
             "user_instance_limit": get_user_instance_limit(),
             "ranking_open": ranking["ranking_open"],
             "ranking_closed_message": ranking["ranking_closed_message"],
@@ -86,6 +86,8 @@ def register(req: models.RegisterRequest, request: Request):
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except auth.PasswordHashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
 
     return JSONResponse({
         "status": "ok",
@@ -98,7 +100,10 @@ def register(req: models.RegisterRequest, request: Request):
 @router.post("/api/auth/login")
 def login(req: models.LoginRequest, request: Request):
     require_same_origin(request)
-    user, reason = auth.authenticate_user(req.username, req.password)
+    try:
+        user, reason = auth.authenticate_user(req.username, req.password)
+    except auth.PasswordHashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     if not user:
         if reason == "pending":
             raise HTTPException(status_code=403, detail="관리자 승인 대기 중입니다.")
@@ -144,6 +149,8 @@ def change_password(req: models.ChangePasswordRequest, request: Request):
         auth.change_own_password(user["username"], req.current_password, req.new_password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except auth.PasswordHashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     return JSONResponse({"status": "ok", "message": "비밀번호가 변경되었습니다."})
 
 @router.post("/api/auth/logout")
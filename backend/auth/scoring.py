@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import math
+import threading
+from typing import Callable
+
+from ..core.challenge_catalog import Catalog, CatalogError, challenge_catalog
+
+# Dynamic (decaying) challenge values. A challenge with "scoring": "dynamic" is
+# worth `initial` until its second solve, then decays along CTFd's curve and
+# reaches `minimum` at `decay` solves. Every solver holds the current value:
+# persisted scores keep the value at solve time, and the difference is tracked
+# here per user, kept in step with the user table by the repository listeners.
+DEFAULT_DYNAMIC_DECAY = 30
+
+DynamicConfig = tuple[int, int, int]
+
+
+def dynamic_config(challenge: object) -> DynamicConfig | None:
+    """(initial, minimum, decay) for a dynamic challenge, None for a static one."""
+    if not isinstance(challenge, dict) or str(challenge.get("scoring") or "").strip().lower() != "dynamic":
+        return None
+    try:
+        initial = int(challenge.get("initial") or challenge.get("score") or 0)
+        minimum = int(challenge.get("minimum") if challenge.get("minimum") is not None else initial // 10)
+        decay = int(challenge.get("decay") or DEFAULT_DYNAMIC_DECAY)
+    except (TypeError, ValueError):
+        return None
+    return initial, max(0, min(minimum, initial)), max(1, decay)
+
+
+def dynamic_value(config: DynamicConfig, solvers: int) -> int:
+    initial, minimum, decay = config
+    # The first solver does not lower the value.
+    solves = max(0, int(solvers) - 1)
+    value = ((minimum - initial) / (decay**2)) * (solves**2) + initial
+    return max(minimum, math.ceil(value))
+
+
+def _current_catalog() -> Catalog | None:
+    try:
+        return challenge_catalog.current()
+    except (OSError, CatalogError):
+        return None
+
+
+def _read_configs(catalog: Catalog | None) -> dict[str, DynamicConfig]:
+    configs = {}
+    for key, challenge in (catalog.challenges if catalog else {}).items():
+        config = dynamic_config(challenge)
+        if config is not None:
+            configs[key] = config
+    return configs
+
+
+class DynamicScoring:
+    """Current dynamic values plus each user's adjustment (current minus recorded points).
+
+    A solve changes the challenge value in O(1); the delta is then pushed to
+    that challenge's existing solvers only (its solver index), and each shift
+    is reported to the shift listeners so the ranking index can reposition
+    the user. Admin solves are adjusted too but do not count towards the decay.
+    """
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._catalog_version = 0
+        self._catalog_digest = "missing"
+        self._configs: dict[str, DynamicConfig] = {}
+        self._counts: dict[str, int] = {}
+        self._values: dict[str, int] = {}
+        self._solvers: dict[str, dict[str, int]] = {}
+        self._user_state: dict[str, tuple[bool, dict[str, int]]] = {}
+        self._adjust: dict[str, int] = {}
+        self._shift_listeners: list[Callable[[str, str, int], None]] = []
+
+    def add_shift_listener(self, listener: Callable[[str, str, int], None]) -> None:
+        """Called with (username, problem, delta) whenever another user's solve moves their score."""
+        self._shift_listeners.append(listener)
+
+    def configs_stale(self) -> bool:
+        catalog = _current_catalog()
+        return (catalog.version if catalog else 0) != self._catalog_version
+
+    def version(self) -> str:
+        """Version of the scoring rules in effect (the digest of the catalog they were read from)."""
+        with self._mutex:
+            return self._catalog_digest
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        catalog = _current_catalog()
+        configs = _read_configs(catalog)
+        with self._mutex:
+            self._catalog_version = catalog.version if catalog else 0
+            self._catalog_digest = catalog.digest if catalog else "missing"
+            self._configs = configs
+            self._counts = {}
+            self._values = {}
+            self._solvers = {}
+            self._user_state = {}
+            self._adjust = {}
+            for username, user in users.items():
+                if isinstance(user, dict):
+                    self._add_user(username, user)
+            for problem, config in configs.items():
+                self._values[problem] = dynamic_value(config, self._counts.get(problem, 0))
+            for username, (_, solves) in self._user_state.items():
+                self._adjust[username] = self._adjustment_for(solves)
+
+    def update(self, username: str, user: dict | None) -> None:
+        shifts: list[tuple[str, str, int]] = []
+        with self._mutex:
+            old_admin, old_solves = self._user_state.get(username, (False, {}))
+            new_admin = bool(user and user.get("role") == "admin")
+            new_solves = self._dynamic_solves(user) if user else {}
+            if old_admin == new_admin and old_solves == new_solves and (user is not None or username not in self._user_state):
+                return
+            self._remove_user(username)
+            if user is not None:
+                self._add_user(username, user)
+            for problem in set(old_solves) | set(new_solves):
+                value = dynamic_value(self._configs[problem], self._counts.get(problem, 0))
+                delta = value - self._values.get(problem, value)
+                self._values[problem] = value
+                if not delta:
+                    continue
+                for solver in self._solvers.get(problem, {}):
+                    if solver != username:
+                        self._adjust[solver] = self._adjust.get(solver, 0) + delta
+                        shifts.append((solver, problem, delta))
+            if user is None:
+                self._adjust.pop(username, None)
+            else:
+                self._adjust[username] = self._adjustment_for(new_solves)
+        for solver, problem, delta in shifts:
+            for listener in self._shift_listeners:
+                listener(solver, problem, delta)
+
+    def _dynamic_solves(self, user: dict) -> dict[str, int]:
+        events = user.get("solve_events") or []
+        solves = {}
+        if isinstance(events, list):
+            for event in events:
+                if isinstance(event, dict) and str(event.get("problem") or "") in self._configs:
+                    solves.setdefault(str(event["problem"]), int(event.get("score") or 0))
+        return solves
+
+    def _add_user(self, username: str, user: dict) -> None:
+        admin = user.get("role") == "admin"
+        solves = self._dynamic_solves(user)
+        self._user_state[username] = (admin, solves)
+        for problem, points in solves.items():
+            self._solvers.setdefault(problem, {})[username] = points
+            if not admin:
+                self._counts[problem] = self._counts.get(problem, 0) + 1
+
+    def _remove_user(self, username: str) -> None:
+        admin, solves = self._user_state.pop(username, (False, {}))
+        for problem in solves:
+            solvers = self._solvers.get(problem)
+            if solvers is not None:
+                solvers.pop(username, None)
+            if not admin:
+                self._counts[problem] = self._counts.get(problem, 0) - 1
+
+    def _adjustment_for(self, solves: dict[str, int]) -> int:
+        return sum(self._values[problem] - points for problem, points in solves.items())
+
+    def adjustment(self, username: str) -> int:
+        with self._mutex:
+            return self._adjust.get(username, 0)
+
+    def values(self) -> dict[str, int]:
+        """problem -> current value, for dynamic challenges only."""
+        with self._mutex:
+            return dict(self._values)
+
+    def value(self, problem: str) -> int | None:
+        with self._mutex:
+            return self._values.get(problem)
+
+    def values_for(self, counts: dict[str, int]) -> dict[str, int]:
+        """Dynamic values given non-admin solver `counts` (e.g. as they stood at some past time)."""
+        with self._mutex:
+            configs = dict(self._configs)
+        return {problem: dynamic_value(config, counts.get(problem, 0)) for problem, config in configs.items()}
+
+
+dynamic_scoring = DynamicScoring()
+
+
+__all__ = [
+    "DEFAULT_DYNAMIC_DECAY",
+    "DynamicScoring",
+    "dynamic_config",
+    "dynamic_scoring",
+    "dynamic_value",
+]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from .ranking import NO_SOLVE_TS, solved_at_ts
+
+# Per-challenge solve counters and first blood, kept in step with the user table
+# (see UserRepository load/change listeners) so challenge listings never walk users.
+
+
+def _solve_times(user: dict) -> dict[str, float]:
+    """problem -> solve timestamp for every solved problem (inf if the event is missing)."""
+    solved = user.get("solved_problems") or []
+    if not isinstance(solved, list):
+        return {}
+    times = {str(problem): NO_SOLVE_TS for problem in solved if str(problem or "").strip()}
+    events = user.get("solve_events") or []
+    if isinstance(events, list):
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            problem = str(event.get("problem") or "")
+            if problem in times:
+                ts = solved_at_ts(event.get("solved_at"))
+                if ts is not None and ts < times[problem]:
+                    times[problem] = ts
+    return times
+
+
+class SolveIndex:
+    """problem -> {solver: solved_at} for players, plus admin solve counts.
+
+    Updates diff the user's previous solve set against the new one, so a solve
+    costs O(1) and a reset or delete costs O(solves of that user). First blood
+    is the earliest non-admin solver and is recomputed only when it leaves.
+    Each problem's solvers are also kept as a sorted (solved_at, username)
+    list, so solver pages are a bisect away.
+    """
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._solvers: dict[str, dict[str, float]] = {}
+        self._order: dict[str, list[tuple[float, str]]] = {}
+        self._admin_counts: dict[str, int] = {}
+        self._first_blood: dict[str, tuple[float, str]] = {}
+        self._user_state: dict[str, tuple[bool, dict[str, float]]] = {}
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        with self._mutex:
+            self._solvers = {}
+            self._order = {}
+            self._admin_counts = {}
+            self._first_blood = {}
+            self._user_state = {}
+            for username, user in users.items():
+                if isinstance(user, dict):
+                    self._apply(username, user)
+
+    def update(self, username: str, user: dict | None) -> None:
+        with self._mutex:
+            self._apply(username, user)
+
+    def _apply(self, username: str, user: dict | None) -> None:
+        old_admin, old_times = self._user_state.pop(username, (False, {}))
+        new_admin = bool(user and user.get("role") == "admin")
+        new_times = _solve_times(user) if user else {}
+
+        for problem, ts in old_times.items():
+            if old_admin == new_admin and new_times.get(problem) == ts:
+                continue
+            if old_admin:
+                remaining = self._admin_counts.get(problem, 0) - 1
+                if remaining > 0:
+                    self._admin_counts[problem] = remaining
+                else:
+                    self._admin_counts.pop(problem, None)
+                continue
+            solvers = self._solvers.get(problem)
+            if solvers is None:
+                continue
+            solvers.pop(username, None)
+            order = self._order.get(problem, [])
+            idx = bisect_left(order, (ts, username))
+            if idx < len(order) and order[idx] == (ts, username):
+                del order[idx]
+            if not solvers:
+                del self._solvers[problem]
+                self._order.pop(problem, None)
+                self._first_blood.pop(problem, None)
+            elif self._first_blood.get(problem, (0, ""))[1] == username:
+                self._first_blood[problem] = min((solved_at, name) for name, solved_at in solvers.items())
+
+        for problem, ts in new_times.items():
+            if old_admin == new_admin and old_times.get(problem) == ts:
+                continue
+            if new_admin:
+                self._admin_counts[problem] = self._admin_counts.get(problem, 0) + 1
+                continue
+            self._solvers.setdefault(problem, {})[username] = ts
+            insort(self._order.setdefault(problem, []), (ts, username))
+            current = self._first_blood.get(problem)
+            if current is None or (ts, username) < current:
+                self._first_blood[problem] = (ts, username)
+
+        if user is not None:
+            self._user_state[username] = (new_admin, new_times)
+
+    def counts(self, *, include_admin: bool = False) -> dict[str, int]:
+        with self._mutex:
+            counts = {problem: len(solvers) for problem, solvers in self._solvers.items()}
+            if include_admin:
+                for problem, count in self._admin_counts.items():
+                    counts[problem] = counts.get(problem, 0) + count
+            return counts
+
+    def count(self, problem: str) -> int:
+        with self._mutex:
+            return len(self._solvers.get(problem, ()))
+
+    def solvers(
+        self,
+        problem: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+        *,
+        until: float | None = None,
+    ) -> list[tuple[int, str, float]]:
+        """Up to `limit` non-admin solvers of `problem` as (position, username, solved_at ts).
+
+        Earliest first, starting after the `after` (solved_at, username) key and
+        stopping at solves later than `until`; O(log n + limit).
+        """
+        with self._mutex:
+            order = self._order.get(problem) or []
+            start = bisect_right(order, tuple(after)) if after is not None else 0
+            stop = len(order) if until is None else bisect_right(order, (until, "\U0010ffff"))
+            return [
+                (position + 1, order[position][1], order[position][0])
+                for position in range(start, min(stop, start + max(0, int(limit))))
+            ]
+
+    def first_bloods(self) -> dict[str, tuple[str, float]]:
+        """problem -> (username, solved_at ts) of the first non-admin solver."""
+        with self._mutex:
+            return {problem: (name, ts) for problem, (ts, name) in self._first_blood.items()}
+
+
+solve_index = SolveIndex()
+
+
+__all__ = ["SolveIndex", "solve_index"]
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+from datetime import UTC, datetime
+
+from .ranking import NO_SOLVE_TS, RankingIndex, RankKey, solved_at_ts
+from .scoring import dynamic_scoring
+from .timeline import Series
+
+# Team aggregates for the team scoreboard. Membership is the `team` field on the
+# user record, so this index follows the same repository listeners as the user
+# board: a member's change recomputes only their team (O(team solves)), and a
+# problem counts once per team, credited to the member who solved it first.
+
+
+def _member_solves(user: dict) -> dict[str, tuple[float, int]]:
+    """problem -> (solved_at ts, recorded points) for one user."""
+    solves: dict[str, tuple[float, int]] = {}
+    events = user.get("solve_events") or []
+    if not isinstance(events, list):
+        return solves
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        problem = str(event.get("problem") or "")
+        ts = solved_at_ts(event.get("solved_at"))
+        if problem and ts is not None and problem not in solves:
+            solves[problem] = (ts, int(event.get("score") or 0))
+    return solves
+
+
+def user_team(user: dict | None) -> str | None:
+    """Team key a user counts for (admins never do)."""
+    if not isinstance(user, dict) or user.get("role") == "admin":
+        return None
+    return str(user.get("team") or "").strip() or None
+
+
+class TeamIndex:
+    """team -> members, credited solves, totals, score series and board position.
+
+    The board is a RankingIndex keyed by (-team points, time of the team's last
+    new solve, team), and each team's Series holds its credited solves, so team
+    pages and timelines are served exactly like the user ones.
+    """
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._user_state: dict[str, tuple[str, dict[str, tuple[float, int]]]] = {}
+        self._members: dict[str, set[str]] = {}
+        self._totals: dict[str, tuple[int, int]] = {}
+        self._credited: dict[str, dict[str, str]] = {}
+        self._series: dict[str, Series] = {}
+        self._board = RankingIndex()
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        with self._mutex:
+            self._user_state = {}
+            self._members = {}
+            for username, user in users.items():
+                team = user_team(user)
+                if team is not None:
+                    self._user_state[username] = (team, _member_solves(user))
+                    self._members.setdefault(team, set()).add(username)
+            self._totals = {}
+            self._credited = {}
+            self._series = {}
+            keys = {team: self._aggregate(team) for team in self._members}
+            self._board.replace(keys, set())
+
+    def update(self, username: str, user: dict | None) -> None:
+        team = user_team(user)
+        solves = _member_solves(user) if team is not None else {}
+        with self._mutex:
+            old = self._user_state.pop(username, None)
+            if team is not None:
+                self._user_state[username] = (team, solves)
+            if old == ((team, solves) if team is not None else None):
+                return
+            if old is not None:
+                members = self._members.get(old[0])
+                if members is not None:
+                    members.discard(username)
+                    if not members:
+                        del self._members[old[0]]
+            if team is not None:
+                self._members.setdefault(team, set()).add(username)
+            for affected in {old[0] if old else None, team} - {None}:
+                self._refresh(affected)
+
+    def shift(self, username: str, problem: str, delta: int) -> None:
+        """A dynamic value moved; only the member credited with `problem` moves their team."""
+        with self._mutex:
+            state = self._user_state.get(username)
+            if state is not None and self._credited.get(state[0], {}).get(problem) == username:
+                self._refresh(state[0])
+
+    def _refresh(self, team: str) -> None:
+        if team not in self._members:
+            self._totals.pop(team, None)
+            self._credited.pop(team, None)
+            self._series.pop(team, None)
+            self._board.put(team, None)
+            return
+        self._board.put(team, self._aggregate(team))
+
+    def _aggregate(self, team: str) -> RankKey:
+        first: dict[str, tuple[float, str, int]] = {}
+        for username in self._members[team]:
+            for problem, (ts, points) in self._user_state[username][1].items():
+                if problem not in first or (ts, username) < first[problem][:2]:
+                    first[problem] = (ts, username, points)
+        events = []
+        for problem, (ts, username, points) in first.items():
+            value = dynamic_scoring.value(problem)
+            label = datetime.fromtimestamp(ts, UTC).isoformat().replace("+00:00", "Z")
+            events.append((ts, label, problem, points if value is None else value))
+        series = Series(events)
+        self._series[team] = series
+        self._credited[team] = {problem: username for problem, (_, username, _) in first.items()}
+        total = series.totals[-1] if series.totals else 0
+        self._totals[team] = (total, len(events))
+        return -total, series.times[-1] if series.times else NO_SOLVE_TS, team
+
+    def page(self, limit: int, after: RankKey | None = None) -> list[tuple[int, str, RankKey]]:
+        return self._board.page(limit, after)
+
+    def rank(self, team: str) -> int | None:
+        return self._board.rank(team)
+
+    def count(self) -> int:
+        return self._board.count()
+
+    def totals(self, team: str) -> tuple[int, int] | None:
+        """(points, solved problems) of a team with members, else None."""
+        with self._mutex:
+            return self._totals.get(team)
+
+    def members(self, team: str) -> list[str]:
+        with self._mutex:
+            return sorted(self._members.get(team) or ())
+
+    def series(self, team: str) -> Series | None:
+        with self._mutex:
+            return self._series.get(team)
+
+    def team_of(self, username: str) -> str | None:
+        with self._mutex:
+            state = self._user_state.get(username)
+            return state[0] if state else None
+
+
+team_index = TeamIndex()
+
+
+__all__ = ["TeamIndex", "team_index", "user_team"]
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import accumulate
+
+# Per-user cumulative score series for the scoreboard timeline, plus one global
+# time-ordered list of every solve for point-in-time standings. Both are kept in
+# step with the user table (see UserRepository load/change listeners) so requests
+# only slice precomputed arrays instead of re-parsing every solve event.
+TIMELINE_MAX_POINTS = int(os.environ.get("HEXACTF_TIMELINE_MAX_POINTS", "500"))
+TIMELINE_BUCKETS = {"1m": 60, "5m": 300, "1h": 3600}
+# Sorts after any username, so (ts, _MAX_NAME) bounds every solve made at ts.
+_MAX_NAME = "\U0010ffff"
+
+
+class Series:
+    """One user's solves in time order: epoch seconds, ISO labels, problems, points and running totals."""
+
+    __slots__ = ("times", "labels", "problems", "points", "totals")
+
+    def __init__(self, events: list[tuple[float, str, str, int]]) -> None:
+        events.sort(key=lambda event: event[0])
+        self.times = [event[0] for event in events]
+        self.labels = [event[1] for event in events]
+        self.problems = [event[2] for event in events]
+        self.points = [event[3] for event in events]
+        self.totals = list(accumulate(self.points))
+
+    def index_at(self, ts: float) -> int:
+        """Position of the first solve at or after `ts` (binary search)."""
+        return bisect_left(self.times, ts)
+
+    def index_after(self, ts: float) -> int:
+        """Position just past the last solve at or before `ts`."""
+        return bisect_right(self.times, ts)
+
+    def total_before(self, idx: int) -> int:
+        return self.totals[idx - 1] if idx > 0 else 0
+
+    def solves(self, username: str) -> list[tuple[float, str, int, str]]:
+        """(solved_at, username, points, problem) per solve, as stored in the global index."""
+        return list(zip(self.times, [username] * len(self.times), self.points, self.problems))
+
+    def revalued(self, values: dict[str, int]) -> Series:
+        """This series with the problems in `values` worth that much (dynamic scoring)."""
+        if not any(problem in values for problem in self.problems):
+            return self
+        return Series([
+            (ts, label, problem, values.get(problem, points))
+            for ts, label, problem, points in zip(self.times, self.labels, self.problems, self.points)
+        ])
+
+
+def build_series(user: dict) -> Series:
+    raw = user.get("solve_events") or []
+    events: list[tuple[float, str, str, int]] = []
+    if isinstance(raw, list):
+        for item in raw:
+            if not isinstance(item, dict):
+                continue
+            problem = str(item.get("problem") or "").strip()
+            solved_at = str(item.get("solved_at") or "").strip()
+            if not problem or not solved_at:
+                continue
+            try:
+                parsed = datetime.fromisoformat(solved_at.replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            label = parsed.isoformat().replace("+00:00", "Z")
+            events.append((parsed.timestamp(), label, problem, int(item.get("score") or 0)))
+    return Series(events)
+
+
+def downsample(series: Series, start: int, stop: int, *, bucket_seconds: int | None, max_points: int) -> list[dict]:
+    """Points for series[start:stop], scored relative to the total before `start`.
+
+    With a bucket, only the last solve of each aligned bucket is kept; the
+    result is then thinned to at most `max_points`, always keeping the final
+    point so the line ends at the current total.
+    """
+    base = series.total_before(start)
+    indices = range(start, stop)
+    if bucket_seconds:
+        kept = []
+        for idx in indices:
+            bucket = int(series.times[idx] // bucket_seconds)
+            if kept and int(series.times[kept[-1]] // bucket_seconds) == bucket:
+                kept[-1] = idx
+            else:
+                kept.append(idx)
+        indices = kept
+    if len(indices) > max_points:
+        step = -(-len(indices) // max_points)
+        last = len(indices) - 1
+        indices = [indices[pos] for pos in range(last % step, len(indices), step)]
+    return [
+        {"ts": series.labels[idx], "score": series.totals[idx] - base, "problem": series.problems[idx]}
+        for idx in indices
+    ]
+
+
+class TimelineIndex:
+    """username -> Series, plus every solve as (solved_at, username, points, problem) in time order.
+
+    A change rebuilds only that user's series and moves only their entries in
+    the global list (a bisect and a memmove each), so updates cost O(their
+    solves) and standings at time T cost O(solves before T).
+    """
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._series: dict[str, Series] = {}
+        self._solves: list[tuple[float, str, int, str]] = []
+
+    def rebuild(self, users: dict[str, dict]) -> None:
+        series = {username: build_series(user) for username, user in users.items() if isinstance(user, dict)}
+        solves = sorted(entry for username, item in series.items() for entry in item.solves(username))
+        with self._mutex:
+            self._series = series
+            self._solves = solves
+
+    def update(self, username: str, user: dict | None) -> None:
+        series = build_series(user) if user else None
+        with self._mutex:
+            old = self._series.pop(username, None)
+            if old is not None:
+                for entry in old.solves(username):
+                    idx = bisect_left(self._solves, entry)
+                    if idx < len(self._solves) and self._solves[idx] == entry:
+                        del self._solves[idx]
+            if series is not None:
+                self._series[username] = series
+                for entry in series.solves(username):
+                    insort(self._solves, entry)
+
+    def get(self, username: str) -> Series | None:
+        with self._mutex:
+            return self._series.get(username)
+
+    def solves_until(self, ts: float) -> list[tuple[float, str, int, str]]:
+        """Every solve at or before `ts`, oldest first."""
+        with self._mutex:
+            return self._solves[: bisect_right(self._solves, (ts, _MAX_NAME))]
+
+
+timeline_index = TimelineIndex()
+
+
+__all__ = [
+    "Series",
+    "TIMELINE_BUCKETS",
+    "TIMELINE_MAX_POINTS",
+    "TimelineIndex",
+    "build_series",
+    "downsample",
+    "timeline_index",
+]
@@ -0,0 +1,561 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import copy
+import json
+import os
+import threading
+import zlib
+from typing import Callable, Iterable, Iterator
+
+from ..core import sqlite_db
+from ..core.background import PeriodicTask
+from ..core.config import DATA_DIR, USERS_FILE
+from ..core.storage_utils import atomic_write_json, exclusive_lock, shared_lock
+
+# Store module: users.json ownership lives here (lock + cached read/write helpers).
+# Callers are responsible for holding USERS_LOCK_FILE around every *_unlocked call:
+# shared for reads, exclusive for writes that touch several users or the snapshot,
+# and `user_lock(username)` for single-user appends (solves, field updates).
+USERS_LOCK_FILE = USERS_FILE + ".lock"
+USERS_JOURNAL_FILE = USERS_FILE + ".journal"
+USER_LOCKS_DIR = os.path.join(DATA_DIR, "user_locks")
+USER_LOCK_SHARDS = max(1, int(os.environ.get("HEXACTF_USER_LOCK_SHARDS", "64")))
+JOURNAL_COMPACT_INTERVAL_SECONDS = int(os.environ.get("HEXACTF_USERS_COMPACT_INTERVAL", "30"))
+
+
+def user_lock_path(username: str) -> str:
+    shard = zlib.crc32(str(username).encode("utf-8")) % USER_LOCK_SHARDS
+    return os.path.join(USER_LOCKS_DIR, f"users-{shard:03d}.lock")
+
+
+@contextmanager
+def user_lock(username: str) -> Iterator[None]:
+    """Lock one user for a read-modify-append without blocking other users.
+
+    Takes USERS_LOCK_FILE shared (so snapshot writers are excluded) and then the
+    user's shard lock exclusively; the order is always global before shard.
+    """
+    with shared_lock(USERS_LOCK_FILE):
+        with exclusive_lock(user_lock_path(username)):
+            yield
+
+
+def _file_signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _read_users_file(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"users": {}}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise RuntimeError("users.json is corrupted (invalid JSON)") from e
+
+    if isinstance(data, dict) and "users" in data and isinstance(data["users"], dict):
+        return data
+
+    if isinstance(data, dict):
+        return {"users": data}
+
+    raise RuntimeError("users.json has invalid structure")
+
+
+def display_name_key(user: dict) -> str:
+    """Case-insensitive effective display name (falls back to the username)."""
+    return str(user.get("display_name") or user.get("username") or "").strip().lower()
+
+
+def apply_solve(users: dict, record: dict) -> dict | None:
+    """Fold one solve record into the user table; no-op if already solved."""
+    user = users.get(record.get("username"))
+    if not isinstance(user, dict):
+        return None
+
+    problem_key = record.get("problem")
+    solved = user.get("solved_problems") or []
+    if not isinstance(solved, list):
+        solved = []
+    if problem_key in solved:
+        return None
+
+    solved.append(problem_key)
+    user["solved_problems"] = solved
+    events = user.get("solve_events") or []
+    if not isinstance(events, list):
+        events = []
+    events.append({
+        "problem": problem_key,
+        "score": int(record.get("score") or 0),
+        "solved_at": record.get("solved_at"),
+    })
+    user["solve_events"] = events
+    user["score"] = int(user.get("score", 0)) + int(record.get("score") or 0)
+    return user
+
+
+def apply_record(users: dict, record: dict) -> dict | None:
+    """Apply one journal record (solve or per-user field update) to the user table."""
+    op = record.get("op")
+    if op == "solve":
+        return apply_solve(users, record)
+    if op == "update":
+        user = users.get(record.get("username"))
+        fields = record.get("fields")
+        if not isinstance(user, dict) or not isinstance(fields, dict):
+            return None
+        user.update(fields)
+        return user
+    return None
+
+
+class JsonUserBackend:
+    """users.json snapshot plus an append-only journal of per-user changes.
+
+    Solves and single-user field updates are appended to the journal as one
+    JSON line each (O(1) + fsync) instead of rewriting the snapshot. Appends
+    only need the user's own lock, because O_APPEND writes from different
+    workers never overwrite each other. Every snapshot write folds the journal
+    in and starts a new journal generation, so lines left over from a crash
+    between the snapshot write and the truncation are never replayed twice.
+    """
+
+    def __init__(self, path: str, journal_path: str) -> None:
+        self.path = path
+        self.journal_path = journal_path
+        self._journal_offset = 0
+
+    def signature(self) -> object:
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            journal_size = 0
+        return _file_signature(self.path), journal_size
+
+    def load(self) -> dict:
+        data = _read_users_file(self.path)
+        self._journal_offset = 0
+        self._replay_journal(data)
+        return data
+
+    def refresh(self, data: dict, old_signature: object, new_signature: object) -> tuple[dict, set[str] | None]:
+        """Return the fresh table plus the usernames touched, or None after a full reload."""
+        # Only the journal grew (another worker appended): replay the tail.
+        if old_signature[0] == new_signature[0] and new_signature[1] >= self._journal_offset:
+            return data, self._replay_journal(data)
+        return self.load(), None
+
+    def _replay_journal(self, data: dict) -> set[str]:
+        touched: set[str] = set()
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return touched
+
+        # A line without its trailing newline is still being written; leave it for later.
+        complete = chunk[: chunk.rfind(b"\n") + 1]
+        generation = int(data.get("journal_generation") or 0)
+        users = data["users"]
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or int(record.get("gen") or 0) != generation:
+                continue
+            if apply_record(users, record) is not None:
+                touched.add(str(record.get("username")))
+        self._journal_offset += len(complete)
+        return touched
+
+    def append(self, data: dict, record: dict, user: dict) -> tuple[int, int]:
+        """Durably append one record; returns its (start, end) offsets in the journal.
+
+        Touches no in-memory state, so it runs outside the repository mutex.
+        """
+        line = dict(record, gen=int(data.get("journal_generation") or 0))
+        payload = (json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        os.makedirs(DATA_DIR, exist_ok=True)
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, payload)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return end - len(payload), end
+
+    def appended(self, receipt: tuple[int, int], known: object) -> object | None:
+        """New signature if our line directly follows what was replayed, else None (under the mutex)."""
+        start, end = receipt
+        if known is None or start != self._journal_offset:
+            # Another worker appended first, or a reader already replayed our line;
+            # the next load replays from the old offset (idempotently).
+            return None
+        self._journal_offset = end
+        return known[0], end
+
+    def journal_pending(self) -> bool:
+        return self._journal_offset > 0
+
+    def data_version(self, data: dict, signature: object) -> str:
+        # Snapshot writes bump the generation and appends only grow the journal,
+        # so (generation, replayed journal bytes) only moves forward.
+        return f"{int(data.get('journal_generation') or 0)}.{self._journal_offset}"
+
+    def save(
+        self, data: dict, *, changed: list[dict], deleted: list[str], extra_changed: bool, known: object
+    ) -> object | None:
+        # Snapshot writes run under the exclusive users lock, so no append can interleave.
+        os.makedirs(DATA_DIR, exist_ok=True)
+        data["journal_generation"] = int(data.get("journal_generation") or 0) + 1
+        atomic_write_json(self.path, data)
+        try:
+            os.truncate(self.journal_path, 0)
+        except FileNotFoundError:
+            pass
+        self._journal_offset = 0
+        return self.signature()
+
+
+def _decode_user_row(row) -> dict | None:
+    try:
+        user = json.loads(row["data"])
+    except json.JSONDecodeError:
+        return None
+    return user if isinstance(user, dict) else None
+
+
+class SqliteUserBackend:
+    """Row-level persistence: only changed users are written, in one WAL transaction."""
+
+    def signature(self) -> object:
+        return sqlite_db.get_meta(sqlite_db.get_connection(), "users_version", 0)
+
+    def load(self) -> dict:
+        conn = sqlite_db.get_connection()
+        users = {}
+        for row in conn.execute("SELECT username, data FROM users"):
+            user = _decode_user_row(row)
+            if user is not None:
+                users[row["username"]] = user
+        data = dict(sqlite_db.get_meta(conn, "users_extra", {}) or {})
+        data["users"] = users
+        return data
+
+    def refresh(self, data: dict, old_signature: object, new_signature: object) -> tuple[dict, set[str] | None]:
+        """Re-read only the users written since `old_signature` (the user_changes log), like a journal tail."""
+        conn = sqlite_db.get_connection()
+        touched = None
+        if isinstance(old_signature, int) and isinstance(new_signature, int) and new_signature > old_signature:
+            touched = sqlite_db.user_changes_between(conn, old_signature, new_signature)
+        if touched is None:
+            return self.load(), None
+        users = data["users"]
+        for username in touched:
+            row = conn.execute("SELECT username, data FROM users WHERE username = ?", (username,)).fetchone()
+            user = _decode_user_row(row) if row is not None else None
+            if user is None:
+                users.pop(username, None)
+            else:
+                users[username] = user
+        # users_extra (teams, ...) is a single row; always take the current one.
+        for key in [key for key in data if key != "users"]:
+            del data[key]
+        data.update(sqlite_db.get_meta(conn, "users_extra", {}) or {})
+        return data, touched
+
+    def append(self, data: dict, record: dict, user: dict) -> int:
+        """Write one user's row in its own transaction; returns the new users_version."""
+        with sqlite_db.transaction() as conn:
+            sqlite_db.upsert_user(conn, user)
+            version = sqlite_db.bump_version(conn, "users_version")
+            sqlite_db.record_user_changes(conn, version, [str(user.get("username"))])
+        return version
+
+    def appended(self, receipt: int, known: object) -> object | None:
+        # Current only if nobody else committed between our last refresh and our write.
+        return receipt if known == receipt - 1 else None
+
+    def journal_pending(self) -> bool:
+        return False
+
+    def data_version(self, data: dict, signature: object) -> str:
+        return str(signature)
+
+    def save(
+        self, data: dict, *, changed: list[dict], deleted: list[str], extra_changed: bool, known: object
+    ) -> object | None:
+        with sqlite_db.transaction() as conn:
+            for username in deleted:
+                sqlite_db.delete_user(conn, username)
+            for user in changed:
+                sqlite_db.upsert_user(conn, user)
+            # users_extra (teams, ...) is one blob; rewrite it only when the caller changed it.
+            if extra_changed:
+                extra = {key: value for key, value in data.items() if key != "users"}
+                sqlite_db.set_meta(conn, "users_extra", extra)
+            version = sqlite_db.bump_version(conn, "users_version")
+            sqlite_db.record_user_changes(conn, version, [*deleted, *(str(user.get("username")) for user in changed)])
+        # Per-user writers from other workers may have committed in between;
+        # only claim to be current if ours was the very next version.
+        return version if known == version - 1 else None
+
+
+class UserRepository:
+    """Process-level cache of the user table.
+
+    The parsed users are kept in memory and only reloaded when the backend
+    signature changes, e.g. after another worker wrote: (inode, mtime, size)
+    of users.json plus the journal length, or the users_version counter in
+    SQLite. Writes go through `put_unlocked` / `delete_unlocked` /
+    `record_solve_unlocked` / `update_fields_unlocked` so the cache is updated
+    in place and the backend only persists what changed.
+
+    A display-name index (lowercased effective name -> usernames) is rebuilt on
+    every full load and kept current by puts and deletes, so uniqueness checks
+    do not scan the table. Users another worker touched (journal tail, or the
+    SQLite change log) are re-indexed one by one.
+
+    Derived indexes elsewhere subscribe with `add_load_listener` (full table
+    after every full reload) and `add_change_listener` (one user at a time,
+    None when deleted), both called while the repository mutex is held and
+    only for changes that are already durable.
+
+    The mutex only guards the in-memory table. The durable write (journal
+    fsync, snapshot rewrite or SQLite transaction) runs outside it, under the
+    file locks the caller holds, so readers and solves by other users in this
+    worker never wait for another user's fsync.
+    """
+
+    def __init__(self, backend: JsonUserBackend | SqliteUserBackend) -> None:
+        self.backend = backend
+        self._mutex = threading.RLock()
+        self._data: dict | None = None
+        self._signature: object = None
+        self._load_listeners: list[Callable[[dict[str, dict]], None]] = []
+        self._change_listeners: list[Callable[[str, dict | None], None]] = []
+        self._names: dict[str, set[str]] = {}
+        self._name_of: dict[str, str] = {}
+
+    def add_load_listener(self, listener: Callable[[dict[str, dict]], None]) -> None:
+        """Register a callback that sees the user table after every full (re)load."""
+        self._load_listeners.append(listener)
+
+    def add_change_listener(self, listener: Callable[[str, dict | None], None]) -> None:
+        """Register a callback that sees every single-user change (None = deleted)."""
+        self._change_listeners.append(listener)
+
+    def _notify_change(self, username: str, user: dict | None) -> None:
+        for listener in self._change_listeners:
+            listener(username, user)
+
+    def load_unlocked(self) -> dict:
+        # Readers may share the file lock, so in-memory refreshes are serialized here.
+        with self._mutex:
+            signature = self.backend.signature()
+            previous = self._data
+            touched: set[str] | None = None
+            if previous is None:
+                self._data = self.backend.load()
+            elif signature != self._signature:
+                self._data, touched = self.backend.refresh(previous, self._signature, signature)
+            self._signature = signature
+            if self._data is not previous:
+                self._rebuild_names(self._data["users"])
+                for listener in self._load_listeners:
+                    listener(self._data["users"])
+            elif touched:
+                users = self._data["users"]
+                for username in touched:
+                    self._index_name(username, users.get(username))
+                    self._notify_change(username, users.get(username))
+            return self._data
+
+    def reindex(self) -> None:
+        """Re-run the load listeners on the current table (an index's own inputs changed)."""
+        with self._mutex:
+            data = self.load_unlocked()
+            for listener in self._load_listeners:
+                listener(data["users"])
+
+    def data_version(self) -> str:
+        """Monotonic version of the user table as persisted (shared by all workers).
+
+        Cheap enough to check on every poll: a stat of the backing files, or one
+        meta lookup in SQLite, unless another worker has written since.
+        """
+        with self._mutex:
+            data = self.load_unlocked()
+            return self.backend.data_version(data, self._signature)
+
+    def users_unlocked(self) -> dict[str, dict]:
+        return self.load_unlocked()["users"]
+
+    def get_unlocked(self, username: str) -> dict | None:
+        user = self.users_unlocked().get(username)
+        return user if isinstance(user, dict) else None
+
+    def _rebuild_names(self, users: dict[str, dict]) -> None:
+        self._names = {}
+        self._name_of = {}
+        for username, user in users.items():
+            if isinstance(user, dict):
+                self._index_name(username, user)
+
+    def _index_name(self, username: str, user: dict | None) -> None:
+        old_key = self._name_of.pop(username, None)
+        if old_key is not None:
+            owners = self._names.get(old_key)
+            if owners is not None:
+                owners.discard(username)
+                if not owners:
+                    del self._names[old_key]
+        if user is None:
+            return
+        key = display_name_key(user)
+        if key:
+            self._names.setdefault(key, set()).add(username)
+            self._name_of[username] = key
+
+    def display_name_taken_unlocked(self, name: str) -> bool:
+        """O(1) case-insensitive check against every user's effective display name."""
+        key = str(name or "").strip().lower()
+        with self._mutex:
+            self.load_unlocked()
+            return bool(key) and key in self._names
+
+    def commit_unlocked(
+        self, *, changed: Iterable[dict] = (), deleted: Iterable[str] = (), extra_changed: bool = False
+    ) -> None:
+        """Persist changed and deleted users; pass `extra_changed` after editing non-user keys (teams)."""
+        changed = [user for user in changed if isinstance(user, dict)]
+        deleted = [str(username) for username in deleted]
+        with self._mutex:
+            data = self.load_unlocked()
+            users = data["users"]
+            for username in deleted:
+                users.pop(username, None)
+            for user in changed:
+                users[str(user.get("username"))] = user
+            known = self._signature
+        # The caller holds the exclusive users lock, so no reader in any worker
+        # sees the table between the mutation above and the notifications below.
+        try:
+            signature = self.backend.save(
+                data, changed=changed, deleted=deleted, extra_changed=extra_changed, known=known
+            )
+        except BaseException:
+            # The in-memory copy holds the failed mutation.
+            self.invalidate()
+            raise
+        with self._mutex:
+            if signature is not None:
+                self._signature = signature
+            for username in deleted:
+                self._index_name(username, None)
+                self._notify_change(username, None)
+            for user in changed:
+                username = str(user.get("username"))
+                self._index_name(username, user)
+                self._notify_change(username, user)
+
+    def put_unlocked(self, *users: dict) -> None:
+        self.commit_unlocked(changed=users)
+
+    def delete_unlocked(self, *usernames: str) -> None:
+        self.commit_unlocked(deleted=usernames)
+
+    def _append_unlocked(self, record: dict) -> dict | None:
+        username = str(record.get("username"))
+        with self._mutex:
+            data = self.load_unlocked()
+            current = data["users"].get(username)
+            if not isinstance(current, dict):
+                return None
+            # Apply to a copy: readers keep seeing the persisted user until the write lands.
+            user = apply_record({username: copy.deepcopy(current)}, record)
+            if user is None:
+                return None
+        # Only the user's shard lock is needed around the write (see `user_lock`).
+        receipt = self.backend.append(data, record, user)
+        with self._mutex:
+            signature = self.backend.appended(receipt, self._signature)
+            if signature is None:
+                # Others wrote in between: pick everything up, our record included.
+                return self.get_unlocked(username)
+            self._signature = signature
+            data["users"][username] = user
+            self._index_name(username, user)
+            self._notify_change(username, user)
+            return user
+
+    def record_solve_unlocked(self, record: dict) -> dict | None:
+        """Apply a solve in memory and persist it; returns the updated user or None.
+
+        Only needs `user_lock(record["username"])`, not the exclusive users lock.
+        """
+        return self._append_unlocked(dict(record, op="solve"))
+
+    def update_fields_unlocked(self, username: str, fields: dict) -> dict | None:
+        """Set fields on one user and persist them; only needs `user_lock(username)`."""
+        return self._append_unlocked({"op": "update", "username": username, "fields": dict(fields)})
+
+    def compact_unlocked(self) -> bool:
+        """Fold pending journal entries into the snapshot."""
+        with self._mutex:
+            self.load_unlocked()
+            pending = self.backend.journal_pending()
+        if not pending:
+            return False
+        self.commit_unlocked()
+        return True
+
+    def invalidate(self) -> None:
+        with self._mutex:
+            self._data = None
+            self._signature = None
+
+
+def _make_backend() -> JsonUserBackend | SqliteUserBackend:
+    if sqlite_db.sqlite_enabled():
+        return SqliteUserBackend()
+    return JsonUserBackend(USERS_FILE, USERS_JOURNAL_FILE)
+
+
+user_repository = UserRepository(_make_backend())
+
+
+def compact_journal() -> bool:
+    with exclusive_lock(USERS_LOCK_FILE):
+        return user_repository.compact_unlocked()
+
+
+journal_compactor = PeriodicTask("hexactf-users-compactor", JOURNAL_COMPACT_INTERVAL_SECONDS, compact_journal)
+
+
+__all__ = [
+    "USERS_LOCK_FILE",
+    "USERS_JOURNAL_FILE",
+    "USER_LOCK_SHARDS",
+    "user_lock",
+    "user_lock_path",
+    "JsonUserBackend",
+    "SqliteUserBackend",
+    "UserRepository",
+    "apply_solve",
+    "apply_record",
+    "display_name_key",
+    "user_repository",
+    "compact_journal",
+    "journal_compactor",
+]
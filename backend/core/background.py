@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable
+
+
+class PeriodicTask:
+    """Daemon thread that runs `fn` every `interval` seconds until stopped.
+
+    Errors are swallowed so one failed run (e.g. disk full) does not kill the
+    loop; the next tick simply tries again.
+    """
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]) -> None:
+        self.name = name
+        self.interval = max(0.1, float(interval))
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                continue
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, *, run_final: bool = True) -> None:
+        self._stop.set()
+        if run_final:
+            try:
+                self.fn()
+            except Exception:
+                pass
+
+
+__all__ = ["PeriodicTask"]
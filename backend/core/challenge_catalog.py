@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import UTC, datetime
+
+from .config import CHALLENGE_FILE
+
+# challenges.json, parsed once per edit. Every reader takes the current Catalog
+# (an immutable snapshot) and keeps using that object for the whole request, so
+# a reload only swaps one reference. Edits are picked up by comparing the file's
+# (inode, mtime, size) on access; an edit that fails to parse or validate is
+# reported to admins and the last good catalog keeps being served.
+
+
+class CatalogError(ValueError):
+    """challenges.json could not be turned into a catalog."""
+
+
+def normalize_alias(value: object) -> str:
+    """Deep-link form of a key, challenge_id or title: lowercase alphanumerics only."""
+    return "".join(ch for ch in str(value or "").strip().lower() if ch.isalnum())
+
+
+class ChallengeRecord:
+    """One validated challenge entry. `raw` is the entry as written (shared, do not mutate)."""
+
+    __slots__ = ("key", "raw", "title", "challenge_id", "score", "dir")
+
+    def __init__(self, key: str, raw: dict) -> None:
+        self.key = key
+        self.raw = raw
+        self.title = str(raw.get("title") or key)
+        self.challenge_id = str(raw.get("challenge_id") or key)
+        self.dir = str(raw["dir"]) if raw.get("dir") else None
+        try:
+            self.score = int(raw.get("score") or 0)
+        except (TypeError, ValueError):
+            raise CatalogError(f"challenge {key!r}: score must be an integer") from None
+
+
+class Catalog:
+    """An immutable, validated view of one version of challenges.json.
+
+    `version` increases with every successful reload in this process; `digest`
+    identifies the content and is the same in every worker.
+    """
+
+    def __init__(self, version: int, digest: str, challenges: dict[str, dict]) -> None:
+        self.version = version
+        self.digest = digest
+        self.loaded_at = datetime.now(UTC).isoformat().replace("+00:00", "Z")
+        self.records: dict[str, ChallengeRecord] = {}
+        for key, raw in challenges.items():
+            if not isinstance(raw, dict):
+                raise CatalogError(f"challenge {key!r} must be an object")
+            self.records[key] = ChallengeRecord(key, raw)
+        self.challenges = {key: record.raw for key, record in self.records.items()}
+        # Normalized key / challenge_id / title -> key. On a collision the first
+        # challenge in file order keeps the alias (as the old linear scan did);
+        # the others are listed so admins can rename them.
+        self.aliases: dict[str, str] = {}
+        self.alias_collisions: list[dict] = []
+        for key, record in self.records.items():
+            for value in (key, record.raw.get("challenge_id"), record.raw.get("title")):
+                alias = normalize_alias(value) if value else ""
+                if not alias:
+                    continue
+                owner = self.aliases.setdefault(alias, key)
+                if owner != key:
+                    self.alias_collisions.append({"alias": alias, "key": owner, "shadowed": key})
+
+    def get(self, key: str) -> ChallengeRecord | None:
+        return self.records.get(key)
+
+    def resolve(self, raw_key: str) -> str | None:
+        """Key for an exact key or a deep-link alias, else None."""
+        if raw_key in self.records:
+            return raw_key
+        return self.aliases.get(normalize_alias(raw_key))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def _file_signature() -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(CHALLENGE_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _parse(raw: bytes) -> dict:
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise CatalogError(f"challenges.json is invalid JSON: {exc}") from None
+    if not isinstance(data, dict):
+        raise CatalogError("challenges.json must be an object")
+    return data
+
+
+class ChallengeCatalog:
+    """Holder of the current Catalog, reloaded when challenges.json changes."""
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._signature: object = None
+        self._catalog: Catalog | None = None
+        self._version = 0
+        # Last failed load (kept until a good load replaces it).
+        self._error: Exception | None = None
+        self._error_at: str | None = None
+
+    def current(self) -> Catalog:
+        """The catalog to serve. Raises FileNotFoundError / CatalogError only if no load ever succeeded."""
+        signature = _file_signature()
+        catalog = self._catalog
+        if catalog is None or signature != self._signature:
+            with self._mutex:
+                if self._catalog is None or signature != self._signature:
+                    self._reload_unlocked(signature)
+                catalog = self._catalog
+        if catalog is None:
+            raise self._error or CatalogError("challenges.json not loaded")
+        return catalog
+
+    def _reload_unlocked(self, signature: object) -> None:
+        self._signature = signature
+        try:
+            with open(CHALLENGE_FILE, "rb") as f:
+                raw = f.read()
+            challenges = _parse(raw)
+            catalog = Catalog(self._version + 1, hashlib.sha256(raw).hexdigest()[:16], challenges)
+        except (OSError, CatalogError) as exc:
+            self._error = exc
+            self._error_at = datetime.now(UTC).isoformat().replace("+00:00", "Z")
+            return
+        self._version = catalog.version
+        self._catalog = catalog
+        self._error = None
+        self._error_at = None
+
+    def status(self) -> dict:
+        """What is being served and, if the file on disk was rejected, why (for admins)."""
+        try:
+            self.current()
+        except (OSError, CatalogError):
+            pass
+        with self._mutex:
+            catalog = self._catalog
+            error = self._error
+            error_at = self._error_at
+        return {
+            "version": catalog.version if catalog else 0,
+            "digest": catalog.digest if catalog else None,
+            "loaded_at": catalog.loaded_at if catalog else None,
+            "challenge_count": len(catalog) if catalog else 0,
+            "alias_collisions": list(catalog.alias_collisions) if catalog else [],
+            "error": str(error) if error is not None else None,
+            "error_at": error_at,
+        }
+
+
+challenge_catalog = ChallengeCatalog()
+
+
+__all__ = [
+    "Catalog",
+    "CatalogError",
+    "ChallengeCatalog",
+    "ChallengeRecord",
+    "challenge_catalog",
+    "normalize_alias",
+]
@@ -20,6 +20,19 @@ def _load_env_file() -> None:
 
 _load_env_file()
 
+
+def _env_int(name: str, default: int, *, minimum: int) -> int:
+    """Integer setting from the environment: malformed values fall back to `default`, small ones are raised to `minimum`."""
+    raw = (os.environ.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return max(minimum, value)
+
+
 # Base paths
 CORE_DIR = os.path.dirname(os.path.abspath(__file__))
 BASE_DIR = os.path.dirname(CORE_DIR)
@@ -34,8 +47,18 @@ PAGES_DIR = os.path.join(STATIC_DIR, "pages")
 CHALLENGE_FILE = os.path.join(ROOT_DIR, "challenges.json")
 INSTANCES_FILE = os.path.join(ROOT_DIR, "instances.json")
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
+SCOREBOARD_FREEZE_FILE = os.path.join(DATA_DIR, "scoreboard_freeze.json")
 
 # Auth / token storage
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 SECRET_FILE = os.path.join(DATA_DIR, "secret.key")
 FLAG_SECRET_FILE = os.path.join(DATA_DIR, "flag_secret.key")
+
+# Storage backend: "json" keeps one JSON file per store, "sqlite" uses a single WAL database.
+STORAGE_BACKEND = (os.environ.get("HEXACTF_STORAGE_BACKEND") or "json").strip().lower()
+SQLITE_FILE = os.environ.get("HEXACTF_SQLITE_FILE") or os.path.join(DATA_DIR, "hexactf.sqlite3")
+
+# Password hashing: PBKDF2 runs on a bounded pool; at most WORKERS hashes run
+# at once and QUEUE more may wait before new requests are refused with a 503.
+PASSWORD_HASH_WORKERS = _env_int("HEXACTF_PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1), minimum=1)
+PASSWORD_HASH_QUEUE_LIMIT = _env_int("HEXACTF_PASSWORD_HASH_QUEUE", 64, minimum=0)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Request, Response
+
+# Conditional GETs for the polled read endpoints. ETags are derived from the
+# data versions a response depends on (plus whatever else shapes it, such as
+# query parameters), so a poll that matches is answered with 304 before the
+# response body is built.
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    raw = "\x1f".join(str(part) for part in parts).encode("utf-8")
+    return 'W/"' + hashlib.blake2b(raw, digest_size=12).hexdigest() + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 prescribes for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in header.split(","))
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Response | None:
+    """Stamp `response` with the ETag; return a 304 to send instead if the client has it."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+__all__ = ["CACHE_CONTROL", "conditional_response", "etag_matches", "make_etag"]
@@ -34,12 +34,32 @@ class SettingsUpdateRequest(BaseModel):
     challenges_closed_message: str | None = None
     ranking_open_at: str | None = None
     ranking_close_at: str | None = None
+    ranking_freeze_at: str | None = None
 
 
 class UserApprovalActionRequest(BaseModel):
     action: str | None = None
 
 
+class BulkUserActionRequest(BaseModel):
+    action: str
+    usernames: list[str]
+    role: str | None = None
+
+
+class TeamCreateRequest(BaseModel):
+    name: str
+
+
+class TeamJoinRequest(BaseModel):
+    name: str
+    join_code: str
+
+
+class TeamInstanceLimitRequest(BaseModel):
+    limit: int | None = None
+
+
 class SubmitRequest(BaseModel):
     problem: str
     flag: str
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Iterable, Iterator
+
+from .config import INSTANCES_FILE, SETTINGS_FILE, SQLITE_FILE, STORAGE_BACKEND, USERS_FILE
+
+# SQLite storage backend shared by the user, instance and settings stores.
+# One connection per thread; WAL lets readers proceed while a writer commits.
+BUSY_TIMEOUT_MS = int(os.environ.get("HEXACTF_SQLITE_BUSY_TIMEOUT_MS", "10000"))
+USER_CHANGES_KEEP_VERSIONS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    display_name_lower TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    status TEXT NOT NULL DEFAULT 'approved',
+    score INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_display_name_lower ON users(display_name_lower);
+CREATE INDEX IF NOT EXISTS users_role_status ON users(role, status);
+
+-- Solves live in the user row (solved_problems / solve_events) and the per-problem
+-- and per-time views are in-memory indexes, so a solve writes exactly one row.
+-- Databases created before that had a mirrored solves table; drop it.
+DROP TABLE IF EXISTS solves;
+
+-- Usernames written by each users_version bump ('' = only users_extra), so other
+-- workers can refresh just those rows. Old versions are pruned.
+CREATE TABLE IF NOT EXISTS user_changes (
+    version INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (version, username)
+);
+
+CREATE TABLE IF NOT EXISTS instances (
+    instance_id INTEGER PRIMARY KEY,
+    owner TEXT,
+    problem TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS instances_owner_status ON instances(owner, status);
+CREATE INDEX IF NOT EXISTS instances_problem ON instances(problem);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def sqlite_enabled() -> bool:
+    return STORAGE_BACKEND == "sqlite"
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(SQLITE_FILE), exist_ok=True)
+    # Autocommit mode: transactions are opened explicitly by `transaction()`.
+    conn = sqlite3.connect(SQLITE_FILE, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                conn.executescript(SCHEMA)
+                migrate_from_json(conn)
+                _initialized = True
+    return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def get_meta(conn: sqlite3.Connection, key: str, default: Any = None) -> Any:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    if row is None or row["value"] is None:
+        return default
+    try:
+        return json.loads(row["value"])
+    except json.JSONDecodeError:
+        return default
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+    conn.execute(
+        "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, json.dumps(value, ensure_ascii=False)),
+    )
+
+
+def bump_version(conn: sqlite3.Connection, key: str) -> int:
+    version = int(get_meta(conn, key, 0) or 0) + 1
+    set_meta(conn, key, version)
+    return version
+
+
+def record_user_changes(conn: sqlite3.Connection, version: int, usernames: Iterable[str]) -> None:
+    """Log which users a users_version bump wrote (call inside the writing transaction)."""
+    rows = [(version, str(username)) for username in set(usernames)] or [(version, "")]
+    conn.executemany("INSERT OR IGNORE INTO user_changes(version, username) VALUES(?, ?)", rows)
+    conn.execute("DELETE FROM user_changes WHERE version <= ?", (version - USER_CHANGES_KEEP_VERSIONS,))
+
+
+def user_changes_between(conn: sqlite3.Connection, old_version: int, new_version: int) -> set[str] | None:
+    """Usernames written by versions old_version+1..new_version, or None if the log does not cover them."""
+    rows = conn.execute(
+        "SELECT version, username FROM user_changes WHERE version > ? AND version <= ?",
+        (old_version, new_version),
+    ).fetchall()
+    if len({row["version"] for row in rows}) != new_version - old_version:
+        return None
+    return {row["username"] for row in rows if row["username"]}
+
+
+def user_row_values(user: dict) -> tuple:
+    username = str(user.get("username") or "")
+    display_name = str(user.get("display_name") or username).strip().lower()
+    return (
+        username,
+        display_name,
+        str(user.get("role") or "user"),
+        str(user.get("status") or "approved"),
+        int(user.get("score") or 0),
+        json.dumps(user, ensure_ascii=False),
+    )
+
+
+def upsert_user(conn: sqlite3.Connection, user: dict) -> None:
+    conn.execute(
+        "INSERT INTO users(username, display_name_lower, role, status, score, data) VALUES(?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(username) DO UPDATE SET display_name_lower = excluded.display_name_lower, "
+        "role = excluded.role, status = excluded.status, score = excluded.score, data = excluded.data",
+        user_row_values(user),
+    )
+
+
+def delete_user(conn: sqlite3.Connection, username: str) -> None:
+    conn.execute("DELETE FROM users WHERE username = ?", (username,))
+
+
+def upsert_instance(conn: sqlite3.Connection, inst: dict) -> None:
+    conn.execute(
+        "INSERT INTO instances(instance_id, owner, problem, status, data) VALUES(?, ?, ?, ?, ?) "
+        "ON CONFLICT(instance_id) DO UPDATE SET owner = excluded.owner, problem = excluded.problem, "
+        "status = excluded.status, data = excluded.data",
+        (
+            int(inst.get("instance_id") or 0),
+            inst.get("owner"),
+            inst.get("problem"),
+            inst.get("status"),
+            json.dumps(inst, ensure_ascii=False),
+        ),
+    )
+
+
+def _read_json_file(path: str) -> Any:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _apply_users_journal(users_doc: dict) -> None:
+    """Fold solves and field updates not yet compacted into users.json into the table."""
+    from ..auth.user_store import USERS_JOURNAL_FILE, apply_record
+
+    try:
+        with open(USERS_JOURNAL_FILE, "rb") as f:
+            chunk = f.read()
+    except FileNotFoundError:
+        return
+    # Same rules as the JSON backend's replay: complete lines of the current generation only.
+    complete = chunk[: chunk.rfind(b"\n") + 1]
+    generation = int(users_doc.get("journal_generation") or 0)
+    for line in complete.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict) and int(record.get("gen") or 0) == generation:
+            apply_record(users_doc["users"], record)
+
+
+def migrate_from_json(conn: sqlite3.Connection) -> bool:
+    """One-shot import of users.json (plus its pending journal), instances.json and settings.json.
+
+    Runs inside a write transaction so concurrent workers cannot import twice;
+    the JSON files are left untouched as a backup.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if get_meta(conn, "json_migrated_at"):
+            conn.execute("COMMIT")
+            return False
+
+        users_doc = _read_json_file(USERS_FILE)
+        if isinstance(users_doc, dict):
+            users = users_doc.get("users") if isinstance(users_doc.get("users"), dict) else users_doc
+            if users is not users_doc:
+                _apply_users_journal(users_doc)
+            for username, user in users.items():
+                if not isinstance(user, dict):
+                    continue
+                user.setdefault("username", username)
+                upsert_user(conn, user)
+            # journal_generation only orders the JSON journal; it has no meaning here.
+            extra = {key: value for key, value in users_doc.items() if key not in ("users", "journal_generation")}
+            if isinstance(users_doc.get("users"), dict) and extra:
+                set_meta(conn, "users_extra", extra)
+
+        state = _read_json_file(INSTANCES_FILE)
+        if isinstance(state, dict):
+            for key, inst in (state.get("instances") or {}).items():
+                if isinstance(inst, dict) and str(key).isdigit():
+                    inst.setdefault("instance_id", int(key))
+                    upsert_instance(conn, inst)
+            set_meta(conn, "next_instance_id", state.get("next_instance_id", 1))
+            set_meta(conn, "reusable_instance_ids", state.get("reusable_instance_ids") or [])
+
+        settings = _read_json_file(SETTINGS_FILE)
+        if isinstance(settings, dict):
+            set_meta(conn, "settings", settings)
+
+        set_meta(conn, "users_version", 1)
+        set_meta(conn, "json_migrated_at", datetime.now(timezone.utc).isoformat())
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return True
+
+
+__all__ = [
+    "sqlite_enabled",
+    "get_connection",
+    "transaction",
+    "get_meta",
+    "set_meta",
+    "bump_version",
+    "record_user_changes",
+    "user_changes_between",
+    "upsert_user",
+    "delete_user",
+    "upsert_instance",
+    "migrate_from_json",
+]
@@ -4,7 +4,7 @@ from contextlib import contextmanager
 import json
 import os
 import tempfile
-from typing import Any, Iterator
+from typing import Any, ContextManager, Iterator
 
 try:
     import fcntl  # type: ignore
@@ -13,12 +13,12 @@ except ImportError:  # pragma: no cover (non-posix)
 
 
 @contextmanager
-def exclusive_lock(lock_path: str) -> Iterator[None]:
+def _file_lock(lock_path: str, operation: int | None) -> Iterator[None]:
     os.makedirs(os.path.dirname(lock_path), exist_ok=True)
     lock_file = open(lock_path, "a+", encoding="utf-8")
     try:
-        if fcntl is not None:
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        if fcntl is not None and operation is not None:
+            fcntl.flock(lock_file.fileno(), operation)
         yield
     finally:
         if fcntl is not None:
@@ -26,6 +26,16 @@ def exclusive_lock(lock_path: str) -> Iterator[None]:
         lock_file.close()
 
 
+def exclusive_lock(lock_path: str) -> ContextManager[None]:
+    """Writer lock: excludes every other holder, shared or exclusive."""
+    return _file_lock(lock_path, fcntl.LOCK_EX if fcntl is not None else None)
+
+
+def shared_lock(lock_path: str) -> ContextManager[None]:
+    """Reader lock: any number of readers proceed together; blocks only while a writer holds the lock."""
+    return _file_lock(lock_path, fcntl.LOCK_SH if fcntl is not None else None)
+
+
 def atomic_write_text(path: str, text: str, encoding: str = "utf-8") -> None:
     dir_path = os.path.dirname(path)
     os.makedirs(dir_path, exist_ok=True)
@@ -1,14 +1,18 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
-from ..auth.auth import ensure_default_admin
+from ..auth.auth import ensure_default_admin, presence_flusher
+from ..auth.user_store import journal_compactor
 from ..auth.routes_admin import router as admin_router
 from ..auth.routes_auth import router as auth_router
 from .routes.challenges import router as challenges_router
 from .routes.instances import router as instances_router
 from .routes.pages import router as pages_router
 from .routes.scoreboard import router as scoreboard_router
+from .routes.teams import router as teams_router
 from .routes.visibility import router as visibility_router
+from .scoreboard_freeze import freeze_scheduler
+from .scoreboard_stream import scoreboard_broadcaster
 from ..core.config import STATIC_DIR
 
 app = FastAPI()
@@ -21,10 +25,26 @@ def ensure_admin_user():
     ensure_default_admin()
 
 
+@app.on_event("startup")
+def start_background_jobs():
+    journal_compactor.start()
+    presence_flusher.start()
+    freeze_scheduler.start()
+
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    scoreboard_broadcaster.stop()
+    freeze_scheduler.stop(run_final=False)
+    presence_flusher.stop()
+    journal_compactor.stop()
+
+
 app.include_router(pages_router)
 app.include_router(auth_router)
 app.include_router(admin_router)
 app.include_router(challenges_router)
 app.include_router(instances_router)
 app.include_router(scoreboard_router)
+app.include_router(teams_router)
 app.include_router(visibility_router)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import time
+from urllib.parse import quote
+
+from fastapi import Response
+from fastapi.responses import RedirectResponse
+
+from ..core.http_cache import CACHE_CONTROL
+
+# Who sends challenge attachments once /api/download has authenticated the user:
+#   app    - the worker streams the file itself (FileResponse).
+#   accel  - the worker answers with X-Accel-Redirect to an internal nginx
+#            location and nginx sends the file.
+#   signed - the worker redirects to a short-lived URL that nginx checks with
+#            its secure_link module (no session needed, so download managers
+#            can resume it until it expires).
+# In accel and signed mode no file bytes pass through Python. Files are mapped
+# into the nginx locations by their path below HEXACTF_DOWNLOAD_ROOT; see
+# ops/nginx/challenge-downloads.conf.example.
+DOWNLOAD_DELIVERY_MODES = ("app", "accel", "signed")
+DOWNLOAD_DELIVERY = (os.environ.get("HEXACTF_DOWNLOAD_DELIVERY") or "app").strip().lower()
+DOWNLOAD_ROOT = os.path.abspath(os.environ.get("HEXACTF_DOWNLOAD_ROOT") or "/")
+DOWNLOAD_ACCEL_PREFIX = os.environ.get("HEXACTF_DOWNLOAD_ACCEL_PREFIX", "/_hexactf_files/")
+DOWNLOAD_SIGNED_PREFIX = os.environ.get("HEXACTF_DOWNLOAD_SIGNED_PREFIX", "/files/")
+DOWNLOAD_URL_TTL = int(os.environ.get("HEXACTF_DOWNLOAD_URL_TTL", "300"))
+DOWNLOAD_SECRET = os.environ.get("HEXACTF_DOWNLOAD_SECRET", "")
+
+if DOWNLOAD_DELIVERY not in DOWNLOAD_DELIVERY_MODES:
+    raise ValueError(f"HEXACTF_DOWNLOAD_DELIVERY must be one of {', '.join(DOWNLOAD_DELIVERY_MODES)}")
+if DOWNLOAD_DELIVERY == "signed" and not DOWNLOAD_SECRET:
+    raise ValueError("HEXACTF_DOWNLOAD_SECRET is required for signed downloads (it is shared with nginx)")
+
+
+def _relative_to_root(path: str) -> str | None:
+    target = os.path.abspath(path)
+    if os.path.commonpath([DOWNLOAD_ROOT, target]) != DOWNLOAD_ROOT:
+        return None
+    return os.path.relpath(target, DOWNLOAD_ROOT).replace(os.sep, "/")
+
+
+def _location(prefix: str, relative: str) -> str:
+    return prefix.rstrip("/") + "/" + relative
+
+
+def sign_uri(uri: str, expires: int) -> str:
+    """nginx secure_link token for `secure_link_md5 "$secure_link_expires$uri <secret>"`."""
+    raw = f"{expires}{uri} {DOWNLOAD_SECRET}".encode("utf-8")
+    return base64.urlsafe_b64encode(hashlib.md5(raw).digest()).decode("ascii").rstrip("=")
+
+
+def signed_url(path: str, *, now: float | None = None) -> str | None:
+    """Short-lived nginx URL for a file below the download root, else None."""
+    relative = _relative_to_root(path)
+    if relative is None:
+        return None
+    uri = _location(DOWNLOAD_SIGNED_PREFIX, relative)
+    expires = int(now if now is not None else time.time()) + DOWNLOAD_URL_TTL
+    return f"{quote(uri)}?md5={sign_uri(uri, expires)}&expires={expires}"
+
+
+def offload_download(path: str, filename: str) -> Response | None:
+    """The response that hands `path` to nginx, or None to let the app send it."""
+    if DOWNLOAD_DELIVERY == "app":
+        return None
+    if DOWNLOAD_DELIVERY == "signed":
+        url = signed_url(path)
+        if url is None:
+            return None
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": CACHE_CONTROL})
+    relative = _relative_to_root(path)
+    if relative is None:
+        return None
+    response = Response(status_code=200, media_type="application/octet-stream")
+    response.headers["X-Accel-Redirect"] = quote(_location(DOWNLOAD_ACCEL_PREFIX, relative))
+    quoted = quote(filename)
+    if quoted != filename:
+        response.headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+__all__ = [
+    "DOWNLOAD_DELIVERY",
+    "offload_download",
+    "sign_uri",
+    "signed_url",
+]
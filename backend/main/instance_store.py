@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 import os
 from datetime import datetime, timezone
+from typing import Iterable
 
+from ..core import sqlite_db
 from ..core.config import INSTANCES_FILE
-from ..core.storage_utils import atomic_write_json, exclusive_lock
+from ..core.storage_utils import atomic_write_json, exclusive_lock, shared_lock
 
 # Store module: state file ownership lives here (lock + read/write helpers).
 STATE_FILE = INSTANCES_FILE
@@ -56,7 +58,45 @@ def _normalize_state(raw: object) -> dict:
     return raw
 
 
+def _load_state_sqlite() -> dict:
+    conn = sqlite_db.get_connection()
+    instances = {}
+    for row in conn.execute("SELECT instance_id, data FROM instances"):
+        try:
+            inst = json.loads(row["data"])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(inst, dict):
+            instances[str(row["instance_id"])] = inst
+    return _normalize_state({
+        "next_instance_id": sqlite_db.get_meta(conn, "next_instance_id", 1),
+        "instances": instances,
+        "reusable_instance_ids": sqlite_db.get_meta(conn, "reusable_instance_ids", []),
+    })
+
+
+def _save_state_sqlite(state: dict) -> None:
+    instances = state.get("instances") or {}
+    with sqlite_db.transaction() as conn:
+        stored = {
+            str(row["instance_id"]): row["data"]
+            for row in conn.execute("SELECT instance_id, data FROM instances")
+        }
+        for key in stored.keys() - instances.keys():
+            conn.execute("DELETE FROM instances WHERE instance_id = ?", (int(key),))
+        for key, inst in instances.items():
+            if not isinstance(inst, dict) or not str(key).isdigit():
+                continue
+            inst.setdefault("instance_id", int(key))
+            if stored.get(str(key)) != json.dumps(inst, ensure_ascii=False):
+                sqlite_db.upsert_instance(conn, inst)
+        sqlite_db.set_meta(conn, "next_instance_id", state.get("next_instance_id", 1))
+        sqlite_db.set_meta(conn, "reusable_instance_ids", state.get("reusable_instance_ids") or [])
+
+
 def load_state_unlocked() -> dict:
+    if sqlite_db.sqlite_enabled():
+        return _load_state_sqlite()
     if not os.path.exists(STATE_FILE):
         return _default_state()
     with open(STATE_FILE, "r", encoding="utf-8") as f:
@@ -69,6 +109,9 @@ def load_state_unlocked() -> dict:
 
 
 def save_state_unlocked(state: dict) -> None:
+    if sqlite_db.sqlite_enabled():
+        _save_state_sqlite(state)
+        return
     atomic_write_json(STATE_FILE, state)
 
 
@@ -88,12 +131,13 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _active_count(instances: dict, owner: str) -> int:
+def _active_count(instances: dict, owner: str | set[str]) -> int:
+    owners = owner if isinstance(owner, set) else {owner}
     return sum(
         1
         for inst in instances.values()
         if isinstance(inst, dict)
-        and inst.get("owner") == owner
+        and inst.get("owner") in owners
         and inst.get("status") in ACTIVE_INSTANCE_STATUSES
     )
 
@@ -108,7 +152,16 @@ def _has_active_problem(instances: dict, owner: str, problem_key: str) -> bool:
     )
 
 
-def reserve_starting(*, owner: str, problem_key: str, challenge_id: str, title: str, limit: int | None) -> int:
+def reserve_starting(
+    *,
+    owner: str,
+    problem_key: str,
+    challenge_id: str,
+    title: str,
+    limit: int | None,
+    pool: Iterable[str] | None = None,
+) -> int:
+    """Reserve an instance slot; `pool` (e.g. a team's members) shares `limit` with `owner`."""
     with exclusive_lock(STATE_LOCK_FILE):
         state = load_state_unlocked()
         instances = state.get("instances") or {}
@@ -116,7 +169,8 @@ def reserve_starting(*, owner: str, problem_key: str, challenge_id: str, title:
         if _has_active_problem(instances, owner, problem_key):
             raise ValueError("Instance already running for this challenge")
 
-        if limit is not None and _active_count(instances, owner) >= int(limit):
+        owners = {owner, *pool} if pool else {owner}
+        if limit is not None and _active_count(instances, owners) >= int(limit):
             raise OverflowError(f"Instance limit reached ({int(limit)}). Stop an instance first.")
 
         instance_id = allocate_instance_id(state)
@@ -136,14 +190,21 @@ def reserve_starting(*, owner: str, problem_key: str, challenge_id: str, title:
 
 
 def count_active_by_owner(owner: str) -> int:
-    with exclusive_lock(STATE_LOCK_FILE):
+    if sqlite_db.sqlite_enabled():
+        statuses = sorted(ACTIVE_INSTANCE_STATUSES)
+        row = sqlite_db.get_connection().execute(
+            "SELECT COUNT(*) AS n FROM instances WHERE owner = ? AND status IN ({})".format(",".join("?" * len(statuses))),
+            (owner, *statuses),
+        ).fetchone()
+        return int(row["n"])
+    with shared_lock(STATE_LOCK_FILE):
         state = load_state_unlocked()
         instances = state.get("instances") or {}
         return _active_count(instances, owner)
 
 
 def get_instance(instance_id: int) -> dict | None:
-    with exclusive_lock(STATE_LOCK_FILE):
+    with shared_lock(STATE_LOCK_FILE):
         state = load_state_unlocked()
         inst = (state.get("instances") or {}).get(str(instance_id))
         if isinstance(inst, dict):
@@ -253,7 +314,7 @@ def remove_instance(instance_id: int) -> None:
 
 
 def list_instances_snapshot() -> list[dict]:
-    with exclusive_lock(STATE_LOCK_FILE):
+    with shared_lock(STATE_LOCK_FILE):
         state = load_state_unlocked()
         instances = state.get("instances") or {}
         return [dict(inst) for inst in instances.values() if isinstance(inst, dict)]
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import json
 import os
 from urllib.parse import urlparse
 
-from .settings_service import get_user_instance_limit
+from ..auth import auth
+from ..core.challenge_catalog import CatalogError
+from .settings_service import get_user_instance_limit, uses_team_instance_limit
 from .instance_store import (
     list_instances_snapshot,
     mark_error,
@@ -156,10 +157,8 @@ def start_instance(*, user: dict, problem_key: str) -> dict:
         challenges = load_challenges()
     except FileNotFoundError:
         raise InstancesError(500, "challenges.json not found")
-    except json.JSONDecodeError:
+    except CatalogError:
         raise InstancesError(500, "challenges.json is invalid JSON")
-    if not isinstance(challenges, dict):
-        raise InstancesError(500, "challenges.json must be an object")
     if problem_key not in challenges:
         raise InstancesError(400, "Invalid problem key")
 
@@ -193,6 +192,8 @@ def start_instance(*, user: dict, problem_key: str) -> dict:
         raise InstancesError(401, "Unauthorized")
 
     limit = get_user_instance_limit(user=user)
+    # A team limit is shared: every member's running instances count against it.
+    pool = auth.get_team_members(str(user.get("team") or "")) if uses_team_instance_limit(user) else None
     try:
         instance_id = reserve_starting(
             owner=username,
@@ -200,6 +201,7 @@ def start_instance(*, user: dict, problem_key: str) -> dict:
             challenge_id=str(challenge_id),
             title=str(title),
             limit=limit,
+            pool=pool,
         )
     except OverflowError as e:
         raise InstancesError(429, str(e))
@@ -1,13 +1,23 @@
+import hashlib
 import json
 import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 
 from ...core import models
-from ...core.config import CHALLENGE_FILE
+from ...core.challenge_catalog import Catalog, CatalogError, ChallengeRecord, challenge_catalog
+from ...core.http_cache import CACHE_CONTROL, conditional_response, make_etag
+from ..download_delivery import offload_download
 from ..dynamic_flags import derive_dynamic_flag, dynamic_flag_enabled
 
+CHALLENGE_FILES_CHECK_SECONDS = float(os.environ.get("HEXACTF_CHALLENGE_FILES_CHECK", "5"))
+DOWNLOAD_HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def safe_join(base_dir: str, rel_path: str) -> str | None:
     base_abs = os.path.abspath(base_dir)
@@ -65,42 +75,21 @@ def _stop_owned_instance_after_solve(*, user: dict, problem_key: str) -> dict:
     }
 
 
-def _read_challenges_file() -> dict:
-    with open(CHALLENGE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def challenges_version() -> str:
+    """Content digest of the catalog being served (the same in every worker)."""
+    try:
+        return challenge_catalog.current().digest
+    except (OSError, CatalogError):
+        return "missing"
 
 
 def load_challenges() -> dict:
-    data = _read_challenges_file()
-    if not isinstance(data, dict):
-        raise json.JSONDecodeError("challenges.json must be an object", doc=str(data)[:200], pos=0)
-    return data
-
-
-def _normalize_key(value: str) -> str:
-    return "".join(ch for ch in str(value or "").strip().lower() if ch.isalnum())
+    """key -> challenge entry from the current catalog. Shared between requests: do not mutate."""
+    return challenge_catalog.current().challenges
 
 
-def _resolve_challenge_key(challenges: dict, raw_key: str) -> str | None:
-    if raw_key in challenges:
-        return raw_key
-
-    needle = _normalize_key(raw_key)
-    if not needle:
-        return None
-
-    for key, challenge in challenges.items():
-        if _normalize_key(key) == needle:
-            return key
-        if not isinstance(challenge, dict):
-            continue
-        challenge_id = challenge.get("challenge_id")
-        title = challenge.get("title")
-        if challenge_id and _normalize_key(challenge_id) == needle:
-            return key
-        if title and _normalize_key(title) == needle:
-            return key
-    return None
+def _resolve_challenge_key(catalog: Catalog, raw_key: str) -> str | None:
+    return catalog.resolve(raw_key)
 
 
 def normalize_access_mode(challenge: dict) -> str:
@@ -134,6 +123,15 @@ def derive_difficulty(challenge: dict) -> str:
     return "Beginner"
 
 
+def _file_signature(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a regular file, None if it is missing or not a file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
 def normalize_downloads(challenge: dict) -> list[dict]:
@@ -174,9 +172,10 @@ def build_download_entries(problem_key: str, challenge: dict) -> list[dict]:
     normalized = normalize_downloads(challenge)
     for idx, item in enumerate(normalized):
         abs_path = safe_join(base_dir, item["path"])
-        if not abs_path or not os.path.isfile(abs_path):
+        signature = _file_signature(abs_path) if abs_path else None
+        if signature is None:
             continue
-        size = os.path.getsize(abs_path)
+        size = signature[1]
         entries.append(
             {
                 "label": item["label"],
@@ -207,23 +206,34 @@ def _strip_leading_markdown_title(text: str) -> str:
     return "\n".join(lines).strip()
 
 
+# Description.md path -> ((mtime_ns, size), text): only edited descriptions are re-read.
+_description_cache: dict[str, tuple[tuple[int, int], str]] = {}
+
+
 def _load_description_markdown(challenge: dict) -> str:
     base_dir = challenge.get("dir")
     if not base_dir:
         return ""
 
     description_path = safe_join(str(base_dir), "Description.md")
-    if not description_path or not os.path.isfile(description_path):
+    signature = _file_signature(description_path) if description_path else None
+    if signature is None:
         return ""
+    cached = _description_cache.get(description_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
 
     try:
         with open(description_path, "r", encoding="utf-8") as f:
-            return _strip_leading_markdown_title(f.read())
+            text = _strip_leading_markdown_title(f.read())
     except OSError:
         return ""
+    _description_cache[description_path] = (signature, text)
+    return text
 
 
-def sanitize_challenge(problem_key: str, challenge: dict, solve_count: int = 0) -> dict:
+def _public_challenge(problem_key: str, challenge: dict) -> dict:
+    """The public view of a challenge without its live fields (solves, first blood, current score)."""
     ch = dict(challenge)
     ch.pop("dir", None)
     ch.pop("flag", None)
@@ -242,8 +252,6 @@ def sanitize_challenge(problem_key: str, challenge: dict, solve_count: int = 0)
     ch["challenge_id"] = ch.get("challenge_id") or problem_key
     ch["access_mode"] = normalize_access_mode(challenge)
     ch["downloads"] = build_download_entries(problem_key, challenge)
-    ch["solve_count"] = int(solve_count)
-    ch["solves"] = int(solve_count)
     ch["difficulty"] = derive_difficulty(challenge)
     ch["author"] = (
         challenge.get("author")
@@ -274,73 +282,269 @@ def sanitize_challenge(problem_key: str, challenge: dict, solve_count: int = 0)
     return ch
 
 
+def _live_fields(public: dict, solve_count: int, first_blood: dict | None, value: int | None) -> dict:
+    live = {"solve_count": int(solve_count), "solves": int(solve_count), "first_blood": first_blood}
+    if value is not None:
+        # Dynamic scoring: show what a solve is worth now, not the initial value.
+        live["score"] = int(value)
+    elif "score" in public:
+        live["score"] = public["score"]
+    return live
+
+
+def sanitize_challenge(
+    problem_key: str,
+    challenge: dict,
+    solve_count: int = 0,
+    first_blood: dict | None = None,
+    value: int | None = None,
+) -> dict:
+    ch = _public_challenge(problem_key, challenge)
+    ch.update(_live_fields(ch, solve_count, first_blood, value))
+    return ch
+
+
+def _dump(value: object) -> str:
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+class PublicChallenges:
+    """Public payloads of one catalog version, with the list pre-serialized.
+
+    Each entry is kept as its JSON text minus the live fields and the closing
+    brace, so a list response is those fragments joined with the current solve
+    counts, first bloods and values appended. The files the payloads were built
+    from (downloads, Description.md) are re-stat'ed at most every
+    CHALLENGE_FILES_CHECK_SECONDS; a change rebuilds the view, re-reading only
+    the descriptions that changed.
+    """
+
+    def __init__(self, catalog: Catalog) -> None:
+        self.catalog_version = catalog.version
+        self.files = {path: _file_signature(path) for path in _referenced_files(catalog)}
+        self.checked_at = time.monotonic()
+        self.payloads = {key: _public_challenge(key, record.raw) for key, record in catalog.records.items()}
+        # key -> (challenge dir, [(absolute path or None, label)]) for /api/download.
+        self.downloads = {key: (record.dir, _download_paths(record)) for key, record in catalog.records.items()}
+        self.fragments = []
+        for key, public in self.payloads.items():
+            static = {name: item for name, item in public.items() if name not in _LIVE_FIELDS}
+            self.fragments.append((key, _dump(key) + ":" + _dump(static)[:-1]))
+        files = repr(sorted(self.files.items())).encode("utf-8")
+        self.version = f"{catalog.digest}.{hashlib.blake2b(files, digest_size=8).hexdigest()}"
+
+    def files_changed(self) -> bool:
+        return any(_file_signature(path) != signature for path, signature in self.files.items())
+
+    def render(self, solve_counts: dict, first_bloods: dict, values: dict) -> bytes:
+        parts = []
+        for key, fragment in self.fragments:
+            live = _live_fields(self.payloads[key], solve_counts.get(key, 0), first_bloods.get(key), values.get(key))
+            parts.append(fragment + "".join("," + _dump(name) + ":" + _dump(item) for name, item in live.items()) + "}")
+        return ("{" + ",".join(parts) + "}").encode("utf-8")
+
+
+_LIVE_FIELDS = frozenset({"solve_count", "solves", "first_blood", "score"})
+_public_lock = threading.Lock()
+_public_view: PublicChallenges | None = None
+
+
+def _download_paths(record: ChallengeRecord) -> list[tuple[str | None, str]]:
+    return [
+        (safe_join(record.dir, item["path"]) if record.dir else None, item["label"])
+        for item in normalize_downloads(record.raw)
+    ]
+
+
+def _referenced_files(catalog: Catalog) -> list[str]:
+    paths = []
+    for record in catalog.records.values():
+        if not record.dir:
+            continue
+        paths.extend(abs_path for abs_path, _ in _download_paths(record) if abs_path)
+        description_path = safe_join(record.dir, "Description.md")
+        if description_path:
+            paths.append(description_path)
+    return paths
+
+
+def public_challenges() -> PublicChallenges:
+    """The public view of the current catalog (raises like load_challenges if there is none)."""
+    global _public_view
+    catalog = challenge_catalog.current()
+    view = _public_view
+    if (
+        view is not None
+        and view.catalog_version == catalog.version
+        and time.monotonic() - view.checked_at < CHALLENGE_FILES_CHECK_SECONDS
+    ):
+        return view
+    with _public_lock:
+        view = _public_view
+        if view is None or view.catalog_version != catalog.version or view.files_changed():
+            view = PublicChallenges(catalog)
+            _public_view = view
+        else:
+            view.checked_at = time.monotonic()
+        return view
+
+
 @router.get("/api/challenges")
-def list_challenges():
+def list_challenges(request: Request, response: Response):
     try:
-        challenges = load_challenges()
-        if not isinstance(challenges, dict):
-            raise json.JSONDecodeError("challenges.json must be an object", doc=str(challenges)[:200], pos=0)
-        solve_counts = auth.get_problem_solve_counts()
-        out = {}
-        for key, challenge in challenges.items():
-            out[key] = sanitize_challenge(key, challenge, solve_counts.get(key, 0))
-        return out
+        view = public_challenges()
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="challenges.json not found")
-    except json.JSONDecodeError:
+    except CatalogError:
         raise HTTPException(status_code=500, detail="challenges.json is invalid JSON")
+    # Solve counts and first bloods come from the user table, so both versions count.
+    etag = make_etag("challenges", view.version, auth.users_data_version())
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    body = view.render(auth.get_problem_solve_counts(), auth.get_first_bloods(), auth.get_challenge_values())
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
 
 @router.get("/api/challenges/{problem_key}")
 def challenge_detail(problem_key: str):
     try:
-        challenges = load_challenges()
-        solve_counts = auth.get_problem_solve_counts()
+        catalog = challenge_catalog.current()
+        view = public_challenges()
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="challenges.json not found")
-    except json.JSONDecodeError:
+    except CatalogError:
         raise HTTPException(status_code=500, detail="challenges.json is invalid JSON")
 
-    resolved_key = _resolve_challenge_key(challenges, problem_key)
-    if not resolved_key:
+    resolved_key = _resolve_challenge_key(catalog, problem_key)
+    public = view.payloads.get(resolved_key) if resolved_key else None
+    if public is None:
         raise HTTPException(status_code=404, detail="challenge not found")
 
-    challenge = challenges.get(resolved_key)
-    if not isinstance(challenge, dict):
-        raise HTTPException(status_code=404, detail="challenge not found")
+    challenge = dict(public)
+    challenge.update(
+        _live_fields(
+            public,
+            auth.get_problem_solve_counts().get(resolved_key, 0),
+            auth.get_first_bloods().get(resolved_key),
+            auth.get_challenge_values().get(resolved_key),
+        )
+    )
+    return {"status": "ok", "challenge": challenge}
 
-    return {
-        "status": "ok",
-        "challenge": sanitize_challenge(resolved_key, challenge, solve_counts.get(resolved_key, 0)),
-    }
+
+# (path, inode, mtime_ns, size) -> strong ETag of the file's content. Hashing a
+# large attachment is paid once per file version, not per download, and it runs
+# on a background thread: until the hash is ready the file is served with a
+# strong ETag built from the version key itself, so no download waits for a
+# full read of a multi-hundred-MB image (or for another file's hash).
+_content_etags: dict[tuple[str, int, int, int], str] = {}
+_content_etags_pending: set[tuple[str, int, int, int]] = set()
+_content_etag_lock = threading.Lock()
+_content_hasher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hexactf-download-hash")
+
+
+def _hash_content(key: tuple[str, int, int, int]) -> None:
+    path = key[0]
+    etag = None
+    try:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        after = os.stat(path)
+        if (after.st_ino, after.st_mtime_ns, after.st_size) == key[1:]:
+            etag = '"' + digest.hexdigest()[:32] + '"'
+    except OSError:
+        pass
+    with _content_etag_lock:
+        _content_etags_pending.discard(key)
+        if etag is not None:
+            for stale in [cached for cached in _content_etags if cached[0] == path]:
+                del _content_etags[stale]
+            _content_etags[key] = etag
+
+
+def _content_etag(path: str, st: os.stat_result) -> str:
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    etag = _content_etags.get(key)
+    if etag is not None:
+        return etag
+    with _content_etag_lock:
+        etag = _content_etags.get(key)
+        if etag is not None:
+            return etag
+        if key not in _content_etags_pending:
+            _content_etags_pending.add(key)
+            _content_hasher.submit(_hash_content, key)
+    return _version_etag(st)
+
+
+def _version_etag(st: os.stat_result) -> str:
+    return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _download_etag(request: Request, path: str, st: os.stat_result) -> str:
+    """The content ETag, unless the client validates with this version's stat-based one.
+
+    Both name the same bytes, so a download started before the hash was ready
+    still gets its 304 or resumes with If-Range instead of starting over.
+    """
+    version_etag = _version_etag(st)
+    for header in ("if-range", "if-none-match"):
+        if version_etag in (request.headers.get(header) or ""):
+            return version_etag
+    return _content_etag(path, st)
 
 
 @router.get("/api/download/{problem_key}/{file_index}")
-def download(problem_key: str, file_index: int, request: Request):
+def download(problem_key: str, file_index: int, request: Request, response: Response):
     get_current_user(request)
-    challenges = load_challenges()
-    challenge = challenges.get(problem_key)
-    if not challenge:
+    try:
+        view = public_challenges()
+    except (OSError, CatalogError):
+        raise HTTPException(status_code=404, detail="challenge not found")
+    entry = view.downloads.get(problem_key)
+    if entry is None:
         raise HTTPException(status_code=404, detail="challenge not found")
 
-    normalized = normalize_downloads(challenge)
-    if file_index < 0 or file_index >= len(normalized):
+    base_dir, files = entry
+    if file_index < 0 or file_index >= len(files):
         raise HTTPException(status_code=404, detail="file not found")
-
-    base_dir = challenge.get("dir")
     if not base_dir:
         raise HTTPException(status_code=404, detail="challenge dir not found")
 
-    item = normalized[file_index]
-    abs_path = safe_join(base_dir, item["path"])
-    if not abs_path or not os.path.isfile(abs_path):
+    abs_path, label = files[file_index]
+    try:
+        st = os.stat(abs_path) if abs_path else None
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="file not found")
 
-    return FileResponse(abs_path, filename=item["label"], media_type="application/octet-stream")
+    offloaded = offload_download(abs_path, label)
+    if offloaded is not None:
+        return offloaded
+
+    # Strong ETag: If-None-Match answers 304, and FileResponse honours Range /
+    # If-Range against it (206, multipart for several ranges). On servers with
+    # the ASGI pathsend extension a full download is handed to the server.
+    etag = _download_etag(request, abs_path, st)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    return FileResponse(
+        abs_path,
+        filename=label,
+        media_type="application/octet-stream",
+        stat_result=st,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
 
 
 __all__ = [
     "router",
+    "challenges_version",
     "load_challenges",
     "normalize_access_mode",
     "safe_join",
@@ -391,15 +595,15 @@ def submit_flag(req: models.SubmitRequest, request: Request):
     require_csrf(request)
 
     try:
-        challenges = load_challenges()
+        record = challenge_catalog.current().get(req.problem)
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="challenges.json not found")
-    except json.JSONDecodeError:
+    except CatalogError:
         raise HTTPException(status_code=500, detail="challenges.json is invalid JSON")
 
-    challenge = challenges.get(req.problem)
-    if not isinstance(challenge, dict):
+    if record is None:
         raise HTTPException(status_code=404, detail="challenge not found")
+    challenge = record.raw
 
     username = str(user.get("username") or "").strip()
     if not username:
@@ -414,10 +618,13 @@ def submit_flag(req: models.SubmitRequest, request: Request):
     if submitted != expected:
         return {"status": "ok", "correct": False}
 
-    score = int(challenge.get("score") or 0)
+    # Dynamic challenges are recorded at their current value; every solver's
+    # score then follows the value as it decays (see auth.scoring).
+    score = auth.get_challenge_values().get(req.problem, record.score)
     solved, user_info = auth.mark_problem_solved(username, req.problem, score)
     instance_stop = None
     if solved:
+        score = auth.get_challenge_values().get(req.problem, score)
         instance_stop = _stop_owned_instance_after_solve(user=user, problem_key=req.problem)
     return {
         "status": "ok",
@@ -1,11 +1,31 @@
-from fastapi import APIRouter, HTTPException, Request
+import asyncio
+import time
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from ...auth import auth
 from ...auth.deps import get_optional_user
+from ...auth.ranking import solved_at_ts
+from ...core.challenge_catalog import CatalogError, challenge_catalog
+from ...core.http_cache import conditional_response, make_etag
+from ..scoreboard_freeze import scoreboard_freeze
+from ..scoreboard_stream import (
+    FROZEN_EVENT,
+    SCOREBOARD_STREAM_HEARTBEAT_SECONDS,
+    SCOREBOARD_STREAM_TOP_N,
+    format_sse,
+    scoreboard_broadcaster,
+)
 from ..settings_service import is_ranking_visible
+from .challenges import _resolve_challenge_key, challenges_version
 
 router = APIRouter()
 
+# The timeline window ends at "now"; let a cached copy age at most this long.
+TIMELINE_ETAG_SECONDS = 60
+
 
 def _ensure_ranking_visible(request: Request) -> dict | None:
     user = get_optional_user(request)
@@ -19,45 +39,299 @@ def _ensure_ranking_visible(request: Request) -> dict | None:
     )
 
 
+def _frozen_board_for(user: dict | None, as_of: str | None = None):
+    """The frozen board to serve instead of live data, if any.
+
+    Players may still look up standings from before the freeze with `as_of`.
+    """
+    board = scoreboard_freeze.public_board(user)
+    if board is None or not as_of:
+        return board
+    ts = solved_at_ts(as_of)
+    if ts is not None and ts < solved_at_ts(board.freeze_at):
+        return None
+    return board
+
+
 @router.get("/api/scoreboard")
-def scoreboard(request: Request):
-    _ensure_ranking_visible(request)
-    rows = auth.get_scoreboard()
-    return {"status": "ok", "scoreboard": rows}
+def scoreboard(
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+    as_of: str | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    limit = min(max(1, limit), 1000)
+    frozen = _frozen_board_for(user, as_of)
+    if frozen is not None:
+        cached = conditional_response(request, response, make_etag("frozen-scoreboard", frozen.id, limit, cursor))
+        if cached is not None:
+            return cached
+        try:
+            rows, next_cursor = frozen.page(limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"status": "ok", "scoreboard": rows, "next_cursor": next_cursor, "frozen_at": frozen.frozen_at}
 
+    etag = make_etag("scoreboard", auth.users_data_version(), limit, cursor, as_of)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        if as_of:
+            rows, next_cursor = auth.get_scoreboard_as_of(as_of, limit=limit, cursor=cursor)
+        else:
+            rows, next_cursor = auth.get_scoreboard_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "scoreboard": rows, "next_cursor": next_cursor}
 
-@router.get("/api/scoreboard/summary")
-def scoreboard_summary(request: Request):
-    _ensure_ranking_visible(request)
-    rows = auth.get_scoreboard(limit=100000)
-    summary = auth.get_scoreboard_summary()
+
+def _summary_payload(summary: dict) -> dict:
+    top_users = summary.get("top_users") or []
     return {
-        "status": "ok",
-        "summary": {
-            "total_participants": summary.get("total_players", len(rows)),
-            "total_score": sum(int(row.get("score") or 0) for row in rows),
-            "total_solves": summary.get("total_solves", sum(int(row.get("solved_count") or 0) for row in rows)),
-            "leader": rows[0] if rows else None,
-            "top_3": summary.get("top_users", rows[:3]),
-        },
+        "total_participants": summary.get("total_players", 0),
+        "total_score": summary.get("total_score", 0),
+        "total_solves": summary.get("total_solves", 0),
+        "leader": top_users[0] if top_users else None,
+        "top_3": top_users,
     }
 
 
+@router.get("/api/scoreboard/summary")
+def scoreboard_summary(request: Request, response: Response):
+    user = _ensure_ranking_visible(request)
+    frozen = _frozen_board_for(user)
+    if frozen is not None:
+        cached = conditional_response(request, response, make_etag("frozen-summary", frozen.id))
+        if cached is not None:
+            return cached
+        return {"status": "ok", "summary": _summary_payload(frozen.summary), "frozen_at": frozen.frozen_at}
+
+    cached = conditional_response(request, response, make_etag("summary", auth.users_data_version()))
+    if cached is not None:
+        return cached
+    return {"status": "ok", "summary": _summary_payload(auth.get_scoreboard_summary())}
+
+
+def _closed_event(info: dict) -> str:
+    return format_sse("closed", {"message": str(info.get("closed_message") or "This page has been closed.")})
+
+
+async def _frozen_events(user: dict | None, frozen):
+    # No deltas while frozen: one snapshot of the stored board, then keep-alives
+    # until the board closes or the freeze is lifted or moved (the client reconnects).
+    yield "retry: 3000\n\n"
+    rows = frozen.rows[:SCOREBOARD_STREAM_TOP_N]
+    yield format_sse(
+        "snapshot",
+        {"rows": rows, "top_n": SCOREBOARD_STREAM_TOP_N, "frozen_at": frozen.frozen_at},
+        f"frozen-{frozen.id}",
+    )
+    while True:
+        await asyncio.sleep(SCOREBOARD_STREAM_HEARTBEAT_SECONDS)
+        visible, info = await run_in_threadpool(is_ranking_visible, user)
+        if not visible:
+            yield _closed_event(info)
+            return
+        current = await run_in_threadpool(scoreboard_freeze.public_board, user)
+        if current is None or current.id != frozen.id:
+            return
+        yield ": ping\n\n"
+
+
+async def _scoreboard_events(user: dict | None, last_event_id: str | None):
+    frozen = await run_in_threadpool(scoreboard_freeze.public_board, user)
+    if frozen is not None:
+        async for message in _frozen_events(user, frozen):
+            yield message
+        return
+
+    public = not (user is not None and str(user.get("role") or "") == "admin")
+    loop = asyncio.get_running_loop()
+    subscriber, backlog = await run_in_threadpool(scoreboard_broadcaster.subscribe, loop, last_event_id, public=public)
+    try:
+        yield "retry: 3000\n\n"
+        for message in backlog:
+            yield message
+        next_check = loop.time() + SCOREBOARD_STREAM_HEARTBEAT_SECONDS
+        while True:
+            if subscriber.overflowed:
+                scoreboard_broadcaster.unsubscribe(subscriber)
+                subscriber, backlog = await run_in_threadpool(scoreboard_broadcaster.subscribe, loop, None, public=public)
+                for message in backlog:
+                    yield message
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), max(0.0, next_check - loop.time()))
+            except asyncio.TimeoutError:
+                message = None
+            if loop.time() >= next_check:
+                # Re-evaluate visibility (schedule or toggle may have closed the board).
+                visible, info = await run_in_threadpool(is_ranking_visible, user)
+                if not visible:
+                    yield _closed_event(info)
+                    return
+                if public and await run_in_threadpool(scoreboard_freeze.is_frozen):
+                    yield FROZEN_EVENT
+                    return
+                next_check = loop.time() + SCOREBOARD_STREAM_HEARTBEAT_SECONDS
+                if message is None:
+                    yield ": ping\n\n"
+            if message is not None:
+                yield message
+                if message == FROZEN_EVENT:
+                    return
+    finally:
+        scoreboard_broadcaster.unsubscribe(subscriber)
+
+
+@router.get("/api/scoreboard/stream")
+async def scoreboard_stream(request: Request, last_event_id: str | None = None):
+    """Server-Sent Events: a top-N snapshot, then rank/score deltas as solves land."""
+    user = await run_in_threadpool(_ensure_ranking_visible, request)
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    return StreamingResponse(
+        _scoreboard_events(user, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/api/scoreboard/timeline")
-def scoreboard_timeline(request: Request, hours: int | None = None, limit: int = 10, full: bool = False):
-    _ensure_ranking_visible(request)
-    return {
-        "status": "ok",
-        "timeline": auth.get_scoreboard_timeline(hours=None if full else hours, limit=limit),
-    }
+def scoreboard_timeline(
+    request: Request,
+    response: Response,
+    hours: int | None = None,
+    limit: int = 10,
+    full: bool = False,
+    bucket: str | None = None,
+    max_points: int | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    frozen = _frozen_board_for(user)
+    if frozen is not None:
+        # The stored timeline is the full window at freeze time; shaping options do not apply.
+        cached = conditional_response(request, response, make_etag("frozen-timeline", frozen.id, limit))
+        if cached is not None:
+            return cached
+        return {"status": "ok", "timeline": frozen.timeline_for(limit), "frozen_at": frozen.frozen_at}
+
+    etag = make_etag(
+        "timeline",
+        auth.users_data_version(),
+        None if full else hours,
+        limit,
+        bucket,
+        max_points,
+        int(time.time() // TIMELINE_ETAG_SECONDS),
+    )
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        timeline = auth.get_scoreboard_timeline(
+            hours=None if full else hours,
+            limit=limit,
+            bucket=bucket,
+            max_points=max_points,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "timeline": timeline}
+
+
+@router.get("/api/scoreboard/category/{category}")
+def scoreboard_category(
+    category: str,
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+    as_of: str | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    category = (category or "").strip().lower()
+    limit = min(max(1, limit), 1000)
+    if category not in auth.get_categories():
+        raise HTTPException(status_code=404, detail="category not found")
+    frozen = _frozen_board_for(user, as_of)
+    if frozen is not None:
+        # Category boards are not stored with the snapshot; replay up to the freeze instead.
+        as_of = frozen.freeze_at
+    etag = make_etag("scoreboard-category", auth.users_data_version(), category, limit, cursor, as_of)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        if as_of:
+            rows, next_cursor = auth.get_scoreboard_as_of(as_of, limit=limit, cursor=cursor, category=category)
+        else:
+            rows, next_cursor = auth.get_category_scoreboard_page(category, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    out = {"status": "ok", "category": category, "scoreboard": rows, "next_cursor": next_cursor}
+    if frozen is not None:
+        out["frozen_at"] = frozen.frozen_at
+    return out
+
+
+@router.get("/api/challenges/{problem_key}/solvers")
+def challenge_solvers(
+    problem_key: str,
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    limit = min(max(1, limit), 1000)
+    try:
+        catalog = challenge_catalog.current()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="challenges.json not found")
+    except CatalogError:
+        raise HTTPException(status_code=500, detail="challenges.json is invalid JSON")
+    resolved_key = _resolve_challenge_key(catalog, problem_key)
+    if not resolved_key:
+        raise HTTPException(status_code=404, detail="challenge not found")
+
+    frozen = _frozen_board_for(user)
+    until = frozen.freeze_at if frozen is not None else None
+    etag = make_etag("solvers", challenges_version(), auth.users_data_version(), resolved_key, limit, cursor, until)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        rows, next_cursor = auth.get_challenge_solvers(resolved_key, limit=limit, cursor=cursor, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    out = {"status": "ok", "key": resolved_key, "solvers": rows, "next_cursor": next_cursor}
+    if frozen is not None:
+        out["frozen_at"] = frozen.frozen_at
+    return out
 
 
 @router.get("/api/scoreboard/{username}")
 def scoreboard_user_detail(username: str, request: Request):
-    _ensure_ranking_visible(request)
-    rows = auth.get_scoreboard(limit=100000)
+    user = _ensure_ranking_visible(request)
     username_norm = (username or "").strip().lower()
-    entry = next((row for row in rows if str(row.get("username") or "").strip().lower() == username_norm), None)
+    frozen = _frozen_board_for(user)
+    if frozen is not None:
+        entry = frozen.entry(username_norm)
+        if not entry:
+            raise HTTPException(status_code=404, detail="user not found on scoreboard")
+        return {
+            "status": "ok",
+            "entry": entry,
+            "details": {
+                "total_participants": len(frozen.rows),
+                "solved_problems": list(frozen.solved.get(username_norm) or []),
+            },
+            "frozen_at": frozen.frozen_at,
+        }
+
+    entry = auth.get_scoreboard_entry(username_norm)
     if not entry:
         raise HTTPException(status_code=404, detail="user not found on scoreboard")
 
@@ -69,7 +343,7 @@ def scoreboard_user_detail(username: str, request: Request):
         "status": "ok",
         "entry": entry,
         "details": {
-            "total_participants": len(rows),
+            "total_participants": auth.count_scoreboard_entries(),
             "solved_problems": solved,
         },
     }
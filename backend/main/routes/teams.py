@@ -0,0 +1,148 @@
+import time
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from ...auth import auth
+from ...auth.deps import get_current_user, require_csrf
+from ...core import models
+from ...core.http_cache import conditional_response, make_etag
+from .scoreboard import TIMELINE_ETAG_SECONDS, _ensure_ranking_visible, _frozen_board_for
+
+router = APIRouter()
+
+
+@router.get("/api/teams/me")
+def my_team(request: Request):
+    user = get_current_user(request)
+    team = str(user.get("team") or "")
+    info = auth.get_team(team, include_code=True) if team else None
+    return {"status": "ok", "team": info}
+
+
+@router.post("/api/teams")
+def create_team(req: models.TeamCreateRequest, request: Request):
+    user = get_current_user(request)
+    require_csrf(request)
+    try:
+        team = auth.create_team(str(user.get("username") or ""), req.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "team": team}
+
+
+@router.post("/api/teams/join")
+def join_team(req: models.TeamJoinRequest, request: Request):
+    user = get_current_user(request)
+    require_csrf(request)
+    try:
+        team = auth.join_team(str(user.get("username") or ""), req.name, req.join_code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "team": team}
+
+
+@router.post("/api/teams/leave")
+def leave_team(request: Request):
+    user = get_current_user(request)
+    require_csrf(request)
+    try:
+        auth.leave_team(str(user.get("username") or ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok"}
+
+
+@router.get("/api/teams/scoreboard")
+def team_scoreboard(
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    cursor: str | None = None,
+    as_of: str | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    limit = min(max(1, limit), 1000)
+    frozen = _frozen_board_for(user, as_of)
+    if frozen is not None:
+        # Team boards are not stored with the snapshot; replay up to the freeze instead.
+        # The replay uses current membership, so the user table version stays in the tag.
+        as_of = frozen.freeze_at
+        etag = make_etag("frozen-teams", frozen.id, auth.users_data_version(), limit, cursor)
+    else:
+        etag = make_etag("teams", auth.users_data_version(), limit, cursor, as_of)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        if as_of:
+            rows, next_cursor = auth.get_team_scoreboard_as_of(as_of, limit=limit, cursor=cursor)
+        else:
+            rows, next_cursor = auth.get_team_scoreboard_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    out = {"status": "ok", "scoreboard": rows, "next_cursor": next_cursor}
+    if frozen is not None:
+        out["frozen_at"] = frozen.frozen_at
+    return out
+
+
+@router.get("/api/teams/scoreboard/timeline")
+def team_scoreboard_timeline(
+    request: Request,
+    response: Response,
+    hours: int | None = None,
+    limit: int = 10,
+    full: bool = False,
+    bucket: str | None = None,
+    max_points: int | None = None,
+):
+    user = _ensure_ranking_visible(request)
+    frozen = _frozen_board_for(user)
+    as_of = frozen.freeze_at if frozen is not None else None
+    etag = make_etag(
+        "teams-timeline",
+        frozen.id if frozen is not None else None,
+        auth.users_data_version(),
+        None if full else hours,
+        limit,
+        bucket,
+        max_points,
+        None if frozen is not None else int(time.time() // TIMELINE_ETAG_SECONDS),
+    )
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
+    try:
+        timeline = auth.get_team_scoreboard_timeline(
+            hours=None if full else hours,
+            limit=limit,
+            bucket=bucket,
+            max_points=max_points,
+            as_of=as_of,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    out = {"status": "ok", "timeline": timeline}
+    if frozen is not None:
+        out["frozen_at"] = frozen.frozen_at
+    return out
+
+
+@router.get("/api/teams/scoreboard/{team}")
+def team_scoreboard_detail(team: str, request: Request):
+    user = _ensure_ranking_visible(request)
+    info = auth.get_team(team)
+    if info is None:
+        raise HTTPException(status_code=404, detail="team not found")
+    frozen = _frozen_board_for(user)
+    if frozen is not None:
+        rows, _ = auth.get_team_scoreboard_as_of(frozen.freeze_at, limit=auth.count_teams() + 1)
+        entry = next((row for row in rows if row["team"] == info["team"]), None)
+    else:
+        entry = auth.get_team_scoreboard_entry(info["team"])
+    if entry is None:
+        raise HTTPException(status_code=404, detail="team not found on scoreboard")
+    out = {"status": "ok", "entry": entry, "members": info["members"]}
+    if frozen is not None:
+        out["frozen_at"] = frozen.frozen_at
+    return out
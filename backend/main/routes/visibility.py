@@ -1,14 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from datetime import UTC, datetime
-from ..settings_service import is_challenges_visible, is_ranking_visible
+from ...core.http_cache import conditional_response, make_etag
+from ..settings_service import get_settings_version, is_challenges_visible, is_ranking_visible
 
 router = APIRouter()
 
 
 @router.get("/api/visibility")
-def get_visibility():
+def get_visibility(request: Request, response: Response):
     challenges_visible, challenges_info = is_challenges_visible()
     ranking_visible, ranking_info = is_ranking_visible()
+    # Schedules flip visibility without a settings save, so the evaluated flags
+    # are part of the tag; server_time alone does not make a response new.
+    etag = make_etag("visibility", get_settings_version(), challenges_visible, ranking_visible)
+    cached = conditional_response(request, response, etag)
+    if cached is not None:
+        return cached
     return {
         "challenges_visible": challenges_visible,
         "challenges_opens_at": challenges_info.get("opens_at"),
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import threading
+from bisect import bisect_right
+from datetime import UTC, datetime
+
+from ..auth import auth
+from ..auth.ranking import decode_cursor, encode_cursor
+from ..core import sqlite_db
+from ..core.background import PeriodicTask
+from ..core.config import DATA_DIR, SCOREBOARD_FREEZE_FILE
+from ..core.storage_utils import atomic_write_json, exclusive_lock
+from .settings_service import get_ranking_freeze_at
+
+# Scoreboard freeze: once `ranking_freeze_at` passes, the public board, summary
+# and timeline are materialized from the standings at exactly that instant and
+# stored. Public reads serve the stored snapshot; admins keep the live board.
+SCOREBOARD_FREEZE_CHECK_SECONDS = float(os.environ.get("HEXACTF_SCOREBOARD_FREEZE_CHECK", "1"))
+SCOREBOARD_FREEZE_TIMELINE_LIMIT = 10
+SCOREBOARD_FREEZE_LOCK_FILE = SCOREBOARD_FREEZE_FILE + ".lock"
+
+
+def _read_snapshot() -> dict | None:
+    if sqlite_db.sqlite_enabled():
+        raw = sqlite_db.get_meta(sqlite_db.get_connection(), "scoreboard_freeze")
+    else:
+        try:
+            with open(SCOREBOARD_FREEZE_FILE, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    return raw if isinstance(raw, dict) and raw.get("id") else None
+
+
+def _write_snapshot(snapshot: dict | None) -> None:
+    if sqlite_db.sqlite_enabled():
+        with sqlite_db.transaction() as conn:
+            sqlite_db.set_meta(conn, "scoreboard_freeze", snapshot)
+            sqlite_db.set_meta(conn, "scoreboard_freeze_id", (snapshot or {}).get("id"))
+        return
+    if snapshot is None:
+        try:
+            os.remove(SCOREBOARD_FREEZE_FILE)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(DATA_DIR, exist_ok=True)
+    atomic_write_json(SCOREBOARD_FREEZE_FILE, snapshot)
+
+
+def _snapshot_signature() -> object:
+    if sqlite_db.sqlite_enabled():
+        return sqlite_db.get_meta(sqlite_db.get_connection(), "scoreboard_freeze_id")
+    try:
+        st = os.stat(SCOREBOARD_FREEZE_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class FrozenBoard:
+    """A stored snapshot, indexed for paging and per-user lookups.
+
+    Cursors use the live board's encoding with the frozen rank in place of the
+    last-solve time, so they sort the same way and never change.
+    """
+
+    def __init__(self, snapshot: dict) -> None:
+        self.id = str(snapshot["id"])
+        self.freeze_at = str(snapshot.get("freeze_at") or "")
+        self.frozen_at = str(snapshot.get("frozen_at") or self.freeze_at)
+        self.rows: list[dict] = list(snapshot.get("scoreboard") or [])
+        self.summary: dict = dict(snapshot.get("summary") or {})
+        self.timeline: dict = dict(snapshot.get("timeline") or {})
+        self.solved: dict[str, list[str]] = dict(snapshot.get("solved") or {})
+        self._keys = [(-int(row["score"]), float(row["rank"]), str(row["username"])) for row in self.rows]
+        self._by_name = {str(row["username"]): row for row in self.rows}
+
+    def page(self, limit: int, cursor: str | None = None) -> tuple[list[dict], str | None]:
+        after = decode_cursor(cursor) if cursor else None
+        start = bisect_right(self._keys, after) if after is not None else 0
+        end = start + max(1, int(limit))
+        next_cursor = encode_cursor(self._keys[end - 1]) if end < len(self.rows) else None
+        return self.rows[start:end], next_cursor
+
+    def entry(self, username: str) -> dict | None:
+        return self._by_name.get(username)
+
+    def timeline_for(self, limit: int) -> dict:
+        return dict(self.timeline, series=list(self.timeline.get("series") or [])[: max(1, int(limit))])
+
+
+class ScoreboardFreeze:
+    """Per-worker view of the stored snapshot, re-read only when the store changes."""
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._board: FrozenBoard | None = None
+        self._signature: object = None
+
+    @staticmethod
+    def due_freeze_at() -> str | None:
+        """The configured freeze time if it has passed (canonical ISO), else None."""
+        freeze_at = get_ranking_freeze_at()
+        if freeze_at is None:
+            return None
+        if freeze_at.tzinfo is None:
+            freeze_at = freeze_at.replace(tzinfo=UTC)
+        if datetime.now(UTC) < freeze_at:
+            return None
+        return freeze_at.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+    def is_frozen(self) -> bool:
+        return self.due_freeze_at() is not None
+
+    def _stored(self) -> FrozenBoard | None:
+        with self._mutex:
+            signature = _snapshot_signature()
+            if signature != self._signature:
+                snapshot = _read_snapshot()
+                self._board = FrozenBoard(snapshot) if snapshot else None
+                self._signature = signature
+            return self._board
+
+    def sync(self) -> FrozenBoard | None:
+        """Make the store match the settings and return the active frozen board, if any.
+
+        Run every second by `freeze_scheduler`, so the snapshot is normally in
+        place when the freeze time passes; a read that lands before the next
+        tick builds it itself. Moving or clearing `ranking_freeze_at` rebuilds
+        or drops the snapshot.
+        """
+        wanted = self.due_freeze_at()
+        board = self._stored()
+        if (board.freeze_at if board else None) == wanted:
+            return board
+        with exclusive_lock(SCOREBOARD_FREEZE_LOCK_FILE):
+            # Another worker may have materialized it while we waited.
+            board = self._stored()
+            if (board.freeze_at if board else None) != wanted:
+                snapshot = None
+                if wanted is not None:
+                    snapshot = auth.build_frozen_scoreboard(wanted, timeline_limit=SCOREBOARD_FREEZE_TIMELINE_LIMIT)
+                    snapshot["id"] = secrets.token_hex(8)
+                    snapshot["freeze_at"] = wanted
+                _write_snapshot(snapshot)
+        return self._stored()
+
+    def public_board(self, user: dict | None) -> FrozenBoard | None:
+        """The frozen board `user` should see instead of the live one (admins never do)."""
+        if user is not None and str(user.get("role") or "") == "admin":
+            return None
+        return self.sync()
+
+
+scoreboard_freeze = ScoreboardFreeze()
+freeze_scheduler = PeriodicTask("hexactf-scoreboard-freeze", SCOREBOARD_FREEZE_CHECK_SECONDS, scoreboard_freeze.sync)
+
+
+__all__ = [
+    "FrozenBoard",
+    "SCOREBOARD_FREEZE_CHECK_SECONDS",
+    "ScoreboardFreeze",
+    "freeze_scheduler",
+    "scoreboard_freeze",
+]
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+from ..auth import auth
+from ..auth.user_store import user_repository
+from .scoreboard_freeze import scoreboard_freeze
+
+# One broadcaster per worker: it recomputes the top-N when a user changes (or on
+# a short poll, to pick up other workers' writes), diffs it against the previous
+# top-N and fans the delta out to every SSE subscriber's asyncio queue.
+SCOREBOARD_STREAM_TOP_N = int(os.environ.get("HEXACTF_SCOREBOARD_STREAM_TOP_N", "100"))
+SCOREBOARD_STREAM_HEARTBEAT_SECONDS = float(os.environ.get("HEXACTF_SCOREBOARD_STREAM_HEARTBEAT", "15"))
+SCOREBOARD_STREAM_HISTORY = 256
+SCOREBOARD_STREAM_POLL_SECONDS = 1.0
+SCOREBOARD_STREAM_IDLE_SECONDS = 60.0
+SUBSCRIBER_QUEUE_SIZE = 64
+
+_ROW_FIELDS = ("username", "display_name", "score", "solved_count", "rank")
+
+
+def format_sse(event: str, data: dict, event_id: str | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+# Sent to non-admin subscribers instead of deltas once the board freezes; the
+# stream then ends and the reconnect is served the frozen snapshot.
+FROZEN_EVENT = format_sse("frozen", {})
+
+
+class Subscriber:
+    """One SSE connection: an asyncio queue fed from the broadcaster thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, *, public: bool = True) -> None:
+        self.loop = loop
+        self.public = public
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message: str) -> None:
+        # Runs on the event loop (via call_soon_threadsafe).
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client gets a fresh snapshot instead of an unbounded backlog.
+            self.overflowed = True
+
+
+class ScoreboardBroadcaster:
+    def __init__(self, top_n: int) -> None:
+        self.top_n = max(1, int(top_n))
+        # Event ids are "<epoch>-<seq>"; another worker (or a restart) has a
+        # different epoch, so resuming there falls back to a snapshot.
+        self.epoch = secrets.token_hex(4)
+        self._mutex = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._seq = 0
+        self._rows: dict[str, dict] | None = None
+        self._history: deque[tuple[int, str]] = deque(maxlen=SCOREBOARD_STREAM_HISTORY)
+        self._subscribers: set[Subscriber] = set()
+
+    def notify(self, *_: object) -> None:
+        """Wake the broadcaster; safe to call from any thread (e.g. repository listeners)."""
+        self._wake.set()
+
+    def _current_rows(self) -> dict[str, dict]:
+        rows = auth.get_scoreboard(limit=self.top_n)
+        return {str(row["username"]): {key: row.get(key) for key in _ROW_FIELDS} for row in rows}
+
+    def _event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def _snapshot_unlocked(self) -> str:
+        rows = sorted((self._rows or {}).values(), key=lambda row: row["rank"])
+        return format_sse("snapshot", {"rows": rows, "top_n": self.top_n}, self._event_id(self._seq))
+
+    def publish_changes(self) -> bool:
+        """Recompute the top-N and push a delta if anything moved."""
+        current = self._current_rows()
+        with self._mutex:
+            previous = self._rows
+            self._rows = current
+            if previous is None:
+                return False
+            changed = [row for username, row in current.items() if previous.get(username) != row]
+            removed = [username for username in previous if username not in current]
+            if not changed and not removed:
+                return False
+            self._seq += 1
+            changed.sort(key=lambda row: row["rank"])
+            message = format_sse("delta", {"rows": changed, "removed": removed}, self._event_id(self._seq))
+            self._history.append((self._seq, message))
+            subscribers = list(self._subscribers)
+        frozen = any(subscriber.public for subscriber in subscribers) and scoreboard_freeze.is_frozen()
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, FROZEN_EVENT if frozen and subscriber.public else message)
+            except RuntimeError:
+                # The subscriber's loop is closed; it will unsubscribe itself.
+                continue
+        return True
+
+    def subscribe(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        last_event_id: str | None = None,
+        *,
+        public: bool = True,
+    ) -> tuple[Subscriber, list[str]]:
+        """Register a subscriber and return what it must send first.
+
+        A known `last_event_id` from this worker replays the missed deltas from
+        the ring buffer; anything else starts with a full snapshot.
+        """
+        self.start()
+        initial_rows = self._current_rows() if self._rows is None else None
+        subscriber = Subscriber(loop, public=public)
+        # Snapshot/backlog and registration happen atomically with respect to
+        # publish_changes, so no delta is lost or applied twice.
+        with self._mutex:
+            if self._rows is None:
+                self._rows = initial_rows
+            backlog = self._replay_after(last_event_id)
+            if backlog is None:
+                backlog = [self._snapshot_unlocked()]
+            self._subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def _replay_after(self, last_event_id: str | None) -> list[str] | None:
+        epoch, _, raw_seq = str(last_event_id or "").partition("-")
+        if epoch != self.epoch or not raw_seq.isdigit():
+            return None
+        seq = int(raw_seq)
+        if seq == self._seq:
+            return []
+        if seq > self._seq or not self._history or self._history[0][0] > seq + 1:
+            return None
+        return [message for event_seq, message in self._history if event_seq > seq]
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._mutex:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._mutex:
+            return len(self._subscribers)
+
+    def _forget_rows(self) -> None:
+        # Nobody is listening, so nothing tracks changes; the next subscriber
+        # rebuilds the top-N and older event ids can no longer be resumed.
+        with self._mutex:
+            if self._rows is None or self._subscribers:
+                return
+            self._rows = None
+            self._history.clear()
+            self._seq += 1
+
+    def _run(self) -> None:
+        idle_since = None
+        while not self._stop.is_set():
+            self._wake.wait(SCOREBOARD_STREAM_POLL_SECONDS)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if not self.subscriber_count():
+                # Keep tracking for a while so reconnecting clients can still resume.
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= SCOREBOARD_STREAM_IDLE_SECONDS:
+                    self._forget_rows()
+                    continue
+            else:
+                idle_since = None
+            try:
+                self.publish_changes()
+            except Exception:
+                continue
+
+    def start(self) -> None:
+        with self._mutex:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="hexactf-scoreboard-stream", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+
+scoreboard_broadcaster = ScoreboardBroadcaster(SCOREBOARD_STREAM_TOP_N)
+user_repository.add_change_listener(scoreboard_broadcaster.notify)
+user_repository.add_load_listener(scoreboard_broadcaster.notify)
+
+
+__all__ = [
+    "FROZEN_EVENT",
+    "SCOREBOARD_STREAM_HEARTBEAT_SECONDS",
+    "SCOREBOARD_STREAM_TOP_N",
+    "ScoreboardBroadcaster",
+    "Subscriber",
+    "format_sse",
+    "scoreboard_broadcaster",
+]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from ..core.storage_utils import exclusive_lock
+from ..core.storage_utils import exclusive_lock, shared_lock
 from .settings_store import (
     DEFAULT_USER_INSTANCE_LIMIT,
     MAX_USER_INSTANCE_LIMIT,
@@ -12,8 +12,15 @@ from ..core.config import SETTINGS_FILE
 SETTINGS_LOCK_FILE = SETTINGS_FILE + ".lock"
 
 
+def get_settings_version() -> int:
+    """Counter bumped by every settings save; part of the visibility ETags."""
+    with shared_lock(SETTINGS_LOCK_FILE):
+        settings = load_settings_unlocked()
+    return int(settings.get("version") or 0)
+
+
 def get_user_instance_limit(user: dict | None = None) -> int | None:
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         settings = load_settings_unlocked()
 
     default_limit = int(settings.get("user_instance_limit", DEFAULT_USER_INSTANCE_LIMIT))
@@ -30,6 +37,13 @@ def get_user_instance_limit(user: dict | None = None) -> int | None:
             return None
         return int(user_limit)
 
+    team = _team_with_limit(settings, user)
+    if team is not None:
+        team_limit = settings["team_instance_limits"].get(team)
+        if team_limit is None:
+            return None
+        return int(team_limit)
+
     role_limits = settings.get("role_instance_limits")
     if isinstance(role_limits, dict) and role in role_limits:
         role_limit = role_limits.get(role)
@@ -43,6 +57,56 @@ def get_user_instance_limit(user: dict | None = None) -> int | None:
     return default_limit
 
 
+def _team_with_limit(settings: dict, user: dict) -> str | None:
+    team = str(user.get("team") or "").strip()
+    team_limits = settings.get("team_instance_limits")
+    if not team or not isinstance(team_limits, dict) or team not in team_limits:
+        return None
+    user_limits = settings.get("user_instance_limits")
+    if isinstance(user_limits, dict) and str(user.get("username") or "").strip() in user_limits:
+        return None
+    return team
+
+
+def uses_team_instance_limit(user: dict | None) -> bool:
+    """True when `user`'s limit is their team's, shared by all of its members."""
+    if user is None:
+        return False
+    with shared_lock(SETTINGS_LOCK_FILE):
+        settings = load_settings_unlocked()
+    return _team_with_limit(settings, user) is not None
+
+
+def get_team_instance_limits() -> dict[str, int | None]:
+    with shared_lock(SETTINGS_LOCK_FILE):
+        settings = load_settings_unlocked()
+    return dict(settings.get("team_instance_limits") or {})
+
+
+def set_team_instance_limit(team: str, limit: int | None) -> int | None:
+    """Cap the running instances of a whole team; None removes the team override."""
+    team = str(team or "").strip().lower()
+    if not team:
+        raise ValueError("team is required")
+    if limit is not None:
+        limit = int(limit)
+        if limit < 0:
+            raise ValueError("limit must be >= 0")
+        if limit > MAX_USER_INSTANCE_LIMIT:
+            raise ValueError(f"limit must be <= {MAX_USER_INSTANCE_LIMIT}")
+
+    with exclusive_lock(SETTINGS_LOCK_FILE):
+        settings = load_settings_unlocked()
+        team_limits = dict(settings.get("team_instance_limits") or {})
+        if limit is None:
+            team_limits.pop(team, None)
+        else:
+            team_limits[team] = limit
+        settings["team_instance_limits"] = team_limits
+        save_settings_unlocked(settings)
+        return limit
+
+
 def set_user_instance_limit(limit: int) -> int:
     limit_int = int(limit)
     if limit_int < 0:
@@ -58,7 +122,7 @@ def set_user_instance_limit(limit: int) -> int:
 
 
 def get_ranking_settings() -> dict:
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         settings = load_settings_unlocked()
     return {
         "ranking_open": bool(settings.get("ranking_open", True)),
@@ -106,7 +170,7 @@ def _iso_or_none(value: object) -> str | None:
 
 
 def get_challenges_settings() -> dict:
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         settings = load_settings_unlocked()
     return {
         "challenges_open": bool(settings.get("challenges_open", True)),
@@ -173,7 +237,7 @@ def is_ranking_visible(user: dict | None = None) -> tuple[bool, dict]:
     from datetime import UTC, datetime
 
     if user is not None and str(user.get("role") or "") == "admin":
-        with exclusive_lock(SETTINGS_LOCK_FILE):
+        with shared_lock(SETTINGS_LOCK_FILE):
             settings = load_settings_unlocked()
         return True, {
             "opens_at": settings.get("ranking_open_at"),
@@ -185,7 +249,7 @@ def is_ranking_visible(user: dict | None = None) -> tuple[bool, dict]:
 
     # Toggle takes precedence
     if ranking["ranking_open"]:
-        with exclusive_lock(SETTINGS_LOCK_FILE):
+        with shared_lock(SETTINGS_LOCK_FILE):
             settings = load_settings_unlocked()
         return True, {
             "opens_at": settings.get("ranking_open_at"),
@@ -195,7 +259,7 @@ def is_ranking_visible(user: dict | None = None) -> tuple[bool, dict]:
 
     # ranking_open == False — check schedule
     now = datetime.now(UTC)
-    with exclusive_lock(SETTINGS_LOCK_FILE):
+    with shared_lock(SETTINGS_LOCK_FILE):
         settings = load_settings_unlocked()
     open_at = _parse_iso_optional(settings.get("ranking_open_at"))
     close_at = _parse_iso_optional(settings.get("ranking_close_at"))
@@ -272,6 +336,7 @@ def set_ranking_schedule(
     *,
     ranking_open_at: str | None = ...,
     ranking_close_at: str | None = ...,
+    ranking_freeze_at: str | None = ...,
 ) -> dict:
     with exclusive_lock(SETTINGS_LOCK_FILE):
         settings = load_settings_unlocked()
@@ -292,6 +357,14 @@ def set_ranking_schedule(
                     raise ValueError("Invalid ranking_close_at datetime format")
             settings["ranking_close_at"] = val
 
+        if ranking_freeze_at is not ...:
+            val = str(ranking_freeze_at or "").strip() or None
+            if val is not None:
+                parsed = _parse_iso_optional(val)
+                if parsed is None:
+                    raise ValueError("Invalid ranking_freeze_at datetime format")
+            settings["ranking_freeze_at"] = val
+
         oa = settings.get("ranking_open_at")
         ca = settings.get("ranking_close_at")
         if oa and ca:
@@ -305,12 +378,24 @@ def set_ranking_schedule(
     ranking = get_ranking_settings()
     ranking["ranking_open_at"] = settings.get("ranking_open_at")
     ranking["ranking_close_at"] = settings.get("ranking_close_at")
+    ranking["ranking_freeze_at"] = settings.get("ranking_freeze_at")
     return ranking
 
 
+def get_ranking_freeze_at() -> "datetime | None":
+    """When the public scoreboard freezes, or None if no freeze is configured."""
+    with shared_lock(SETTINGS_LOCK_FILE):
+        settings = load_settings_unlocked()
+    return _parse_iso_optional(settings.get("ranking_freeze_at"))
+
+
 __all__ = [
+    "get_settings_version",
     "get_user_instance_limit",
     "set_user_instance_limit",
+    "get_team_instance_limits",
+    "set_team_instance_limit",
+    "uses_team_instance_limit",
     "get_ranking_settings",
     "set_ranking_open",
     "get_challenges_settings",
@@ -318,5 +403,6 @@ __all__ = [
     "is_ranking_visible",
     "set_challenges_visibility",
     "set_ranking_schedule",
+    "get_ranking_freeze_at",
     "SETTINGS_LOCK_FILE",
 ]
@@ -1,6 +1,7 @@
 import json
 import os
 
+from ..core import sqlite_db
 from ..core.config import DATA_DIR, SETTINGS_FILE
 from ..core.storage_utils import atomic_write_json
 
@@ -44,11 +45,24 @@ def _normalize_limit_map(raw: object) -> dict[str, int | None]:
     return result
 
 
+def _read_raw_settings() -> object:
+    if sqlite_db.sqlite_enabled():
+        return sqlite_db.get_meta(sqlite_db.get_connection(), "settings")
+    if not os.path.exists(SETTINGS_FILE):
+        return None
+    try:
+        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
 def load_settings_unlocked() -> dict:
     settings = {
         "user_instance_limit": DEFAULT_USER_INSTANCE_LIMIT,
         "role_instance_limits": {},
         "user_instance_limits": {},
+        "team_instance_limits": {},
         "ranking_open": True,
         "ranking_closed_message": "This page has been closed. 마지막까지 최선을 다해 주세요!",
         "challenges_open": True,
@@ -57,15 +71,10 @@ def load_settings_unlocked() -> dict:
         "challenges_closed_message": "CTF 문제를 아직 확인할 수 없습니다",
         "ranking_open_at": None,
         "ranking_close_at": None,
+        "ranking_freeze_at": None,
+        "version": 0,
     }
-    if not os.path.exists(SETTINGS_FILE):
-        return settings
-
-    try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-    except (OSError, json.JSONDecodeError):
-        return settings
+    raw = _read_raw_settings()
 
     if not isinstance(raw, dict):
         return settings
@@ -76,6 +85,7 @@ def load_settings_unlocked() -> dict:
     )
     settings["role_instance_limits"] = _normalize_limit_map(raw.get("role_instance_limits"))
     settings["user_instance_limits"] = _normalize_limit_map(raw.get("user_instance_limits"))
+    settings["team_instance_limits"] = _normalize_limit_map(raw.get("team_instance_limits"))
     settings["ranking_open"] = bool(raw.get("ranking_open", True))
     settings["ranking_closed_message"] = str(raw.get("ranking_closed_message") or settings["ranking_closed_message"])
     settings["challenges_open"] = bool(raw.get("challenges_open", True))
@@ -84,9 +94,17 @@ def load_settings_unlocked() -> dict:
     settings["challenges_closed_message"] = str(raw.get("challenges_closed_message") or settings["challenges_closed_message"])
     settings["ranking_open_at"] = raw.get("ranking_open_at") or None
     settings["ranking_close_at"] = raw.get("ranking_close_at") or None
+    settings["ranking_freeze_at"] = raw.get("ranking_freeze_at") or None
+    settings["version"] = _normalize_limit(raw.get("version", 0), 0)
     return settings
 
 
 def save_settings_unlocked(settings: dict) -> None:
+    # Every save bumps the version, so readers can tell settings changed without diffing them.
+    settings["version"] = int(settings.get("version") or 0) + 1
+    if sqlite_db.sqlite_enabled():
+        with sqlite_db.transaction() as conn:
+            sqlite_db.set_meta(conn, "settings", settings)
+        return
     _ensure_data_dir()
     atomic_write_json(SETTINGS_FILE, settings)
@@ -0,0 +1,101 @@
+"""Read-lock contention benchmark for backend/core/storage_utils.py.
+
+Spawns N worker processes (like N uvicorn workers) that repeatedly take the
+lock and parse a users.json-sized document, first with `exclusive_lock`
+(previous behaviour for readers) and then with `shared_lock`. With the shared
+lock, read throughput should grow with the worker count; with the exclusive
+lock it stays flat because every read is serialized.
+
+Usage (from the repository root):
+    python ops/bench/lock_contention.py --users 3000 --seconds 3 --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.core.storage_utils import exclusive_lock, shared_lock  # noqa: E402
+
+
+def _make_users_doc(count: int) -> dict:
+    users = {}
+    for idx in range(count):
+        username = f"user{idx:05d}"
+        users[username] = {
+            "username": username,
+            "display_name": f"Player {idx}",
+            "role": "user",
+            "status": "approved",
+            "password_hash": "pbkdf2_sha256$200000$" + "ab" * 16 + "$" + "cd" * 32,
+            "score": idx % 1000,
+            "solved_problems": [f"problem_{n}" for n in range(idx % 12)],
+            "solve_events": [
+                {"problem": f"problem_{n}", "score": 100, "solved_at": "2026-04-01T00:00:00Z"}
+                for n in range(idx % 12)
+            ],
+            "created_at": "2026-04-01T00:00:00Z",
+        }
+    return {"users": users}
+
+
+def _reader(mode: str, lock_path: str, data_path: str, seconds: float, start_at: float, out: mp.Queue) -> None:
+    lock = shared_lock if mode == "shared" else exclusive_lock
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    reads = 0
+    while time.time() < deadline:
+        with lock(lock_path):
+            with open(data_path, "r", encoding="utf-8") as f:
+                json.load(f)
+        reads += 1
+    out.put(reads)
+
+
+def run(mode: str, workers: int, lock_path: str, data_path: str, seconds: float) -> float:
+    out: mp.Queue = mp.Queue()
+    start_at = time.time() + 0.5
+    procs = [
+        mp.Process(target=_reader, args=(mode, lock_path, data_path, seconds, start_at, out))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    total = sum(out.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+    return total / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="hexactf-bench-") as tmp:
+        data_path = os.path.join(tmp, "users.json")
+        lock_path = data_path + ".lock"
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump(_make_users_doc(args.users), f)
+        size_kb = os.path.getsize(data_path) / 1024
+
+        print(f"users={args.users} file={size_kb:.0f} KiB seconds={args.seconds} cpus={os.cpu_count()}")
+        print(f"{'workers':>7} {'exclusive reads/s':>18} {'shared reads/s':>15} {'speedup':>8}")
+        for workers in args.workers:
+            exclusive = run("exclusive", workers, lock_path, data_path, args.seconds)
+            shared = run("shared", workers, lock_path, data_path, args.seconds)
+            print(f"{workers:>7} {exclusive:>18.1f} {shared:>15.1f} {shared / max(exclusive, 1e-9):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -235,6 +235,8 @@
       if (ccm && !_isEditing(ccm)) ccm.value = String(settings.challenges_closed_message || "");
       if (roa && !_isEditing(roa)) roa.value = isoToDatetimeLocal(settings.ranking_open_at);
       if (rca && !_isEditing(rca)) rca.value = isoToDatetimeLocal(settings.ranking_close_at);
+      const rfa = document.getElementById("rankingFreezeAt");
+      if (rfa && !_isEditing(rfa)) rfa.value = isoToDatetimeLocal(settings.ranking_freeze_at);
     } catch (err) {
       setAdminMessage(err.message || "Failed to load settings", "error");
       log("Admin settings load failed: " + err.message);
@@ -548,9 +550,12 @@
         const rca = document.getElementById("rankingCloseAt");
         const payload = {};
         const openAt = datetimeLocalToIso(roa ? roa.value : "");
+        const rfa = document.getElementById("rankingFreezeAt");
         const closeAt = datetimeLocalToIso(rca ? rca.value : "");
+        const freezeAt = datetimeLocalToIso(rfa ? rfa.value : "");
         if (openAt) payload.ranking_open_at = openAt;
         if (closeAt) payload.ranking_close_at = closeAt;
+        if (freezeAt) payload.ranking_freeze_at = freezeAt;
         await updateSettings(payload);
         await refreshSettings();
         setAdminMessage("Ranking schedule saved", "ok");
@@ -564,11 +569,13 @@
     rankingScheduleResetBtn.addEventListener("click", async () => {
       try {
         setAdminMessage("Resetting ranking schedule...", "");
-        await updateSettings({ ranking_open: true, ranking_open_at: "", ranking_close_at: "" });
+        await updateSettings({ ranking_open: true, ranking_open_at: "", ranking_close_at: "", ranking_freeze_at: "" });
         const roa = document.getElementById("rankingOpenAt");
         const rca = document.getElementById("rankingCloseAt");
+        const rfa = document.getElementById("rankingFreezeAt");
         if (roa) roa.value = "";
         if (rca) rca.value = "";
+        if (rfa) rfa.value = "";
         await refreshUsers();
         setAdminMessage("Ranking schedule reset", "ok");
       } catch (err) { setAdminMessage(err.message || "Failed to reset schedule", "error"); }
@@ -139,7 +139,7 @@
       return;
     }
     try {
-      const res = await fetch('/api/visibility', { cache: 'no-store' });
+      const res = await fetch('/api/visibility', { cache: 'no-cache' });
       const data = await res.json();
       badges.forEach(badge => {
         const type = badge.dataset.badge;
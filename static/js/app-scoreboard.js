@@ -15,6 +15,13 @@
   ];
   const SCOREBOARD_TOP_LIMIT = 10;
   const MIN_WINDOW_MS = 5 * 60 * 1000;
+  const STREAM_TIMELINE_REFRESH_MS = 30 * 1000;
+
+  const streamState = {
+    source: null,
+    rows: new Map(),
+    timelineTimer: null
+  };
 
   const timelineState = {
     rawTimeline: null,
@@ -299,6 +306,7 @@
       }));
 
       rows.sort((a, b) => {
+        if (a.rank && b.rank) return a.rank - b.rank;
         if (b.score !== a.score) return b.score - a.score;
         return String(a.username).localeCompare(String(b.username));
       });
@@ -349,11 +357,85 @@
     return data.timeline || null;
   }
 
+  function renderStreamRows() {
+    const rows = [...streamState.rows.values()].sort((a, b) => Number(a.rank || 0) - Number(b.rank || 0));
+    renderScoreboard(rows);
+    renderPodium(rows.slice(0, 3));
+    if (dom.scoreboardUpdatedAt) {
+      dom.scoreboardUpdatedAt.textContent = `Last updated: ${formatUpdatedAt(new Date())}`;
+    }
+  }
+
+  function scheduleTimelineRefresh() {
+    // Deltas update the table right away; the heavier timeline/summary follow at most every 30s.
+    if (streamState.timelineTimer) return;
+    streamState.timelineTimer = window.setTimeout(async () => {
+      streamState.timelineTimer = null;
+      try {
+        const [summary, timeline] = await Promise.all([loadSummary(), loadTimeline()]);
+        if (timeline) {
+          resetTimelineWindow(timeline);
+          renderTimeline(timeline);
+        }
+        syncTimelineMeta(summary.total_participants || streamState.rows.size);
+      } catch (err) {
+        log(`Scoreboard timeline refresh failed: ${err.message}`);
+      }
+    }, STREAM_TIMELINE_REFRESH_MS);
+  }
+
+  function stopScoreboardStream() {
+    if (streamState.source) {
+      streamState.source.close();
+      streamState.source = null;
+    }
+  }
+
+  function startScoreboardStream() {
+    if (streamState.source || !window.EventSource) return;
+    // EventSource reconnects on its own and resumes with Last-Event-ID.
+    const source = new EventSource("/api/scoreboard/stream");
+    streamState.source = source;
+
+    source.addEventListener("snapshot", event => {
+      const data = JSON.parse(event.data || "{}");
+      streamState.rows = new Map((data.rows || []).map(row => [row.username, row]));
+      renderStreamRows();
+      if (data.frozen_at) {
+        setScoreboardStatus(true, `frozen at ${formatUpdatedAt(new Date(data.frozen_at))}`);
+      }
+    });
+
+    source.addEventListener("frozen", () => {
+      // The server ends the stream; the automatic reconnect receives the frozen board.
+      scheduleTimelineRefresh();
+    });
+
+    source.addEventListener("delta", event => {
+      const data = JSON.parse(event.data || "{}");
+      (data.removed || []).forEach(username => streamState.rows.delete(username));
+      (data.rows || []).forEach(row => streamState.rows.set(row.username, row));
+      renderStreamRows();
+      scheduleTimelineRefresh();
+    });
+
+    source.addEventListener("closed", event => {
+      const data = JSON.parse(event.data || "{}");
+      stopScoreboardStream();
+      setClosedState(true, data.message || "This page has been closed.");
+      setScoreboardStatus(false, "closed");
+    });
+  }
+
   async function refreshScoreboard() {
     if (!dom.scoreboardBody) return;
     const rows = await loadScoreboard();
-    if (dom.scoreboardContentWrap?.classList.contains("hidden")) return;
+    if (dom.scoreboardContentWrap?.classList.contains("hidden")) {
+      stopScoreboardStream();
+      return;
+    }
     renderScoreboard(rows);
+    startScoreboardStream();
 
     try {
       const [summary, timeline] = await Promise.all([loadSummary(), loadTimeline()]);